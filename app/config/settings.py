@@ -23,5 +23,139 @@ class Settings:
         self.API_TITLE = os.getenv('API_TITLE', 'PDF Storage API')
         self.API_VERSION = os.getenv('API_VERSION', '1.0.0')
 
+        # Upload ingestion
+        self.UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(512 * 1024 * 1024)))
+        self.UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
+        self.UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR') or None
+        # Whole request body of single-file endpoints, capped while it streams in
+        # (one max-size file plus multipart framing; 0 = off)
+        self.UPLOAD_MAX_REQUEST_BYTES = int(os.getenv('UPLOAD_MAX_REQUEST_BYTES',
+                                                      str(self.UPLOAD_MAX_BYTES + 1024 * 1024)))
+
+        # PDF rendering settings
+        self.PDF_RENDER_DPI = int(os.getenv('PDF_RENDER_DPI', '300'))
+        self.PDF_HEAD_PAGES = int(os.getenv('PDF_HEAD_PAGES', '3'))
+        self.PDF_TAIL_PAGES = int(os.getenv('PDF_TAIL_PAGES', '2'))
+        # Rendered pages allowed to wait for inference at once
+        self.PIPELINE_WINDOW = int(os.getenv('PIPELINE_WINDOW', '2'))
+        # Stop sending pages once every field is valid
+        self.EARLY_EXIT = os.getenv('EARLY_EXIT', 'true').lower() == 'true'
+
+        # Batch endpoint settings
+        self.BATCH_MAX_PARALLEL = int(os.getenv('BATCH_MAX_PARALLEL', '4'))
+        self.BATCH_QUEUE_RETRIES = int(os.getenv('BATCH_QUEUE_RETRIES', '5'))
+        # Whole request body of the batch endpoint (many PDFs and/or zips; 0 = off)
+        self.BATCH_MAX_REQUEST_BYTES = int(os.getenv('BATCH_MAX_REQUEST_BYTES', str(16 * 1024 * 1024 * 1024)))
+        # PDFs taken from zip archives per batch, by count and summed uncompressed size
+        self.BATCH_MAX_ZIP_MEMBERS = int(os.getenv('BATCH_MAX_ZIP_MEMBERS', '500'))
+        self.BATCH_MAX_ZIP_BYTES = int(os.getenv('BATCH_MAX_ZIP_BYTES', str(4 * 1024 * 1024 * 1024)))
+
+        # Async job API (Redis/RQ)
+        self.REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        self.JOB_QUEUE_NAME = os.getenv('JOB_QUEUE_NAME', 'pdf-extract')
+        self.JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', '1800'))
+        self.JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', str(24 * 3600)))
+        self.JOB_INPUT_TTL = int(os.getenv('JOB_INPUT_TTL', str(24 * 3600)))
+        self.JOB_WEBHOOK_TIMEOUT = float(os.getenv('JOB_WEBHOOK_TIMEOUT', '10'))
+        # Comma-separated hosts webhooks may target; empty allows any public http(s) host
+        self.JOB_WEBHOOK_ALLOWED_HOSTS = [h.strip().lower() for h in
+                                          os.getenv('JOB_WEBHOOK_ALLOWED_HOSTS', '').split(',') if h.strip()]
+        # Directory shared by the API and every worker (e.g. NFS) that job PDFs
+        # are moved into; without it they go through Redis, capped at JOB_REDIS_MAX_BYTES
+        self.JOB_INPUT_DIR = os.getenv('JOB_INPUT_DIR') or None
+        self.JOB_REDIS_MAX_BYTES = int(os.getenv('JOB_REDIS_MAX_BYTES', str(32 * 1024 * 1024)))
+
+        # Result cache settings
+        self.RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+        self.RESULT_CACHE_PATH = os.getenv('RESULT_CACHE_PATH', 'cache/results.sqlite3')
+        self.RESULT_CACHE_MEMORY_ITEMS = int(os.getenv('RESULT_CACHE_MEMORY_ITEMS', '512'))
+        self.RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', str(7 * 24 * 3600)))
+        self.RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+        # Page payload sent to the vision model: resized to the patch grid and
+        # pixel budget (1280 visual tokens by default, Ollama's own cap for
+        # qwen2.5vl), then encoded with a lossy codec
+        self.VLM_PAYLOAD_ENABLED = os.getenv('VLM_PAYLOAD_ENABLED', 'true').lower() == 'true'
+        self.VLM_IMAGE_CODEC = os.getenv('VLM_IMAGE_CODEC', 'jpeg')
+        self.VLM_IMAGE_QUALITY = int(os.getenv('VLM_IMAGE_QUALITY', '85'))
+        self.VLM_MAX_PIXELS = int(os.getenv('VLM_MAX_PIXELS', str(1280 * 28 * 28)))
+        self.VLM_MIN_PIXELS = int(os.getenv('VLM_MIN_PIXELS', str(4 * 28 * 28)))
+        self.VLM_PATCH_SIZE = int(os.getenv('VLM_PATCH_SIZE', '14'))
+        self.VLM_MERGE_SIZE = int(os.getenv('VLM_MERGE_SIZE', '2'))
+
+        # Region mode: head pages send only a top band, tail pages only a bottom
+        # band (fractions of page height); full pages are re-sent for fields
+        # that come back invalid
+        self.REGION_MODE = os.getenv('REGION_MODE', 'false').lower() == 'true'
+        self.REGION_TOP_BAND = float(os.getenv('REGION_TOP_BAND', '0.45'))
+        self.REGION_BOTTOM_BAND = float(os.getenv('REGION_BOTTOM_BAND', '0.5'))
+
+        # Tesseract box text: words (reuse image_to_data), tesserocr, subprocess
+        self.TESSERACT_ENGINE = os.getenv('TESSERACT_ENGINE', 'words')
+
+        # Full-text Tesseract OCR for ContentLength, one process per core
+        self.FULLTEXT_OCR = os.getenv('FULLTEXT_OCR', 'false').lower() == 'true'
+        self.FULLTEXT_OCR_WORKERS = int(os.getenv('FULLTEXT_OCR_WORKERS', '0'))  # 0 = os.cpu_count()
+        self.FULLTEXT_OCR_DPI = int(os.getenv('FULLTEXT_OCR_DPI', '300'))
+        self.FULLTEXT_OCR_PSM = int(os.getenv('FULLTEXT_OCR_PSM', '3'))
+
+        # Tesseract preprocessing: auto picks fast/standard/heavy per page from
+        # a background noise estimate; DOWNSCALE < 1 runs bilateral/CLAHE on a
+        # smaller image
+        self.PREPROCESS_PROFILE = os.getenv('PREPROCESS_PROFILE', 'auto')
+        self.PREPROCESS_NOISE_LOW = float(os.getenv('PREPROCESS_NOISE_LOW', '1.5'))
+        self.PREPROCESS_NOISE_HIGH = float(os.getenv('PREPROCESS_NOISE_HIGH', '5.0'))
+        self.PREPROCESS_DOWNSCALE = float(os.getenv('PREPROCESS_DOWNSCALE', '1.0'))
+
+        # Cheap-first cascade: Tesseract + Parser rules on the header/signer
+        # bands before the VLM, which only gets pages whose fields are missing
+        self.CASCADE_MODE = os.getenv('CASCADE_MODE', 'false').lower() == 'true'
+        self.CASCADE_MIN_CONF = float(os.getenv('CASCADE_MIN_CONF', '60'))
+
+        # Tesseract -> text LLM endpoint: characters of OCR text from the start
+        # (header) and end (signer) of the document sent in the prompt
+        self.TEXT_LLM_HEAD_CHARS = int(os.getenv('TEXT_LLM_HEAD_CHARS', '2500'))
+        self.TEXT_LLM_TAIL_CHARS = int(os.getenv('TEXT_LLM_TAIL_CHARS', '1000'))
+        # The text LLM has its own scheduler so it never queues behind the vision model
+        self.TEXT_LLM_MAX_CONCURRENCY = int(os.getenv('TEXT_LLM_MAX_CONCURRENCY', '4'))
+        self.TEXT_LLM_MAX_QUEUE = int(os.getenv('TEXT_LLM_MAX_QUEUE', '64'))
+
+        # Per-page model response cache
+        self.PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+        self.PAGE_CACHE_MAX_BYTES = int(os.getenv('PAGE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+        # Vintern vision-encoder output per image and tiling, reused across
+        # prompts on the same page and repeated pages
+        self.VINTERN_FEATURE_CACHE_ENABLED = os.getenv('VINTERN_FEATURE_CACHE_ENABLED', 'true').lower() == 'true'
+        self.VINTERN_FEATURE_CACHE_MAX_BYTES = int(os.getenv('VINTERN_FEATURE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+        # Several prompts on one page prefill the shared image prefix once
+        self.VINTERN_SHARED_PREFIX = os.getenv('VINTERN_SHARED_PREFIX', 'true').lower() == 'true'
+        # Vintern on CPU (ignored on CUDA): "bf16" as on GPU, "fp32", or "int8"
+        # (fp32 with dynamically quantized linear layers)
+        self.VINTERN_CPU_BACKEND = os.getenv('VINTERN_CPU_BACKEND', 'fp32').lower()
+        self.VINTERN_CPU_THREADS = int(os.getenv('VINTERN_CPU_THREADS', '0'))
+        # Run the vision encoder with ONNX Runtime (exported on first load)
+        self.VINTERN_ONNX_VISION = os.getenv('VINTERN_ONNX_VISION', 'false').lower() == 'true'
+
+        # Memory governor: gc.collect / torch.cuda.empty_cache only run when a
+        # sample crosses one of these watermarks, at most once per cooldown
+        self.MEMORY_GOVERNOR_ENABLED = os.getenv('MEMORY_GOVERNOR_ENABLED', 'true').lower() == 'true'
+        self.MEMORY_RSS_HIGH_MB = int(os.getenv('MEMORY_RSS_HIGH_MB', '8192'))
+        self.MEMORY_AVAILABLE_LOW_MB = int(os.getenv('MEMORY_AVAILABLE_LOW_MB', '2048'))
+        # Fraction of GPU memory reserved by the caching allocator
+        self.MEMORY_CUDA_HIGH_WATERMARK = float(os.getenv('MEMORY_CUDA_HIGH_WATERMARK', '0.85'))
+        self.MEMORY_RECLAIM_COOLDOWN_S = float(os.getenv('MEMORY_RECLAIM_COOLDOWN_S', '5'))
+
+        # Process-wide inference scheduler
+        self.INFERENCE_MAX_CONCURRENCY = int(os.getenv('INFERENCE_MAX_CONCURRENCY', '1'))
+        self.INFERENCE_MAX_QUEUE = int(os.getenv('INFERENCE_MAX_QUEUE', '32'))
+
+        # Ollama client settings
+        self.OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+        self.OLLAMA_ASYNC_CLIENT = os.getenv('OLLAMA_ASYNC_CLIENT', 'true').lower() == 'true'
+        self.OLLAMA_TIMEOUT = float(os.getenv('OLLAMA_TIMEOUT', '300'))
+        self.OLLAMA_CONNECT_TIMEOUT = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', '10'))
+        self.OLLAMA_MAX_CONNECTIONS = int(os.getenv('OLLAMA_MAX_CONNECTIONS', '32'))
+
 # Create settings instance
 settings = Settings()
\ No newline at end of file
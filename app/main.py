@@ -4,7 +4,10 @@ import uvicorn
 import logging
 from app.routers import pdf_router
 from app.routers import  google_router
+from app.routers import jobs_router
 from app.config.settings import settings
+from app.services.ollama_client import ollama_client
+from app.services.fulltext import fulltext_service
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +31,10 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Close pooled Ollama connections on shutdown
+    app.add_event_handler("shutdown", ollama_client.aclose)
+    app.add_event_handler("shutdown", fulltext_service.shutdown)
+
     # Include routers
     app.include_router(
         pdf_router.router,
@@ -39,6 +46,11 @@ def create_app() -> FastAPI:
         prefix=settings.API_PREFIX,
         tags=["Google"]
     )
+    app.include_router(
+        jobs_router.router,
+        prefix=settings.API_PREFIX,
+        tags=["Jobs"]
+    )
     
     return app
 
@@ -1,18 +1,23 @@
+import asyncio
 import glob
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
-from typing import Dict, Any
+from typing import Dict, Any, Literal, Optional, Tuple
 
 
-from app.services.google import process_pdf_from_content
+from app.services.google import process_pdf_from_content, PROCESSOR_VERSION_ID, PAGE_PRESET
+from app.services.result_cache import result_cache, CACHE_USE, CACHE_BYPASS
 from app.services.google_parser import google_parser
+from app.services.fulltext import fulltext_service
+from app.config.settings import settings
+from app.utils.upload import SizeLimitedRoute, SpooledPDF, UploadTooLargeError, spool_upload
 import logging
 
 from google.cloud import documentai  # type: ignore
 logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["PDF"])
+router = APIRouter(tags=["PDF"], route_class=SizeLimitedRoute)
 from app.services.google import create_google_service
 
 
@@ -23,11 +28,17 @@ def get_credentials_file():
     raise FileNotFoundError("No JSON credentials file found in app/cloud/")
 
 @router.post("/upload/google/", response_model=Dict[str, Any])
-async def upload_pdf_google(file: UploadFile = File(...)) -> JSONResponse:
+async def upload_pdf_google(
+        file: UploadFile = File(...),
+        cache: Literal["use", "bypass", "refresh"] = CACHE_USE,
+        full_text: Optional[bool] = None
+) -> JSONResponse:
     """
     Optimized PDF upload endpoint with better memory management
-    """
 
+    full_text=true also OCRs every page with Tesseract to fill ContentLength
+    (default: FULLTEXT_OCR).
+    """
     try:
         # Validation (same as before)
         if not file.filename:
@@ -39,68 +50,110 @@ async def upload_pdf_google(file: UploadFile = File(...)) -> JSONResponse:
         if file.content_type and file.content_type != "application/pdf":
             raise HTTPException(status_code=400, detail="Invalid file type. Only PDF files are allowed")
 
-        # Read file content
-        content = await file.read()
-        if not content:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty")
-
-        # Convert PDF to PNG
-        bytes_pdf, total_page = await process_pdf_from_content(content)
-
-        google_service = create_google_service(get_credentials_file())
-        # Initialize optimized processor
-
-        # Process images without saving to disk
-        extracted_data = await google_service.process_document(bytes_pdf)
-
-        print("\nDone Processing")
-
-        # Parse results
-        error = 'Parse date'
-        day, month, year = google_parser.parse_date(extracted_data["ngay_ban_hanh"])
-
-        error = 'Parse document number'
-        document_number, document_symbol = google_parser.parse_document_number(extracted_data["so_quyet_dinh"])
-
-        # Build result
-        result = {}
-        result['SheetTotal'] = total_page
-        result['IssuedYear'] = year
-        result['Field1'] = extracted_data["co_quan"]
-        result['Field2'] = document_number
-        result['Field3'] = document_symbol
-        result['Field6'] = f"{day}/{month}/{year}"
-        result['Field7'] = google_parser.parse_doc_type(extracted_data["ten_tai_lieu"])
-        result['Field8'] = extracted_data["ten_tai_lieu"]
-        result['Field11'] = extracted_data["nguoi_ky"]
-        result['Field13'] = day
-        result['Field14'] = month
-        result['Field15'] = year
-        result['Field32'] = "Thường"
-        result['Field33'] = "Tiếng Việt"
-        result['Field34'] = "Bản chính"
-        result['Field35'] = ""
-        result['Field36'] = ""
-        result['SearchMeta'] = google_parser.remove_accents(
-            f"{result['Field1']} {result['Field2']} {result['Field3']} {result['Field7']} {result['Field13']} {result['Field14']} {result['Field15']} {result['Field32']} {result['Field33']} {result['Field34']} {result['Field35']} {result['Field36']}").lower()
-        result['ContentLength'] = 0  # No full text processing
-        result['PageCountA0'] = 0
-        result['PageCountA1'] = 0
-        result['PageCountA2'] = 0
-        result['PageCountA3'] = 0
-        result['PageCountA4'] = total_page
-        result['PageCountA5'] = 0
-        result['PageCountOther'] = 0
-        result['PageCount2A0'] = 0
-        result['PageCount3A0'] = 0
-        result['PageCount4A0'] = 0
-        return JSONResponse(content=result, status_code=200)
+        # Spool to disk in chunks instead of holding the whole PDF in memory
+        with await spool_upload(file) as pdf:
+            if not pdf.size:
+                raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+            result, headers = await extract_pdf_google(pdf, cache, full_text)
+        return JSONResponse(content=result, status_code=200, headers=headers)
 
     except HTTPException:
         raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(
-            f"Error processing PDF '{file.filename if file and file.filename else 'unknown'}': {str(e)} and error: {error}")
+            f"Error processing PDF '{file.filename if file and file.filename else 'unknown'}': {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error while processing PDF: {str(e)}")
 
 
+async def extract_pdf_google(pdf: SpooledPDF, cache: str = CACHE_USE,
+                             full_text: Optional[bool] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Cache lookup, page selection, Document AI call and parse stages for one spooled PDF.
+
+    With full_text, every page is OCRed on the full-text process pool while
+    Document AI runs, and ContentLength is filled in.
+
+    Returns the Field* result and response headers describing how it was produced.
+    """
+    full_text = settings.FULLTEXT_OCR if full_text is None else full_text
+    cache_key = result_cache.make_key_from_digest(pdf.sha256, backend="google", model=PROCESSOR_VERSION_ID,
+                                                  preset=f"{PAGE_PRESET}{'-fulltext' if full_text else ''}")
+    if cache == CACHE_USE:
+        cached = await result_cache.aget(cache_key)
+        if cached is not None:
+            return cached, {"X-Cache": "HIT"}
+
+    # Convert PDF to PNG
+    bytes_pdf, total_page = await process_pdf_from_content(pdf.path)
+
+    google_service = create_google_service(get_credentials_file())
+
+    # Full-text OCR runs on other cores alongside Document AI
+    ocr_task = asyncio.create_task(fulltext_service.extract_text(pdf.path, total_page)) if full_text else None
+
+    try:
+        # The Document AI client is blocking, keep it off the event loop
+        extracted_data = await asyncio.to_thread(google_service.process_document, bytes_pdf)
+    except BaseException:
+        if ocr_task:
+            ocr_task.cancel()
+            await asyncio.gather(ocr_task, return_exceptions=True)
+        raise
+
+    logger.info("Done Processing")
+
+    result = build_google_result(extracted_data, total_page)
+    headers = {"X-Cache": "MISS"}
+    if ocr_task:
+        _, ocr_stats = await ocr_task
+        result['ContentLength'] = ocr_stats["content_length"]
+        fulltext_service.response_headers(ocr_stats, headers)
+
+    # An empty extraction may be a transient Document AI failure; don't pin it for RESULT_CACHE_TTL
+    if cache != CACHE_BYPASS and any(extracted_data.values()):
+        await result_cache.aset(cache_key, result)
+    return result, headers
+
+
+def build_google_result(extracted_data: Dict[str, Any], total_page: int) -> Dict[str, Any]:
+    """Map Document AI entities onto the Field* result template"""
+    # Parse results
+    day, month, year = google_parser.parse_date(extracted_data["ngay_ban_hanh"])
+    document_number, document_symbol = google_parser.parse_document_number(extracted_data["so_quyet_dinh"])
+
+    # Build result
+    result = {}
+    result['SheetTotal'] = total_page
+    result['IssuedYear'] = year
+    result['Field1'] = extracted_data["co_quan"]
+    result['Field2'] = document_number
+    result['Field3'] = document_symbol
+    result['Field6'] = f"{day}/{month}/{year}"
+    result['Field7'] = google_parser.parse_doc_type(extracted_data["ten_tai_lieu"])
+    result['Field8'] = extracted_data["ten_tai_lieu"]
+    result['Field11'] = extracted_data["nguoi_ky"]
+    result['Field13'] = day
+    result['Field14'] = month
+    result['Field15'] = year
+    result['Field32'] = "Thường"
+    result['Field33'] = "Tiếng Việt"
+    result['Field34'] = "Bản chính"
+    result['Field35'] = ""
+    result['Field36'] = ""
+    result['SearchMeta'] = google_parser.remove_accents(
+        f"{result['Field1']} {result['Field2']} {result['Field3']} {result['Field7']} {result['Field13']} {result['Field14']} {result['Field15']} {result['Field32']} {result['Field33']} {result['Field34']} {result['Field35']} {result['Field36']}").lower()
+    result['ContentLength'] = 0  # Filled in by full-text OCR when requested
+    result['PageCountA0'] = 0
+    result['PageCountA1'] = 0
+    result['PageCountA2'] = 0
+    result['PageCountA3'] = 0
+    result['PageCountA4'] = total_page
+    result['PageCountA5'] = 0
+    result['PageCountOther'] = 0
+    result['PageCount2A0'] = 0
+    result['PageCount3A0'] = 0
+    result['PageCount4A0'] = 0
+    return result
@@ -0,0 +1,84 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi.responses import JSONResponse
+from typing import Dict, Any, Literal, Optional
+import asyncio
+import logging
+
+from app.services.jobs import enqueue_extraction, fetch_job, describe_job
+from app.utils.upload import SizeLimitedRoute, UploadTooLargeError, spool_upload
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Jobs"], route_class=SizeLimitedRoute)
+
+
+@router.post("/jobs", response_model=Dict[str, Any], status_code=202)
+async def submit_job(
+        file: UploadFile = File(...),
+        backend: Literal["qwen", "google"] = Form("qwen"),
+        cache: Literal["use", "bypass", "refresh"] = Form("use"),
+        webhook_url: Optional[str] = Form(None),
+        result_ttl: Optional[int] = Form(None),
+) -> JSONResponse:
+    """
+    Queue a PDF for extraction and return a job ID immediately.
+
+    Poll GET /jobs/{job_id} for status and GET /jobs/{job_id}/result for the
+    Field* result, or pass webhook_url to be notified on completion.
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+
+    if result_ttl is not None and result_ttl <= 0:
+        raise HTTPException(status_code=400, detail="result_ttl must be a positive number of seconds")
+
+    # Enforce the upload limit before the PDF is handed to the workers
+    try:
+        with await spool_upload(file) as pdf:
+            if not pdf.size:
+                raise HTTPException(status_code=400, detail="Uploaded file is empty")
+            # Redis, DNS and the move to JOB_INPUT_DIR all block
+            job_id = await asyncio.to_thread(enqueue_extraction, pdf, backend=backend, cache=cache,
+                                             webhook_url=webhook_url, result_ttl=result_ttl)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error queueing PDF '{file.filename}': {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Job queue unavailable: {str(e)}")
+
+    return JSONResponse(
+        content={"job_id": job_id, "status": "queued"},
+        status_code=202,
+        headers={"Location": f"jobs/{job_id}"},
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=Dict[str, Any])
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """Current status of a job"""
+    job = await asyncio.to_thread(fetch_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return await asyncio.to_thread(describe_job, job)
+
+
+@router.get("/jobs/{job_id}/result", response_model=Dict[str, Any])
+async def get_job_result(job_id: str) -> JSONResponse:
+    """Field* result of a finished job; 202 while it is still queued or running"""
+    job = await asyncio.to_thread(fetch_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    info = await asyncio.to_thread(describe_job, job)
+    if info["status"] == "finished":
+        return JSONResponse(content=await asyncio.to_thread(job.return_value), status_code=200)
+    if info["status"] == "failed":
+        raise HTTPException(status_code=500, detail=info.get("error", "Job failed"))
+    return JSONResponse(content=info, status_code=202)
@@ -1,17 +1,15 @@
-import gc
 import platform
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import unicodedata
 import json
 import asyncio
 import base64
-from typing import Dict, Any, List
-import gc
+import time
+import zipfile
+from typing import Dict, Any, List, AsyncIterator, Tuple, Literal, Callable, Awaitable, Union, Optional
 import os
 from concurrent.futures import ThreadPoolExecutor
-import os 
-from typing import Dict, Any, List
 
 import torch
 from app.services.pdf_service import pdf_service
@@ -19,7 +17,17 @@ from app.services.gov_convert import gov_pdf_service
 # from app.services.vintern import vintern_ai_service
 from app.services.qwenvision import qwen_service
 from app.services.parser import parser
+from app.services.result_cache import result_cache, CACHE_USE, CACHE_BYPASS
+from app.services.page_cache import page_cache
+from app.services.vlm_payload import vlm_payload_optimizer, VLMPayload
+from app.services.fulltext import fulltext_service
+from app.services.cascade import cascade_extractor
+from app.services.scheduler import inference_scheduler, text_llm_scheduler, QueueFullError
+from app.services.memory import memory_governor
+from app.utils.page import Page
+from app.utils.upload import SizeLimitedRoute, SpooledPDF, UploadTooLargeError, max_request_bytes, spool_upload
 import logging
+from app.config.settings import settings
 from app.template.result import result
 
 from app.utils.prom import GET_AUTHOR, GET_DATE_PROMPT, GET_DOCUMENT_NUMBER, GET_FULL_TEXT_PROMPT, GET_TITLE_PROMPT, \
@@ -29,16 +37,20 @@ from app.services.tesseract import tesseract_service
 from app.services.deepseek import deepseek_service
 logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["PDF"])
+router = APIRouter(tags=["PDF"], route_class=SizeLimitedRoute)
 
 @router.post("/upload/qwen/jpeg/opt", response_model=Dict[str, Any])
-async def upload_pdf_qwen_optimized(file: UploadFile = File(...)) -> JSONResponse:
+async def upload_pdf_qwen_optimized(
+        file: UploadFile = File(...),
+        cache: Literal["use", "bypass", "refresh"] = CACHE_USE,
+        full_text: Optional[bool] = None
+) -> JSONResponse:
     """
     Optimized PDF upload endpoint with better memory management
-    """
-    error = 'Start'
-    processor = None
 
+    full_text=true also OCRs every page with Tesseract to fill ContentLength
+    (default: FULLTEXT_OCR).
+    """
     try:
         # Validation (same as before)
         if not file.filename:
@@ -50,90 +62,587 @@ async def upload_pdf_qwen_optimized(file: UploadFile = File(...)) -> JSONRespons
         if file.content_type and file.content_type != "application/pdf":
             raise HTTPException(status_code=400, detail="Invalid file type. Only PDF files are allowed")
 
-        # Read file content
-        content = await file.read()
-        if not content:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty")
-
-        # Convert PDF to PNG
-        png_images, total_page = await pdf_service.convert_to_png(content)
-
-        # Initialize optimized processor
-        processor = OptimizedPDFProcessor(qwen_service, max_pages=5)
-
-        # Process images without saving to disk
-        extracted_data = await processor.process_pdf_optimized(png_images)
-
-        print("\nDone Processing")
-
-        # Parse results
-        error = 'Parse date'
-        day, month, year = parser.parse_date(extracted_data["date_data"])
-
-        error = 'Parse document number'
-        document_number, document_symbol = parser.parse_document_number(extracted_data["document_number_data"])
-
-        # Build result
-        result = {}
-        result['SheetTotal'] = total_page
-        result['IssuedYear'] = year
-        result['Field1'] = extracted_data["author_data"]
-        result['Field2'] = document_number
-        result['Field3'] = document_symbol
-        result['Field6'] = f"{day}/{month}/{year}"
-        result['Field7'] = extracted_data["doc_type"]
-        result['Field8'] = parser.parse_full_title(extracted_data["title_data"])
-        result['Field11'] = extracted_data["final_signed"]
-        result['Field13'] = day
-        result['Field14'] = month
-        result['Field15'] = year
-        result['Field32'] = "Thường"
-        result['Field33'] = "Tiếng Việt"
-        result['Field34'] = "Bản chính"
-        result['Field35'] = ""
-        result['Field36'] = ""
-        result['SearchMeta'] = parser.remove_accents(
-            f"{result['Field1']} {result['Field2']} {result['Field3']} {result['Field7']} {result['Field13']} {result['Field14']} {result['Field15']} {result['Field32']} {result['Field33']} {result['Field34']} {result['Field35']} {result['Field36']}").lower()
-        result['ContentLength'] = 0  # No full text processing
-        result['PageCountA0'] = 0
-        result['PageCountA1'] = 0
-        result['PageCountA2'] = 0
-        result['PageCountA3'] = 0
-        result['PageCountA4'] = total_page
-        result['PageCountA5'] = 0
-        result['PageCountOther'] = 0
-        result['PageCount2A0'] = 0
-        result['PageCount3A0'] = 0
-        result['PageCount4A0'] = 0
-        result['IsHandWriting'] = extracted_data.get("is_full_handwritten", 0)
-
-        # Light cleanup
-        del png_images
-        del content
-        gc.collect()
-
-        return JSONResponse(content=result, status_code=200)
+        # Spool to disk in chunks instead of holding the whole PDF in memory
+        with await spool_upload(file) as pdf:
+            if not pdf.size:
+                raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+            result, headers = await extract_pdf_qwen(pdf, cache, full_text)
+
+        return JSONResponse(content=result, status_code=200, headers=headers)
 
     except HTTPException:
         raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(
-            f"Error processing PDF '{file.filename if file and file.filename else 'unknown'}': {str(e)} and error: {error}")
+            f"Error processing PDF '{file.filename if file and file.filename else 'unknown'}': {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error while processing PDF: {str(e)}")
     finally:
-        # Cleanup processor
-        if processor and hasattr(processor, 'executor'):
-            processor.executor.shutdown(wait=False)
+        # Final memory cleanup, if above the watermarks
+        memory_governor.checkpoint("upload.qwen")
+
+
+@router.post("/upload/deepseek", response_model=Dict[str, Any])
+async def upload_pdf_deepseek(
+        file: UploadFile = File(...),
+        cache: Literal["use", "bypass", "refresh"] = CACHE_USE,
+        full_text: Optional[bool] = None
+) -> JSONResponse:
+    """
+    Text-only extraction: Tesseract OCR of the head/tail pages on the worker
+    pool, then the text LLM (DeepSeekService) instead of the vision model.
+    Returns the same Field* result as /upload/qwen/jpeg/opt.
+
+    full_text=true OCRs every page and fills ContentLength (default: FULLTEXT_OCR).
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+
+    try:
+        with await spool_upload(file) as pdf:
+            if not pdf.size:
+                raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+            result, headers = await extract_pdf_deepseek(pdf, cache, full_text)
+
+        return JSONResponse(content=result, status_code=200, headers=headers)
+
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.error(f"Error processing PDF '{file.filename}' with the text LLM: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error while processing PDF: {str(e)}")
+
+
+@router.post("/upload/qwen/batch")
+@max_request_bytes("BATCH_MAX_REQUEST_BYTES")
+async def upload_pdf_qwen_batch(
+        files: List[UploadFile] = File(...),
+        cache: Literal["use", "bypass", "refresh"] = CACHE_USE
+) -> StreamingResponse:
+    """
+    Batch extraction for many PDFs, uploaded as multiple files and/or zip archives.
+
+    Documents run through the same stages as /upload/qwen/jpeg/opt with at most
+    BATCH_MAX_PARALLEL in flight. One NDJSON line is streamed per document in
+    completion order; a failing document produces an error line and the rest
+    of the batch continues.
+    """
+    documents = await collect_batch_documents(files)
+    if not documents:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    return StreamingResponse(stream_batch_results(documents, cache), media_type="application/x-ndjson")
+
+
+@router.post("/upload/fulltext")
+async def upload_pdf_fulltext(file: UploadFile = File(...)) -> StreamingResponse:
+    """
+    Full-text Tesseract OCR of every page, streamed as NDJSON in page order.
+
+    One {"page", "text", "length"} line per page, then a summary line with
+    ContentLength and pages/sec per core.
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+
+    try:
+        pdf = await spool_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if not pdf.size:
+        pdf.close()
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+    async def stream_pages():
+        # The spooled file must outlive the response body
+        with pdf:
+            start = time.perf_counter()
+            texts, reports = [], []
+            try:
+                total_page = await asyncio.to_thread(pdf_service.get_page_count, pdf.path)
+                async for page_num, text, report in fulltext_service.stream_pages(pdf.path, list(range(1, total_page + 1))):
+                    texts.append(text)
+                    reports.append(report)
+                    yield json.dumps({"page": page_num, "text": text, "length": len(text),
+                                      "profile": report.get("profile"),
+                                      "timings_ms": {k: round(v, 1) for k, v in report["timings_ms"].items()}},
+                                     ensure_ascii=False) + "\n"
+            except Exception as e:
+                logger.error(f"Error OCRing PDF '{file.filename}': {str(e)}")
+                yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+                return
+            stats = fulltext_service.summarize(texts, time.perf_counter() - start, reports)
+            yield json.dumps({"ContentLength": stats["content_length"], "summary": stats}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream_pages(), media_type="application/x-ndjson")
+
+
+def open_zip_pdfs(stream) -> Tuple[zipfile.ZipFile, List[zipfile.ZipInfo]]:
+    """Open an uploaded archive and list its PDF members; blocking, call off the event loop"""
+    archive = zipfile.ZipFile(stream)
+    infos = [info for info in archive.infolist()
+             if not info.is_dir() and info.filename.lower().endswith('.pdf')]
+    return archive, infos
+
+
+def spool_zip_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> SpooledPDF:
+    """Inflate one member to disk; blocking, call off the event loop"""
+    with archive.open(info) as member:
+        return SpooledPDF.from_stream(member)
+
+
+async def collect_batch_documents(files: List[UploadFile]) -> List[Tuple[str, Callable[[], Awaitable[SpooledPDF]]]]:
+    """
+    Expand uploads into (name, loader) pairs; PDFs are spooled lazily when
+    their turn comes. Archives whose PDF members would take the batch past
+    BATCH_MAX_ZIP_MEMBERS or BATCH_MAX_ZIP_BYTES (declared uncompressed
+    sizes) become one error line and are never inflated.
+    """
+    documents = []
+    zip_members, zip_bytes = 0, 0
+
+    def failing(error: Exception):
+        async def load():
+            raise error
+        return load
+
+    for file in files:
+        filename = file.filename or "unknown"
+        lower_name = filename.lower()
+
+        if lower_name.endswith('.zip'):
+            try:
+                archive, infos = await asyncio.to_thread(open_zip_pdfs, file.file)
+            except zipfile.BadZipFile as e:
+                documents.append((filename, failing(ValueError(f"Invalid zip archive: {e}"))))
+                continue
+            # ZipExtFile stops at the declared size, so these bound what gets inflated
+            members = zip_members + len(infos)
+            total = zip_bytes + sum(info.file_size for info in infos)
+            if members > settings.BATCH_MAX_ZIP_MEMBERS or total > settings.BATCH_MAX_ZIP_BYTES:
+                documents.append((filename, failing(ValueError(
+                    f"Zip archives in a batch are limited to {settings.BATCH_MAX_ZIP_MEMBERS} PDFs and "
+                    f"{settings.BATCH_MAX_ZIP_BYTES} uncompressed bytes"))))
+                continue
+            zip_members, zip_bytes = members, total
+            for info in infos:
+                async def load(archive=archive, info=info):
+                    return await asyncio.to_thread(spool_zip_member, archive, info)
+                documents.append((f"{filename}/{info.filename}", load))
+        elif lower_name.endswith('.pdf'):
+            async def load(file=file):
+                return await spool_upload(file)
+            documents.append((filename, load))
+        else:
+            documents.append((filename, failing(ValueError("Only PDF or ZIP files are allowed"))))
+
+    return documents
+
+
+async def stream_batch_results(documents: List[Tuple[str, Callable[[], Awaitable[SpooledPDF]]]],
+                               cache: str = CACHE_USE) -> AsyncIterator[str]:
+    """Run documents with bounded parallelism and yield one NDJSON line each as they finish"""
+    semaphore = asyncio.Semaphore(settings.BATCH_MAX_PARALLEL)
+
+    async def run(index: int, name: str, load: Callable[[], Awaitable[SpooledPDF]]) -> Dict[str, Any]:
+        async with semaphore:
+            start = time.perf_counter()
+            line = {"index": index, "filename": name}
+            try:
+                with await load() as pdf:
+                    if not pdf.size:
+                        raise ValueError("Uploaded file is empty")
+
+                    # A batch waits for queue capacity instead of failing the document
+                    for attempt in range(settings.BATCH_QUEUE_RETRIES + 1):
+                        try:
+                            result, headers = await extract_pdf_qwen(pdf, cache)
+                            break
+                        except QueueFullError as e:
+                            if attempt == settings.BATCH_QUEUE_RETRIES:
+                                raise
+                            await asyncio.sleep(e.retry_after)
+
+                line.update(status="ok", result=result, cache=headers.get("X-Cache"),
+                            pages_sent=int(headers.get("X-Pages-Sent", 0)))
+            except Exception as e:
+                logger.error(f"Error processing PDF '{name}' in batch: {str(e)}")
+                line.update(status="error", error=str(e))
+            line["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            return line
+
+    tasks = [asyncio.create_task(run(i, name, load)) for i, (name, load) in enumerate(documents)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield json.dumps(await next_done, ensure_ascii=False) + "\n"
+    finally:
+        # Client went away: stop documents that haven't finished
+        for task in tasks:
+            task.cancel()
 
-        # Final memory cleanup
-        gc.collect()
+
+async def extract_pdf_qwen(pdf: SpooledPDF, cache: str = CACHE_USE,
+                           full_text: Optional[bool] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Cache lookup, render, infer and parse stages for one spooled PDF.
+
+    With full_text, every page is OCRed on the full-text process pool while
+    the model works on the selected pages, and ContentLength is filled in.
+
+    Returns the Field* result and response headers describing how it was produced.
+    """
+    request_start = time.perf_counter()
+    full_text = settings.FULLTEXT_OCR if full_text is None else full_text
+
+    preset = (f"{pdf_service.preset}-{vlm_payload_optimizer.preset}{'-fulltext' if full_text else ''}"
+              f"{'-cascade' if settings.CASCADE_MODE else ''}")
+    cache_key = result_cache.make_key_from_digest(pdf.sha256, backend="qwen", model=qwen_service.MODEL_NAME,
+                                                  preset=preset)
+    if cache == CACHE_USE:
+        cached = await result_cache.aget(cache_key)
+        if cached is not None:
+            return cached, {"X-Cache": "HIT"}
+
+    # Reject early instead of rendering pages the model can't take
+    inference_scheduler.ensure_capacity()
+
+    # Read page count cheaply, then stream the selected pages into the model
+    total_page = await asyncio.to_thread(pdf_service.get_page_count, pdf.path)
+
+    # Initialize optimized processor
+    processor = OptimizedPDFProcessor(qwen_service, max_pages=5)
+    page_numbers = processor.order_pages(pdf_service.select_pages(total_page))
+
+    # Full-text OCR runs on other cores alongside the model
+    ocr_task = asyncio.create_task(fulltext_service.extract_text(pdf.path, total_page)) if full_text else None
+
+    try:
+        # Render page N+1 while page N is being inferred
+        extracted_data = await processor.process_pdf_stream(
+            pdf_service.stream_pages(pdf.path, page_numbers), pdf_path=pdf.path
+        )
+    except BaseException:
+        if ocr_task:
+            ocr_task.cancel()
+            await asyncio.gather(ocr_task, return_exceptions=True)
+        raise
+
+    logger.info("Done Processing")
+
+    result = build_qwen_result(extracted_data, total_page)
+    ocr_stats = None
+    if ocr_task:
+        _, ocr_stats = await ocr_task
+        result['ContentLength'] = ocr_stats["content_length"]
+
+    if cache != CACHE_BYPASS and processor.is_cacheable():
+        await result_cache.aset(cache_key, result)
+
+    processor.stats["request_ms"] = (time.perf_counter() - request_start) * 1000
+    headers = processor.response_headers()
+    headers["X-Cache"] = "MISS"
+    if ocr_stats:
+        fulltext_service.response_headers(ocr_stats, headers)
+    return result, headers
+
+
+async def extract_pdf_deepseek(pdf: SpooledPDF, cache: str = CACHE_USE,
+                               full_text: Optional[bool] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    OCR the selected pages (every page with full_text) in the full-text
+    process pool, send the start and end of the text to the text LLM and map
+    its answer onto the Field* result.
+    """
+    request_start = time.perf_counter()
+    full_text = settings.FULLTEXT_OCR if full_text is None else full_text
+
+    preset = (f"{pdf_service.preset}-tess{fulltext_service.dpi}-psm{fulltext_service.psm}"
+              f"-head{settings.TEXT_LLM_HEAD_CHARS}-tail{settings.TEXT_LLM_TAIL_CHARS}"
+              f"{'-fulltext' if full_text else ''}")
+    cache_key = result_cache.make_key_from_digest(pdf.sha256, backend="deepseek",
+                                                  model=deepseek_service.MODEL_NAME, preset=preset)
+    if cache == CACHE_USE:
+        cached = await result_cache.aget(cache_key)
+        if cached is not None:
+            return cached, {"X-Cache": "HIT"}
+
+    text_llm_scheduler.ensure_capacity()
+
+    total_page = await asyncio.to_thread(pdf_service.get_page_count, pdf.path)
+    selected = pdf_service.select_pages(total_page)
+    page_numbers = list(range(1, total_page + 1)) if full_text else selected
+
+    # Rendering and OCR happen inside the worker processes
+    ocr_start = time.perf_counter()
+    texts, reports = {}, []
+    async for page_num, text, report in fulltext_service.stream_pages(pdf.path, page_numbers):
+        texts[page_num] = text
+        reports.append(report)
+    ocr_stats = fulltext_service.summarize(list(texts.values()), time.perf_counter() - ocr_start, reports)
+
+    document_text = "\n".join(texts[page_num] for page_num in selected if texts[page_num])
+    head = document_text[:settings.TEXT_LLM_HEAD_CHARS]
+    rest = document_text[settings.TEXT_LLM_HEAD_CHARS:]
+    # [-0:] would be the whole remainder, not an empty tail
+    tail = rest[-settings.TEXT_LLM_TAIL_CHARS:] if settings.TEXT_LLM_TAIL_CHARS > 0 else ""
+    question = f"Phần đầu văn bản:\n{head}"
+    if tail:
+        question += f"\n\nPhần cuối văn bản:\n{tail}"
+
+    llm_start = time.perf_counter()
+    llm_fn = deepseek_service.aget_response_ocr if settings.OLLAMA_ASYNC_CLIENT else deepseek_service.get_response_ocr
+    response = await text_llm_scheduler.run(llm_fn, question) if document_text else {}
+    llm_ms = (time.perf_counter() - llm_start) * 1000
+
+    # Same field rules as the vision path: "Không có" and empty values are dropped
+    extracted_data = OptimizedPDFProcessor(deepseek_service).merge_responses([response])
+    result = build_qwen_result(extracted_data, total_page)
+    if full_text:
+        result['ContentLength'] = ocr_stats["content_length"]
+
+    if cache != CACHE_BYPASS and response and "error" not in response:
+        await result_cache.aset(cache_key, result)
+
+    headers = {
+        "X-Cache": "MISS",
+        "X-Pages-OCR": str(len(page_numbers)),
+        "X-Prompt-Chars": str(len(question)),
+        "Server-Timing": (f"ocr;dur={ocr_stats['elapsed_ms']:.1f}, llm;dur={llm_ms:.1f}, "
+                          f"total;dur={(time.perf_counter() - request_start) * 1000:.1f}"),
+    }
+    return result, headers
+
+
+def build_qwen_result(extracted_data: Dict[str, Any], total_page: int) -> Dict[str, Any]:
+    """Map merged model fields onto the Field* result template"""
+    # Parse results
+    day, month, year = parser.parse_date(extracted_data["date_data"])
+    document_number, document_symbol = parser.parse_document_number(extracted_data["document_number_data"])
+
+    # Build result
+    result = {}
+    result['SheetTotal'] = total_page
+    result['IssuedYear'] = year
+    result['Field1'] = extracted_data["author_data"]
+    result['Field2'] = document_number
+    result['Field3'] = document_symbol
+    result['Field6'] = f"{day}/{month}/{year}"
+    result['Field7'] = extracted_data["doc_type"]
+    result['Field8'] = parser.parse_full_title(extracted_data["title_data"])
+    result['Field11'] = extracted_data["final_signed"]
+    result['Field13'] = day
+    result['Field14'] = month
+    result['Field15'] = year
+    result['Field32'] = "Thường"
+    result['Field33'] = "Tiếng Việt"
+    result['Field34'] = "Bản chính"
+    result['Field35'] = ""
+    result['Field36'] = ""
+    result['SearchMeta'] = parser.remove_accents(
+        f"{result['Field1']} {result['Field2']} {result['Field3']} {result['Field7']} {result['Field13']} {result['Field14']} {result['Field15']} {result['Field32']} {result['Field33']} {result['Field34']} {result['Field35']} {result['Field36']}").lower()
+    result['ContentLength'] = 0  # Filled in by full-text OCR when requested
+    result['PageCountA0'] = 0
+    result['PageCountA1'] = 0
+    result['PageCountA2'] = 0
+    result['PageCountA3'] = 0
+    result['PageCountA4'] = total_page
+    result['PageCountA5'] = 0
+    result['PageCountOther'] = 0
+    result['PageCount2A0'] = 0
+    result['PageCount3A0'] = 0
+    result['PageCount4A0'] = 0
+    result['IsHandWriting'] = extracted_data.get("is_full_handwritten", 0)
+    return result
+
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def get_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters and occupancy of the result and per-page caches"""
+    stats = await asyncio.to_thread(result_cache.stats)
+    stats["pages"] = page_cache.stats()
+    return stats
+
+
+@router.get("/scheduler/stats", response_model=Dict[str, Any])
+async def get_scheduler_stats() -> Dict[str, Any]:
+    """Queue depth, wait time and throughput of the vision and text LLM schedulers"""
+    stats = inference_scheduler.stats()
+    stats["text_llm"] = text_llm_scheduler.stats()
+    return stats
+
+
+@router.get("/memory/stats", response_model=Dict[str, Any])
+async def get_memory_stats() -> Dict[str, Any]:
+    """Current memory sample, watermarks and the reclaims the memory governor performed"""
+    return memory_governor.stats()
 
 
 class OptimizedPDFProcessor:
-    def __init__(self, qwen_service, max_pages=4):
+    # Fields that must all be valid before remaining pages can be skipped.
+    # is_full_handwritten is "any page says 1" and never settles early.
+    EARLY_EXIT_FIELDS = ("date_data", "document_number_data", "author_data",
+                         "title_data", "doc_type", "final_signed")
+    # Fields each cropped band is expected to answer, used to pick which
+    # cropped pages are re-sent in full when a field comes back invalid
+    REGION_FIELDS = {
+        "top": ("date_data", "document_number_data", "author_data", "title_data", "doc_type"),
+        "bottom": ("final_signed",),
+    }
+
+    def __init__(self, qwen_service, max_pages=4, window=None, scheduler=None, early_exit=None,
+                 payload_optimizer=None, region_mode=None, cascade=None, extractor=None):
         self.qwen_service = qwen_service
         self.max_pages = max_pages
-        self.executor = ThreadPoolExecutor(max_workers=2)  # Parallel processing
+        self.window = window or settings.PIPELINE_WINDOW
+        # Model calls go through the process-wide scheduler, not a per-request pool
+        self.scheduler = scheduler or inference_scheduler
+        self.early_exit = settings.EARLY_EXIT if early_exit is None else early_exit
+        self.payload_optimizer = payload_optimizer or vlm_payload_optimizer
+        self.region_mode = settings.REGION_MODE if region_mode is None else region_mode
+        self.regions: Dict[int, str] = {}
+        # Cascade: head/tail bands are read with Tesseract first and the model
+        # only gets pages that can still answer a missing field
+        self.cascade = settings.CASCADE_MODE if cascade is None else cascade
+        self.extractor = extractor or cascade_extractor
+        self.ocr_regions: Dict[int, str] = {}
+        self.cheap_responses: List[Tuple[Any, Dict[str, Any]]] = []
+        # final_signed is last-valid-wins: a signer read off an earlier page
+        # doesn't settle it until the last page has answered
+        self.last_page: Optional[int] = None
+        self.last_page_answered = False
+        self.stats = {"pages_sent": 0, "payload_bytes": 0, "visual_tokens": 0, "pages_ok": 0, "pages_failed": 0}
+
+    def order_pages(self, page_numbers: List[int]) -> List[int]:
+        """
+        First page, last page, then the rest: header fields live on the first
+        page and the signer on the last, so most documents settle in 2 calls.
+        """
+        self.plan_regions(page_numbers)
+        self.last_page = page_numbers[-1] if page_numbers else None
+        if not self.early_exit or len(page_numbers) <= 2:
+            return list(page_numbers)
+        return [page_numbers[0], page_numbers[-1]] + list(page_numbers[1:-1])
+
+    def plan_regions(self, page_numbers: List[int]):
+        """
+        In region mode, head pages are cropped to the top band (authority,
+        number, date, title) and tail pages to the bottom band (signer). The
+        first and last pages always get their band; a page that is both a
+        head and a tail page of a short document is sent in full.
+        """
+        bands = self.page_bands(page_numbers)
+        self.regions = bands if self.region_mode else {}
+        if self.cascade:
+            # A single page carries both the header and the signer
+            self.ocr_regions = bands if len(page_numbers) >= 2 else {p: "full" for p in page_numbers}
+
+    @staticmethod
+    def page_bands(page_numbers: List[int]) -> Dict[int, str]:
+        bands = {}
+        if len(page_numbers) < 2:
+            return bands
+        head = set(page_numbers[:settings.PDF_HEAD_PAGES]) | {page_numbers[0]}
+        tail = set(page_numbers[-settings.PDF_TAIL_PAGES:] if settings.PDF_TAIL_PAGES else []) | {page_numbers[-1]}
+        for page_num in page_numbers:
+            if page_num == page_numbers[0] or (page_num in head and page_num not in tail):
+                bands[page_num] = "top"
+            elif page_num == page_numbers[-1] or (page_num in tail and page_num not in head):
+                bands[page_num] = "bottom"
+        return bands
+
+    def band_for(self, page_num: int) -> Optional[Tuple[float, float]]:
+        region = self.regions.get(page_num)
+        if region == "top":
+            return 0.0, settings.REGION_TOP_BAND
+        if region == "bottom":
+            return 1.0 - settings.REGION_BOTTOM_BAND, 1.0
+        return None
+
+    def note_response(self, page_num: int, response: Dict[str, Any], cheap: bool = False):
+        """Record that the last page answered; a Tesseract read counts only if it found the signer"""
+        if page_num != self.last_page:
+            return
+        if self.is_valid_data(response.get("nguoi_ky", "")) if cheap else self.is_valid_response(response):
+            self.last_page_answered = True
+
+    def is_settled(self, key: str, merged: Dict[str, Any]) -> bool:
+        if key == "final_signed" and self.last_page is not None and not self.last_page_answered:
+            return False
+        return self.is_valid_data(merged[key])
+
+    def is_complete(self, merged: Dict[str, Any]) -> bool:
+        return all(self.is_settled(key, merged) for key in self.EARLY_EXIT_FIELDS)
+
+    def needs_model(self, page_num: int, merged: Dict[str, Any]) -> bool:
+        """Whether the page (or its band) can still answer a missing field"""
+        fields = self.REGION_FIELDS.get(self.regions.get(page_num), self.EARLY_EXIT_FIELDS)
+        return not all(self.is_settled(key, merged) for key in fields)
+
+    def merge_all(self, responses: List[Tuple[Any, Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Merge model responses in page order. In cascade mode a field read by
+        Tesseract is kept and the model only fills the rest.
+        """
+        merged = self.merge_responses([r for _, r in sorted(responses, key=lambda x: x[0])])
+        if self.cheap_responses:
+            cheap = self.merge_responses([r for _, r in sorted(self.cheap_responses, key=lambda x: x[0])])
+            for key in self.EARLY_EXIT_FIELDS:
+                if self.is_valid_data(cheap[key]):
+                    merged[key] = cheap[key]
+        return merged
+
+    def field_tiers(self, merged: Dict[str, Any]) -> Dict[str, str]:
+        """Which tier resolved each field: tesseract, qwen or missing"""
+        cheap = self.merge_responses([r for _, r in self.cheap_responses])
+        tiers = {}
+        for key in self.EARLY_EXIT_FIELDS:
+            if self.is_valid_data(cheap[key]):
+                tiers[key] = "tesseract"
+            else:
+                tiers[key] = "qwen" if self.is_valid_data(merged[key]) else "missing"
+        return tiers
+
+    def response_headers(self) -> Dict[str, str]:
+        """Expose per-request pipeline timings (Server-Timing) and model call count"""
+        headers = {
+            "X-Pages-Sent": str(self.stats["pages_sent"]),
+            "X-Payload-Bytes": str(self.stats["payload_bytes"]),
+            "X-Visual-Tokens": str(self.stats["visual_tokens"]),
+        }
+        if self.regions:
+            headers["X-Region-Fallback-Pages"] = str(self.stats.get("region_fallback_pages", 0))
+        if "field_tiers" in self.stats:
+            headers["X-Field-Tiers"] = ",".join(f"{k}={v}" for k, v in self.stats["field_tiers"].items())
+            headers["X-Pages-Skipped"] = str(self.stats.get("pages_skipped", 0))
+        metrics = []
+        if "cascade_ms" in self.stats:
+            metrics.append(f"cascade;dur={self.stats['cascade_ms']:.1f}")
+        if "encode_ms" in self.stats:
+            metrics.append(f"encode;dur={self.stats['encode_ms']:.1f}")
+        if "time_to_first_inference_ms" in self.stats:
+            metrics.append(f"ttfi;dur={self.stats['time_to_first_inference_ms']:.1f}")
+        if "total_ms" in self.stats:
+            metrics.append(f"pipeline;dur={self.stats['total_ms']:.1f}")
+        if "request_ms" in self.stats:
+            metrics.append(f"total;dur={self.stats['request_ms']:.1f}")
+        if metrics:
+            headers["Server-Timing"] = ", ".join(metrics)
+        return headers
 
     def is_valid_data(self, value: str) -> bool:
         """Check if data is valid (not empty or 'Không có')"""
@@ -146,26 +655,93 @@ class OptimizedPDFProcessor:
         base64_image = base64.b64encode(image_bytes).decode('utf-8')
         return f"data:image/png;base64,{base64_image}"
 
-    async def process_single_image(self, image_bytes: bytes, page_num: int) -> Dict[str, Any]:
-        """Process single image without saving to disk"""
-        try:
-            # Convert to base64 for direct processing
-            image_data_url = self.process_image_to_base64(image_bytes)
+    def prepare_payload(self, page: Union[Page, bytes], band: Optional[Tuple[float, float]] = None) -> VLMPayload:
+        """Crop, resize and re-encode a rendered page for the model; runs off the event loop"""
+        payload = self.payload_optimizer.prepare(page, band)
+        self.stats["encode_ms"] = self.stats.get("encode_ms", 0.0) + payload.encode_ms
 
-            # Process with Qwen (runs in thread to avoid blocking)
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                self.executor,
-                self.qwen_service.get_response_ocr,
-                image_data_url
-            )
+        budget = self.payload_optimizer.context_budget(self.qwen_service.OPTIONS, self.qwen_service.SYSTEM_PROMPT)
+        if payload.visual_tokens > budget:
+            logger.warning(f"Page image needs ~{payload.visual_tokens} visual tokens but only ~{budget} fit in "
+                           f"num_ctx={self.qwen_service.OPTIONS.get('num_ctx')}; lower VLM_MAX_PIXELS")
+        return payload
 
+    async def process_single_image(self, image: Union[Page, bytes, VLMPayload], page_num: int) -> Dict[str, Any]:
+        """Process single image without saving to disk"""
+        try:
+            if not isinstance(image, VLMPayload):
+                image = await asyncio.to_thread(self.prepare_payload, image)
+
+            # Identical pages across documents reuse the earlier response
+            cache_key = page_cache.make_key(image.data_url.encode("ascii"), self.qwen_service.SYSTEM_PROMPT,
+                                            self.qwen_service.MODEL_NAME)
+            cached = page_cache.get(cache_key)
+            if cached is not None:
+                self.stats["page_cache_hits"] = self.stats.get("page_cache_hits", 0) + 1
+                self.stats["pages_ok"] += 1
+                return cached
+
+            image_data_url = image.data_url
+            self.stats["pages_sent"] += 1
+            self.stats["payload_bytes"] += image.encoded_bytes
+            self.stats["visual_tokens"] += image.visual_tokens
+
+            # Process with Qwen through the shared scheduler: the async client is
+            # awaited on the event loop, the LangChain path runs on worker threads
+            ocr_fn = (self.qwen_service.aget_response_ocr if settings.OLLAMA_ASYNC_CLIENT
+                      else self.qwen_service.get_response_ocr)
+            response = await self.scheduler.run(ocr_fn, image_data_url)
+
+            page_cache.set(cache_key, response)
+            self.stats["pages_ok" if self.is_valid_response(response) else "pages_failed"] += 1
             return response
 
+        except QueueFullError:
+            raise
         except Exception as e:
-            print(f"Error processing page {page_num}: {e}")
+            logger.error(f"Error processing page {page_num}: {e}")
+            self.stats["pages_failed"] += 1
             return {}
 
+    @staticmethod
+    def is_valid_response(response: Any) -> bool:
+        """Model answered; the Qwen clients report failures as {"answer", "error"}"""
+        return isinstance(response, dict) and bool(response) and "error" not in response
+
+    def is_cacheable(self) -> bool:
+        """
+        Cache a result only when a page answered and no model call failed, so
+        an Ollama outage doesn't pin an empty result for RESULT_CACHE_TTL.
+        """
+        answered = self.stats["pages_ok"] or any(response for _, response in self.cheap_responses)
+        return bool(answered) and not self.stats["pages_failed"]
+
+    async def process_region_fallback(self, full_pages: Dict[int, Optional[Union[bytes, VLMPayload]]],
+                                      responses: List[Tuple[Any, Dict[str, Any]]],
+                                      merged_result: Dict[str, str], pdf_path: Optional[str] = None) -> Dict[str, str]:
+        """
+        Re-send cropped pages in full for the fields their band should have
+        answered but didn't. A full-page answer ranks right after the band
+        answer of the same page. Pages kept as None are re-rendered from pdf_path.
+        """
+        for page_num, image in list(full_pages.items()):
+            missing = [key for key in self.REGION_FIELDS[self.regions[page_num]]
+                       if not self.is_valid_data(merged_result[key])]
+            if not missing:
+                continue
+            self.stats["region_fallback_pages"] = self.stats.get("region_fallback_pages", 0) + 1
+            if image is None:
+                image = await asyncio.to_thread(pdf_service.render_page_image, pdf_path, page_num)
+            response = await self.process_single_image(image, page_num)
+            del full_pages[page_num], image
+            if isinstance(response, dict) and response:
+                responses.append(((page_num, 1), response))
+                self.note_response(page_num, response)
+                merged_result = self.merge_all(responses)
+                if self.early_exit and self.is_complete(merged_result):
+                    break
+        return merged_result
+
     def merge_responses(self, responses: List[Dict[str, Any]]) -> Dict[str, str]:
         """Merge multiple AI responses into final result"""
         result = {
@@ -208,33 +784,127 @@ class OptimizedPDFProcessor:
 
         return result
 
+    def cheap_extract(self, page: Union[Page, bytes], page_num: int) -> Dict[str, str]:
+        """Tesseract tier for one rendered page; runs off the event loop"""
+        start = time.perf_counter()
+        response = self.extractor.safe_extract(page, self.ocr_regions[page_num])
+        self.stats["cascade_ms"] = self.stats.get("cascade_ms", 0.0) + (time.perf_counter() - start) * 1000
+        return response
+
     async def process_pdf_optimized(self, png_images: List[bytes]) -> Dict[str, str]:
         """Main processing function with optimizations"""
-        # Limit to max_pages for performance
-        images_to_process = png_images[:self.max_pages]
-
-        print(f"Processing {len(images_to_process)} pages (max: {self.max_pages})")
-
-        # Process images in parallel (but limit concurrency to avoid GPU overload)
-        semaphore = asyncio.Semaphore(1)  # Process one at a time for now
-
-        async def process_with_semaphore(image_bytes, page_num):
-            async with semaphore:
-                return await self.process_single_image(image_bytes, page_num)
-
-        # Create tasks for parallel processing
-        tasks = [
-            process_with_semaphore(image_bytes, i + 1)
-            for i, image_bytes in enumerate(images_to_process)
-        ]
-
-        # Wait for all tasks to complete
-        responses = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Filter out exceptions and merge results
-        valid_responses = [r for r in responses if isinstance(r, dict) and r]
-        merged_result = self.merge_responses(valid_responses)
-
-        print(f"Processed {len(valid_responses)}/{len(images_to_process)} pages successfully")
+        async def page_source():
+            for page_num in self.order_pages(list(range(1, len(png_images) + 1))):
+                yield page_num, png_images[page_num - 1]
+
+        return await self.process_pdf_stream(page_source())
+
+    async def process_pdf_stream(self, pages: AsyncIterator[Tuple[int, Union[Page, bytes]]],
+                                 pdf_path: Optional[str] = None) -> Dict[str, str]:
+        """
+        Consume pages from an async source while it is still rendering.
+
+        A producer task pulls pages into a queue of size `window`, so at most
+        `window` encoded pages wait for the model at any time and rendering of
+        the next page overlaps inference of the current one.
+
+        Responses are merged in page order regardless of arrival order. With
+        early exit enabled, the source is stopped and queued pages are dropped
+        as soon as every field in EARLY_EXIT_FIELDS is valid.
+
+        Cropped pages may need a full-page fallback pass; with `pdf_path` they
+        are re-rendered then, otherwise an encoded copy is kept instead of the
+        decoded raster.
+        """
+        start = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.window)
+        # What the fallback pass needs per cropped page: None to re-render
+        # from pdf_path, else the source PNG or an encoded full-page payload
+        full_pages: Dict[int, Optional[Union[bytes, VLMPayload]]] = {}
+
+        async def produce():
+            try:
+                count = 0
+                async for page_num, source in pages:
+                    # One decoded Page feeds the Tesseract tier and the payload
+                    # encoder; both overlap inference too
+                    page = Page.coerce(source, page_num)
+                    cheap = None
+                    if page_num in self.ocr_regions:
+                        cheap = await asyncio.to_thread(self.cheap_extract, page, page_num)
+                    band = self.band_for(page_num)
+                    payload = await asyncio.to_thread(self.prepare_payload, page, band)
+                    if band is not None:
+                        if pdf_path:
+                            full_pages[page_num] = None
+                        elif isinstance(source, bytes):
+                            full_pages[page_num] = source
+                        else:
+                            full_pages[page_num] = await asyncio.to_thread(self.prepare_payload, page)
+                    del page, source
+                    await queue.put((page_num, payload, cheap))
+                    count += 1
+                    if count >= self.max_pages:
+                        break
+            except Exception:
+                # Wake the consumer; the error surfaces through `await producer`
+                await queue.put(None)
+                raise
+            finally:
+                if hasattr(pages, "aclose"):
+                    await pages.aclose()
+            # Not reached on cancellation, where the queue may be full
+            await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        responses = []
+        merged_result = self.merge_responses([])
+        try:
+            # Process one page at a time to avoid GPU overload
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                page_num, payload, cheap = item
+                if cheap is not None:
+                    self.cheap_responses.append(((page_num, 0), cheap))
+                    self.note_response(page_num, cheap, cheap=True)
+                    merged_result = self.merge_all(responses)
+                    if self.early_exit and self.is_complete(merged_result):
+                        self.stats["early_exit"] = True
+                        break
+                if self.cascade and not self.needs_model(page_num, merged_result):
+                    self.stats["pages_skipped"] = self.stats.get("pages_skipped", 0) + 1
+                    continue
+                if "time_to_first_inference_ms" not in self.stats:
+                    self.stats["time_to_first_inference_ms"] = (time.perf_counter() - start) * 1000
+                response = await self.process_single_image(payload, page_num)
+                del item, payload
+                if isinstance(response, dict) and response:
+                    responses.append(((page_num, 0), response))
+                    self.note_response(page_num, response)
+                    merged_result = self.merge_all(responses)
+                    if self.early_exit and self.is_complete(merged_result):
+                        self.stats["early_exit"] = True
+                        break
+            if not self.stats.get("early_exit"):
+                # Surface rendering errors
+                await producer
+        finally:
+            if not producer.done():
+                # Stop rendering pages we no longer need
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+        if full_pages and not self.is_complete(merged_result):
+            merged_result = await self.process_region_fallback(full_pages, responses, merged_result, pdf_path)
+
+        if self.cascade:
+            self.stats["field_tiers"] = self.field_tiers(merged_result)
+        self.stats["total_ms"] = (time.perf_counter() - start) * 1000
+        logger.info(f"Processed {len(responses)} pages successfully, {self.stats['pages_sent']} sent to model"
+                    f"{' (early exit)' if self.stats.get('early_exit') else ''} "
+                    f"(first inference after {self.stats.get('time_to_first_inference_ms', 0):.0f}ms, "
+                    f"total {self.stats['total_ms']:.0f}ms)")
 
         return merged_result
\ No newline at end of file
@@ -0,0 +1,201 @@
+import logging
+import re
+from datetime import date
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from app.config.settings import settings
+from app.services.parser import parser
+from app.services.tesseract import tesseract_service
+from app.utils.boxes import BoxArray
+from app.utils.page import Page
+
+logger = logging.getLogger(__name__)
+
+NUMBER_LINE = re.compile(r'^(so|no)\s*[:.]?\s*\d')
+DATE_WORDS = re.compile(r'ngay\s+(\d{1,2})\s+thang\s+(\d{1,2})\s+nam\s+(\d{4})')
+NATIONAL_MOTTO = ("cong hoa", "doc lap")
+BODY_START = ("can cu", "kinh gui", "xet ")
+
+
+class CascadeExtractor:
+    """
+    First, cheap tier of the extraction cascade.
+
+    OCRs the header band (authority, number, date, type, summary) and the
+    signer band of a rendered page with Tesseract and applies the Parser's
+    rules. The result is a partial response in the Qwen JSON schema holding
+    only fields that were read with enough confidence and pass validation;
+    everything else is left for the vision model.
+    """
+
+    def __init__(self, ocr=None, min_conf: float = None):
+        self.ocr = ocr or tesseract_service
+        self.min_conf = settings.CASCADE_MIN_CONF if min_conf is None else min_conf
+
+    def extract(self, page: Union[Page, bytes], region: str = "full") -> Dict[str, str]:
+        """
+        page: a rendered Page (or encoded image bytes).
+        region: "top" (header band), "bottom" (signer band) or "full" (both,
+        for single-page documents).
+        """
+        try:
+            img = Page.coerce(page).array("L")
+        except OSError:
+            return {}
+        height, width = img.shape[:2]
+
+        response = {}
+        if region in ("top", "full"):
+            band = img[:int(height * settings.REGION_TOP_BAND)]
+            response.update(self.read_header(self.segments(band), width))
+        if region in ("bottom", "full"):
+            band = img[int(height * (1.0 - settings.REGION_BOTTOM_BAND)):]
+            signer = self.read_signer(self.segments(band), width)
+            if signer:
+                response["nguoi_ky"] = signer
+        return response
+
+    def segments(self, band: np.ndarray) -> BoxArray:
+        """Words of a band grouped into lines, cut at wide gaps so columns stay apart"""
+        words = self.ocr.extract_text_boxes(self.ocr.preprocess_for_ocr(band))
+        if not len(words):
+            return words
+        line_height = float(np.median(words.height))
+        return words.merge_by_line(y_threshold=max(10, int(line_height * 0.4)),
+                                   max_gap=int(line_height * 2))
+
+    def read_header(self, segments: BoxArray, width: int) -> Dict[str, str]:
+        found = {}
+        number_y = heading = None
+        for i in range(len(segments)):
+            text = segments.text[i]
+            if segments.conf[i] < self.min_conf or not text:
+                continue
+            plain = parser.remove_accents(text).lower()
+
+            if "so_van_ban" not in found and NUMBER_LINE.match(plain):
+                number, symbol = parser.parse_document_number(text)
+                if number and re.search(r'[^\W\d_]', symbol):
+                    found["so_van_ban"] = text
+                    number_y = int(segments.y[i])
+
+            if "ngay_ban_hanh" not in found:
+                issued = self.parse_date(text)
+                if issued:
+                    found["ngay_ban_hanh"] = issued
+
+            if "loai_van_ban" not in found:
+                doc_type = self.parse_heading(text)
+                if doc_type:
+                    found["loai_van_ban"] = doc_type
+                    heading = i
+
+        if number_y is not None:
+            author = self.read_author(segments, width, number_y)
+            if author:
+                found["co_quan"] = author
+        if heading is not None:
+            summary = self.read_summary(segments, width, heading)
+            if summary:
+                found["trich_yeu"] = summary
+        return found
+
+    def parse_date(self, text: str) -> Optional[str]:
+        """'ngày 5 tháng 9 năm 2025' or a numeric date, as DD/MM/YYYY if it is a real issue date"""
+        match = DATE_WORDS.search(parser.remove_accents(text).lower())
+        if match:
+            day, month, year = match.groups()
+            text = f"{int(day):02d}/{int(month):02d}/{year}"
+        day, month, year = parser.parse_date(text)
+        if not (day and month and year):
+            return None
+        try:
+            issued = date(int(year), int(month), int(day))
+        except ValueError:
+            return None
+        if not 1945 <= issued.year <= date.today().year + 1:
+            return None
+        return f"{day}/{month}/{year}"
+
+    def parse_heading(self, text: str) -> Optional[str]:
+        """Document type from a heading line such as 'QUYẾT ĐỊNH', not from body text"""
+        doc_type = parser.parse_title(text)
+        if not doc_type:
+            return None
+        letters = [c for c in text if c.isalpha()]
+        plain = parser.remove_accents(text).lower()
+        if (letters and all(c.isupper() for c in letters)
+                and plain.startswith(parser.remove_accents(doc_type).lower())
+                and len(text.split()) <= len(doc_type.split()) + 1):
+            return doc_type
+        return None
+
+    def read_author(self, segments: BoxArray, width: int, number_y: int) -> Optional[str]:
+        """Upper-case lines of the left column above the number line"""
+        lines = []
+        for i in range(len(segments)):
+            text = segments.text[i]
+            if segments.y[i] >= number_y or segments.x_end[i] > width * 0.55:
+                continue
+            plain = parser.remove_accents(text).lower()
+            letters = [c for c in text if c.isalpha()]
+            if (segments.conf[i] < self.min_conf or not letters
+                    or any(motto in plain for motto in NATIONAL_MOTTO)):
+                continue
+            if not all(c.isupper() for c in letters):
+                return None
+            lines.append(text)
+        return " ".join(lines) or None
+
+    def read_summary(self, segments: BoxArray, width: int, heading: int) -> Optional[str]:
+        """Centred lines right under the document type heading"""
+        lines = []
+        previous = heading
+        for i in range(heading + 1, len(segments)):
+            text = segments.text[i]
+            center = (segments.x[i] + segments.x_end[i]) / 2
+            gap = segments.y[i] - segments.y_end[previous]
+            plain = parser.remove_accents(text).lower()
+            if (gap > 2 * segments.height[previous] or abs(center - width / 2) > width * 0.25
+                    or plain.startswith(BODY_START)):
+                break
+            if not any(c.isalnum() for c in text):
+                # Rule under the summary
+                break
+            if segments.conf[i] < self.min_conf:
+                return None
+            lines.append(text)
+            previous = i
+        summary = " ".join(lines)
+        return summary if len(summary.split()) >= 2 else None
+
+    def read_signer(self, segments: BoxArray, width: int) -> Optional[str]:
+        """Last name-like line of the right half (the signer's printed name)"""
+        signer = None
+        for i in range(len(segments)):
+            text = segments.text[i]
+            if segments.conf[i] < self.min_conf or segments.x[i] + segments.width[i] / 2 < width / 2:
+                continue
+            if self.looks_like_name(text):
+                signer = text
+        return signer
+
+    @staticmethod
+    def looks_like_name(text: str) -> bool:
+        words = text.split()
+        if not 2 <= len(words) <= 5 or text.isupper():
+            return False
+        return all(word.isalpha() and word[0].isupper() for word in words)
+
+    def safe_extract(self, page: Union[Page, bytes], region: str = "full") -> Dict[str, str]:
+        """extract(), with OCR failures leaving every field to the model"""
+        try:
+            return self.extract(page, region)
+        except Exception as e:
+            logger.warning(f"Cascade OCR failed, falling back to the model: {e}")
+            return {}
+
+
+cascade_extractor = CascadeExtractor()
@@ -1,22 +1,15 @@
 from langchain_ollama.llms import OllamaLLM
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 import json
-import gc
 
+from app.config.settings import settings
+from app.services.memory import memory_governor
+from app.services.ollama_client import ollama_client
 
-class DeepSeekService:
-    _instance = None
-    _chain = None
-
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
 
-    def __init__(self):
-        if DeepSeekService._chain is None:
-            prompt_template = ChatPromptTemplate.from_messages([
-                ("system", """Bạn là một chuyên gia trích xuất dữ liệu từ các văn bản hành chính.
+class DeepSeekService:
+    MODEL_NAME = "qwen2.5:14b"
+    SYSTEM_PROMPT = """Bạn là một chuyên gia trích xuất dữ liệu từ các văn bản hành chính.
                     Hãy loại bỏ các phần như Cộng hòa, ...
                     Hãy trả về dưới định dạng JSON với các trường sau:
                     {{
@@ -28,16 +21,35 @@ class DeepSeekService:
                         "trich_yeu": "Tên của văn bản này, thường ở sau phần loại văn bản",
                         "nguoi_ky": "Người ký văn bản này, thường ở phần cuối của văn bản " 
                     }}
-                    Giữ nguyên giá trị của các trường sao cho đúng với văn bản gốc nhất có thể trừ trường hợp sai ngữ pháp hãy sửa lại, Nếu không có giá trị nào thì để giá trị Không có."""),
+                    Giữ nguyên giá trị của các trường sao cho đúng với văn bản gốc nhất có thể trừ trường hợp sai ngữ pháp hãy sửa lại, Nếu không có giá trị nào thì để giá trị Không có."""
+    OPTIONS = {
+        # Room for the system prompt plus the head and tail OCR text
+        "num_ctx": 4096,
+        "temperature": 0.1,
+        "top_k": 50,
+        "top_p": 0.95,
+    }
+
+    _instance = None
+    _chain = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if DeepSeekService._chain is None:
+            prompt_template = ChatPromptTemplate.from_messages([
+                ("system", self.SYSTEM_PROMPT),
                 ("human","{question}"),
             ])
 
             model = OllamaLLM(
-                model="qwen2.5:14b",
-                temperature=0.1,
-                top_k=50,
-                top_p=0.95,
-                format="json"
+                model=self.MODEL_NAME,
+                base_url=settings.OLLAMA_BASE_URL,
+                format="json",
+                **self.OPTIONS
             )
             DeepSeekService._chain = prompt_template | model
 
@@ -53,7 +65,7 @@ class DeepSeekService:
 
             # Parse JSON response
             json_response = json.loads(response)
-            gc.collect()
+            memory_governor.checkpoint("deepseek.get_response_ocr")
             return json_response
         except json.JSONDecodeError as e:
             # Xử lý lỗi nếu response không phải JSON hợp lệ
@@ -67,4 +79,32 @@ class DeepSeekService:
              "error": str(e)
             }
 
+    async def aget_response_ocr(self, question: str):
+        """
+        Async version of get_response_ocr over the shared Ollama connection pool
+        """
+        response = ""
+        try:
+            response = await ollama_client.chat(
+                self.MODEL_NAME,
+                [
+                    {"role": "system", "content": self.SYSTEM_PROMPT.replace("{{", "{").replace("}}", "}")},
+                    {"role": "user", "content": question},
+                ],
+                format="json",
+                options=self.OPTIONS,
+            )
+            print("Raw response from model:", response)
+            return json.loads(response)
+        except json.JSONDecodeError as e:
+            return {
+                "answer": response,
+                "error": f"JSON parsing error: {str(e)}"
+            }
+        except Exception as e:
+            return {
+             "answer": "Error occurred while processing request",
+             "error": str(e)
+            }
+
 deepseek_service = DeepSeekService()
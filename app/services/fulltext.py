@@ -0,0 +1,155 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+
+
+def _init_worker():
+    # Each worker OCRs one page at a time; tesseract's own OpenMP threads
+    # would only fight the other workers for the same cores
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    os.environ["OMP_NUM_THREADS"] = "1"
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def _ocr_page(pdf_path: str, page_num: int, dpi: int, psm: int) -> Tuple[int, str, Dict[str, Any]]:
+    """
+    Render one page, preprocess and OCR it in the worker process. The report
+    holds the preprocessing profile and per-step milliseconds (render,
+    preprocessing steps, ocr, total).
+    """
+    import numpy as np
+    import pytesseract
+    from pdf2image import convert_from_path
+    from app.services.tesseract import tesseract_service
+
+    start = time.perf_counter()
+    report: Dict[str, Any] = {"timings_ms": {}}
+    timings = report["timings_ms"]
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_num, last_page=page_num, grayscale=True)
+    timings["render"] = (time.perf_counter() - start) * 1000
+    if not images:
+        timings["total"] = timings["render"]
+        return page_num, "", report
+
+    processed = tesseract_service.preprocess_for_ocr(np.array(images[0]), report=report)
+    del images
+    mark = time.perf_counter()
+    text = pytesseract.image_to_string(processed, lang=tesseract_service.lang, config=f'--psm {psm}')
+    text = tesseract_service.clean_vietnamese_text(text)
+    timings["ocr"] = (time.perf_counter() - mark) * 1000
+    timings["total"] = (time.perf_counter() - start) * 1000
+    return page_num, text, report
+
+
+class FullTextOCRService:
+    """
+    Full-document Tesseract OCR spread page by page over a process pool.
+
+    Pages are rendered inside the workers from the PDF path, so only the
+    recognised text crosses process boundaries. The pool is sized to the
+    CPU cores and tesseract runs single-threaded in each worker.
+    """
+
+    def __init__(self, workers: int = None, dpi: int = None, psm: int = None):
+        self.workers = workers or settings.FULLTEXT_OCR_WORKERS or os.cpu_count() or 1
+        self.dpi = dpi or settings.FULLTEXT_OCR_DPI
+        self.psm = psm or settings.FULLTEXT_OCR_PSM
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking the multithreaded server (uvicorn, torch/OpenMP pools,
+            # tesserocr handles) can deadlock a child on a lock held by
+            # another thread; workers start clean and _init_worker sets them up
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    async def stream_pages(self, pdf_path: str, page_numbers: List[int]) -> AsyncIterator[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Yield (page, text, report) in page order as soon as each page and all
+        pages before it are done. At most workers * 2 pages per request are
+        queued on the shared pool, so one long document can't starve others.
+        """
+        window = self.workers * 2
+        pending = deque()
+        remaining = iter(page_numbers)
+
+        def submit_next():
+            page_num = next(remaining, None)
+            if page_num is not None:
+                pending.append(asyncio.wrap_future(
+                    self.executor.submit(_ocr_page, pdf_path, page_num, self.dpi, self.psm)))
+
+        try:
+            for _ in range(window):
+                submit_next()
+            while pending:
+                result = await pending[0]
+                pending.popleft()
+                submit_next()
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def extract_text(self, pdf_path: str, total_pages: int) -> Tuple[List[str], Dict[str, Any]]:
+        """OCR every page; returns per-page text and throughput stats"""
+        start = time.perf_counter()
+        texts, reports = [], []
+        async for _, text, report in self.stream_pages(pdf_path, list(range(1, total_pages + 1))):
+            texts.append(text)
+            reports.append(report)
+        return texts, self.summarize(texts, time.perf_counter() - start, reports)
+
+    def summarize(self, texts: List[str], elapsed: float,
+                  reports: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Throughput stats; with per-page reports also the summed milliseconds
+        of each step across pages and how many pages used each profile.
+        """
+        cores = min(self.workers, max(len(texts), 1))
+        pages_per_sec = len(texts) / elapsed if elapsed > 0 else 0.0
+        steps: Dict[str, float] = {}
+        profiles: Dict[str, int] = {}
+        for report in reports or []:
+            for step, ms in report.get("timings_ms", {}).items():
+                steps[step] = steps.get(step, 0.0) + ms
+            if "profile" in report:
+                profiles[report["profile"]] = profiles.get(report["profile"], 0) + 1
+        return {
+            "pages": len(texts),
+            "content_length": sum(len(text) for text in texts),
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "workers": self.workers,
+            "pages_per_sec": round(pages_per_sec, 3),
+            "pages_per_sec_per_core": round(pages_per_sec / cores, 3),
+            "profiles": profiles,
+            "steps_ms": {step: round(ms, 1) for step, ms in steps.items()},
+        }
+
+    @staticmethod
+    def response_headers(stats: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, str]:
+        """Add OCR throughput to an endpoint's headers"""
+        headers["X-Fulltext-Pages"] = str(stats["pages"])
+        headers["X-Fulltext-Pages-Per-Sec-Core"] = str(stats["pages_per_sec_per_core"])
+        metric = f"ocr;dur={stats['elapsed_ms']:.1f}"
+        headers["Server-Timing"] = f"{headers['Server-Timing']}, {metric}" if headers.get("Server-Timing") else metric
+        return headers
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+fulltext_service = FullTextOCRService()
@@ -1,27 +1,40 @@
+import asyncio
 import io
-from typing import Tuple
+from typing import Tuple, Union
 
 import PyPDF2
 from google.api_core.client_options import ClientOptions
 from google.cloud import documentai  # type: ignore
 import os
 
+PROCESSOR_VERSION_ID = "pretrained-foundation-model-v1.5-pro-2025-06-20"
+# Số trang đầu/cuối gửi sang Document AI; PAGE_PRESET nằm trong khóa cache kết quả
+HEAD_PAGES = 3
+TAIL_PAGES = 2
+PAGE_PRESET = f"head{HEAD_PAGES}-tail{TAIL_PAGES}"
 
-async def process_pdf_from_content(content: bytes) -> Tuple[bytes, int]:
+
+async def process_pdf_from_content(content: Union[bytes, str]) -> Tuple[bytes, int]:
     """
-    Xử lý PDF từ binary content và lấy 3 trang đầu + 2 trang cuối
+    Xử lý PDF từ binary content và lấy HEAD_PAGES trang đầu + TAIL_PAGES trang cuối.
+    PyPDF2 đọc/ghi đồng bộ nên chạy trong thread, không chặn event loop.
 
     Args:
-        content (bytes): Dữ liệu binary của file PDF
+        content (bytes | str): Dữ liệu binary của file PDF, hoặc đường dẫn tới file đã spool
     Returns:
         Tuple[bytes, int]: Trả về bytes của PDF mới và tổng số trang
     """
+    return await asyncio.to_thread(extract_head_tail_pages, content)
+
+
+def extract_head_tail_pages(content: Union[bytes, str]) -> Tuple[bytes, int]:
+    """Phần đồng bộ của process_pdf_from_content"""
     input_stream = None
     output_stream = None
 
     try:
-        # Tạo BytesIO object từ content
-        input_stream = io.BytesIO(content)
+        # Đọc trực tiếp từ file nếu có đường dẫn, tránh nạp cả PDF vào RAM
+        input_stream = open(content, 'rb') if isinstance(content, str) else io.BytesIO(content)
 
         # Đọc PDF từ stream
         pdf_reader = PyPDF2.PdfReader(input_stream)
@@ -30,22 +43,22 @@ async def process_pdf_from_content(content: bytes) -> Tuple[bytes, int]:
         print(f"PDF có {total_pages} trang")
 
         # Kiểm tra số trang tối thiểu
-        if total_pages < 5:
-            print("Cảnh báo: PDF có ít hơn 5 trang. Sẽ lấy tất cả các trang có sẵn.")
+        if total_pages < HEAD_PAGES + TAIL_PAGES:
+            print(f"Cảnh báo: PDF có ít hơn {HEAD_PAGES + TAIL_PAGES} trang. Sẽ lấy tất cả các trang có sẵn.")
 
         # Tạo PDF writer
         pdf_writer = PyPDF2.PdfWriter()
 
-        # Lấy 3 trang đầu
-        pages_to_extract = min(3, total_pages)
+        # Lấy các trang đầu
+        pages_to_extract = min(HEAD_PAGES, total_pages)
         for i in range(pages_to_extract):
             page = pdf_reader.pages[i]
             pdf_writer.add_page(page)
             print(f"Đã thêm trang {i + 1}")
 
-        # Lấy 2 trang cuối (nếu có đủ trang và không trùng với 3 trang đầu)
-        if total_pages > 3:
-            last_pages_to_extract = min(2, total_pages - 3)
+        # Lấy các trang cuối (nếu có đủ trang và không trùng với các trang đầu)
+        if total_pages > HEAD_PAGES:
+            last_pages_to_extract = min(TAIL_PAGES, total_pages - HEAD_PAGES)
             start_index = total_pages - last_pages_to_extract
 
             for i in range(start_index, total_pages):
@@ -147,7 +160,7 @@ def create_google_service(credentials_file=None):
         processor_id="76aaa781c27b4c19",
         mime_type="application/pdf",
         field_mask="entities",
-        processor_version_id="pretrained-foundation-model-v1.5-pro-2025-06-20",
+        processor_version_id=PROCESSOR_VERSION_ID,
         credentials_file=credentials_file
     )
 
@@ -6,6 +6,8 @@ import logging
 import os
 import numpy as np
 
+from app.utils.page import Page
+
 logger = logging.getLogger(__name__)
 
 
@@ -149,7 +151,8 @@ class GovernmentDocPDFService:
             page_numbers: Specific pages to convert (None = all)
 
         Returns:
-            Dictionary with images and metadata
+            Dictionary with images (encoded bytes), pages (the same images as
+            Pages, decoded raster kept) and metadata
         """
         try:
             # Conversion parameters
@@ -171,6 +174,7 @@ class GovernmentDocPDFService:
             images = convert_from_bytes(pdf_content, **convert_params)
 
             processed_images = []
+            pages = []
             metadata = []
             total_size = 0
 
@@ -244,6 +248,8 @@ class GovernmentDocPDFService:
                 total_size += img_size
 
                 processed_images.append(img_bytes)
+                # Raster and encoded bytes together: backends that need pixels skip the decode
+                pages.append(Page(image=image, data=img_bytes, codec=self.output_format.lower(), number=page_num))
 
                 metadata.append({
                     'page': page_num,
@@ -257,6 +263,7 @@ class GovernmentDocPDFService:
 
             result = {
                 'images': processed_images,
+                'pages': pages,
                 'metadata': metadata,
                 'total_pages': len(processed_images),
                 'total_size_mb': total_size / (1024 * 1024),
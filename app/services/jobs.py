@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import ipaddress
+import logging
+import os
+import shutil
+import socket
+import time
+import uuid
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from redis import Redis
+from rq import Queue
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+
+from app.config.settings import settings
+from app.utils.upload import SpooledPDF, UploadTooLargeError
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("qwen", "google")
+INPUT_KEY_PREFIX = "pdfjob:input:"
+
+_redis: Optional[Redis] = None
+
+
+def get_redis() -> Redis:
+    """Shared Redis connection, created on first use from REDIS_URL"""
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+def set_redis(connection: Redis):
+    """Swap the connection, e.g. for a fakeredis instance in tests"""
+    global _redis
+    _redis = connection
+
+
+def get_queue(is_async: bool = True) -> Queue:
+    return Queue(settings.JOB_QUEUE_NAME, connection=get_redis(),
+                 default_timeout=settings.JOB_TIMEOUT, is_async=is_async)
+
+
+def validate_webhook_url(webhook_url: str) -> str:
+    """
+    Reject webhook targets a worker must not POST results to: anything but
+    http(s), hosts outside JOB_WEBHOOK_ALLOWED_HOSTS when it is set, and
+    otherwise hosts resolving to private, loopback, link-local or reserved
+    addresses. Raises ValueError; resolves DNS, so call off the event loop.
+    """
+    parsed = urlsplit(webhook_url)
+    host = (parsed.hostname or "").lower()
+    if parsed.scheme not in ("http", "https") or not host:
+        raise ValueError("webhook_url must be an http(s) URL with a host")
+    if settings.JOB_WEBHOOK_ALLOWED_HOSTS:
+        if host not in settings.JOB_WEBHOOK_ALLOWED_HOSTS:
+            raise ValueError(f"webhook_url host '{host}' is not allowed")
+        return webhook_url
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parsed.port or None)}
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"webhook_url host '{host}' does not resolve: {e}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"webhook_url host '{host}' resolves to a non-public address")
+    return webhook_url
+
+
+def sweep_inputs():
+    """Remove job PDFs in JOB_INPUT_DIR that no worker picked up within JOB_INPUT_TTL"""
+    cutoff = time.time() - settings.JOB_INPUT_TTL
+    for entry in os.scandir(settings.JOB_INPUT_DIR):
+        try:
+            if entry.name.endswith(".pdf") and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def store_input(pdf: SpooledPDF, job_id: str) -> str:
+    """
+    Hand the spooled PDF to the workers: moved into JOB_INPUT_DIR when set,
+    otherwise copied into Redis with a TTL if it is within JOB_REDIS_MAX_BYTES.
+    Returns the path or Redis key the job reads it from.
+    """
+    if settings.JOB_INPUT_DIR:
+        os.makedirs(settings.JOB_INPUT_DIR, exist_ok=True)
+        sweep_inputs()
+        path = os.path.join(settings.JOB_INPUT_DIR, f"{job_id}.pdf")
+        try:
+            # The spool file is gone afterwards, so closing the SpooledPDF is a no-op
+            os.replace(pdf.path, path)
+        except OSError:
+            # Spool dir on another filesystem
+            shutil.copyfile(pdf.path, path)
+        return path
+
+    if pdf.size > settings.JOB_REDIS_MAX_BYTES:
+        raise UploadTooLargeError(settings.JOB_REDIS_MAX_BYTES)
+    input_key = f"{INPUT_KEY_PREFIX}{job_id}"
+    get_redis().set(input_key, pdf.read_bytes(), ex=settings.JOB_INPUT_TTL)
+    return input_key
+
+
+def enqueue_extraction(pdf: SpooledPDF, backend: str = "qwen", cache: str = "use",
+                       webhook_url: Optional[str] = None, result_ttl: Optional[int] = None,
+                       is_async: bool = True) -> str:
+    """
+    Store the PDF where every worker can read it and enqueue an extraction
+    job for the worker fleet. Blocking (Redis, DNS, file moves); call off the
+    event loop.
+
+    The PDF travels through JOB_INPUT_DIR or Redis rather than the job
+    arguments, and expires on its own if no worker picks it up.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if result_ttl is not None and result_ttl <= 0:
+        raise ValueError("result_ttl must be a positive number of seconds")
+    if webhook_url:
+        validate_webhook_url(webhook_url)
+
+    job_id = uuid.uuid4().hex
+    input_ref = store_input(pdf, job_id)
+
+    ttl = settings.JOB_RESULT_TTL if result_ttl is None else result_ttl
+    try:
+        get_queue(is_async=is_async).enqueue(
+            run_extraction_job,
+            args=(input_ref, backend, cache, webhook_url),
+            kwargs={"sha256": pdf.sha256, "size": pdf.size},
+            job_id=job_id,
+            result_ttl=ttl,
+            failure_ttl=ttl,
+            meta={"backend": backend, "webhook_url": webhook_url},
+        )
+    except Exception:
+        discard_input(input_ref)
+        raise
+    return job_id
+
+
+def discard_input(input_ref: str):
+    try:
+        if input_ref.startswith(INPUT_KEY_PREFIX):
+            get_redis().delete(input_ref)
+        elif os.path.exists(input_ref):
+            os.remove(input_ref)
+    except Exception as e:
+        logger.warning(f"Could not discard job input {input_ref}: {str(e)}")
+
+
+def load_input(input_ref: str, sha256: Optional[str] = None, size: Optional[int] = None) -> SpooledPDF:
+    """The job's PDF as a local SpooledPDF; it is deleted when the SpooledPDF is closed"""
+    if input_ref.startswith(INPUT_KEY_PREFIX):
+        content = get_redis().get(input_ref)
+        if content is None:
+            raise ValueError("Job input expired or missing")
+        # The renderers read from a file path, so spool the Redis copy to local disk
+        pdf = SpooledPDF.from_bytes(content)
+        get_redis().delete(input_ref)
+        return pdf
+
+    if not os.path.exists(input_ref):
+        raise ValueError("Job input expired or missing")
+    if sha256 is None or size is None:
+        # Enqueued without the digest; hash the shared copy in chunks
+        digest = hashlib.sha256()
+        with open(input_ref, "rb") as f:
+            for chunk in iter(lambda: f.read(settings.UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        sha256, size = digest.hexdigest(), os.path.getsize(input_ref)
+    return SpooledPDF(input_ref, size, sha256)
+
+
+def run_extraction_job(input_ref: str, backend: str, cache: str = "use",
+                       webhook_url: Optional[str] = None, sha256: Optional[str] = None,
+                       size: Optional[int] = None) -> Dict[str, Any]:
+    """Worker entry point: run the same pipeline the HTTP endpoints use"""
+    job_id = os.path.splitext(os.path.basename(input_ref))[0].rsplit(":", 1)[-1]
+    try:
+        # app.worker preloads these so forked work-horses don't re-import them
+        if backend == "google":
+            from app.routers.google_router import extract_pdf_google as extract
+        else:
+            from app.routers.pdf_router import extract_pdf_qwen as extract
+
+        from app.services.ollama_client import ollama_client
+
+        async def extract_and_close(pdf: SpooledPDF):
+            try:
+                return await extract(pdf, cache)
+            finally:
+                # The loop ends with this job; don't leave its Ollama connections open
+                await ollama_client.aclose()
+
+        with load_input(input_ref, sha256, size) as pdf:
+            result, _ = asyncio.run(extract_and_close(pdf))
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {str(e)}")
+        notify_webhook(webhook_url, {"job_id": job_id, "status": "failed", "error": str(e)})
+        raise
+
+    notify_webhook(webhook_url, {"job_id": job_id, "status": "finished", "result": result})
+    return result
+
+
+def notify_webhook(webhook_url: Optional[str], payload: Dict[str, Any]):
+    """POST the job outcome; delivery failures are logged, never raised"""
+    if not webhook_url:
+        return
+    try:
+        # Checked again at delivery: DNS may have changed since the job was submitted
+        validate_webhook_url(webhook_url)
+        response = httpx.post(webhook_url, json=payload, timeout=settings.JOB_WEBHOOK_TIMEOUT)
+        response.raise_for_status()
+    except Exception as e:
+        logger.warning(f"Webhook delivery to {webhook_url} failed: {str(e)}")
+
+
+def fetch_job(job_id: str) -> Optional[Job]:
+    """The job, or None if it never existed or expired; blocking, call off the event loop"""
+    try:
+        return Job.fetch(job_id, connection=get_redis())
+    except NoSuchJobError:
+        return None
+
+
+def describe_job(job: Job) -> Dict[str, Any]:
+    """Status summary of a job; blocking, call off the event loop"""
+    status = job.get_status(refresh=True)
+    info = {
+        "job_id": job.id,
+        "status": status.value if hasattr(status, "value") else status,
+        "backend": job.meta.get("backend"),
+        "enqueued_at": job.enqueued_at.isoformat() if job.enqueued_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "ended_at": job.ended_at.isoformat() if job.ended_at else None,
+    }
+    # is_queued/is_failed would each re-read the status from Redis
+    if info["status"] == "queued":
+        info["position"] = job.get_position()
+    if info["status"] == "failed" and job.exc_info:
+        # Last line of the traceback is the exception message
+        info["error"] = job.exc_info.strip().splitlines()[-1]
+    return info
@@ -0,0 +1,154 @@
+import gc
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from app.config.settings import settings
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class MemoryGovernor:
+    """
+    Single place that decides when to reclaim memory.
+
+    Model calls used to run gc.collect() and torch.cuda.empty_cache() before
+    and after every generation. A full collection walks the whole heap (the
+    loaded model included) and emptying the CUDA cache makes the next call
+    re-allocate its blocks, so both cost latency on every request while
+    rarely freeing anything. checkpoint() samples process RSS, available RAM
+    and the CUDA allocator instead, and only reclaims when a sample crosses a
+    watermark. Each reclaim is recorded with what it freed.
+    """
+
+    def __init__(self, enabled: bool = None, rss_high_mb: int = None, available_low_mb: int = None,
+                 cuda_high_watermark: float = None, cooldown_s: float = None, max_events: int = 100):
+        self.enabled = settings.MEMORY_GOVERNOR_ENABLED if enabled is None else enabled
+        self.rss_high_mb = settings.MEMORY_RSS_HIGH_MB if rss_high_mb is None else rss_high_mb
+        self.available_low_mb = settings.MEMORY_AVAILABLE_LOW_MB if available_low_mb is None else available_low_mb
+        self.cuda_high_watermark = (settings.MEMORY_CUDA_HIGH_WATERMARK
+                                    if cuda_high_watermark is None else cuda_high_watermark)
+        self.cooldown_s = settings.MEMORY_RECLAIM_COOLDOWN_S if cooldown_s is None else cooldown_s
+        self._process = psutil.Process()
+        self._cuda_total = None
+        self._lock = threading.Lock()
+        self._last_reclaim = float("-inf")
+
+        # Metrics
+        self.checkpoints = 0
+        self.reclaims = 0
+        self.skipped_cooldown = 0
+        self.reclaim_ms = 0.0
+        self.events: "deque[Dict[str, Any]]" = deque(maxlen=max_events)
+
+    @staticmethod
+    def cuda_available() -> bool:
+        return torch is not None and torch.cuda.is_available()
+
+    def sample(self) -> Dict[str, float]:
+        """Current process RSS, available system RAM and CUDA allocator usage, in MB"""
+        sample = {
+            "rss_mb": self._process.memory_info().rss / MB,
+            "available_mb": psutil.virtual_memory().available / MB,
+        }
+        if self.cuda_available():
+            if self._cuda_total is None:
+                self._cuda_total = torch.cuda.get_device_properties(0).total_memory / MB
+            sample["cuda_allocated_mb"] = torch.cuda.memory_allocated(0) / MB
+            sample["cuda_reserved_mb"] = torch.cuda.memory_reserved(0) / MB
+            sample["cuda_total_mb"] = self._cuda_total
+        return sample
+
+    def pressure(self, sample: Dict[str, float]) -> List[str]:
+        """Watermarks the sample is past: "rss", "available" and/or "cuda" """
+        reasons = []
+        if self.rss_high_mb and sample["rss_mb"] > self.rss_high_mb:
+            reasons.append("rss")
+        if sample["available_mb"] < self.available_low_mb:
+            reasons.append("available")
+        if "cuda_reserved_mb" in sample and \
+                sample["cuda_reserved_mb"] > sample["cuda_total_mb"] * self.cuda_high_watermark:
+            reasons.append("cuda")
+        return reasons
+
+    def checkpoint(self, tag: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Call where a cleanup used to be. Reclaims only under pressure, or
+        every time when the governor is disabled (the previous behaviour).
+        Returns the reclaim event, or None if nothing was done.
+        """
+        with self._lock:
+            self.checkpoints += 1
+        if not self.enabled:
+            return self.reclaim(["always"], tag, cuda=self.cuda_available())
+
+        reasons = self.pressure(self.sample())
+        if not reasons:
+            return None
+        with self._lock:
+            if time.monotonic() - self._last_reclaim < self.cooldown_s:
+                self.skipped_cooldown += 1
+                return None
+        return self.reclaim(reasons, tag, cuda="cuda" in reasons)
+
+    def reclaim(self, reasons: List[str], tag: str = "", cuda: bool = None) -> Dict[str, Any]:
+        """Run gc.collect() (and torch.cuda.empty_cache() for GPU pressure) and record what it freed"""
+        if cuda is None:
+            cuda = self.cuda_available()
+        before = self.sample()
+        start = time.perf_counter()
+        collected = gc.collect()
+        if cuda:
+            torch.cuda.empty_cache()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        after = self.sample()
+
+        event = {
+            "time": time.time(),
+            "tag": tag,
+            "reason": ",".join(reasons),
+            "ms": round(elapsed_ms, 2),
+            "objects_collected": collected,
+            "rss_freed_mb": round(before["rss_mb"] - after["rss_mb"], 1),
+        }
+        if "cuda_reserved_mb" in before:
+            event["cuda_freed_mb"] = round(before["cuda_reserved_mb"] - after["cuda_reserved_mb"], 1)
+        with self._lock:
+            self._last_reclaim = time.monotonic()
+            self.reclaims += 1
+            self.reclaim_ms += elapsed_ms
+            self.events.append(event)
+        if self.enabled:
+            logger.info(f"Memory reclaim ({event['reason']}) at {tag}: {event}")
+        return event
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "watermarks": {
+                "rss_high_mb": self.rss_high_mb,
+                "available_low_mb": self.available_low_mb,
+                "cuda_high_watermark": self.cuda_high_watermark,
+                "cooldown_s": self.cooldown_s,
+            },
+            "current": {name: round(value, 1) for name, value in self.sample().items()},
+            "checkpoints": self.checkpoints,
+            "reclaims": self.reclaims,
+            "skipped_cooldown": self.skipped_cooldown,
+            "reclaim_ms": round(self.reclaim_ms, 1),
+            "events": list(self.events),
+        }
+
+
+memory_governor = MemoryGovernor()
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaClient:
+    """
+    Thin async client for Ollama's /api/chat.
+
+    One httpx.AsyncClient per event loop keeps a pool of keep-alive
+    connections to the Ollama server, so concurrent page calls reuse sockets
+    and never occupy a worker thread while waiting on the model. Code that
+    runs short-lived loops (asyncio.run per job) calls aclose() before the
+    loop ends; a client left behind by a loop that has since closed is
+    dropped on the next call, since it can no longer be awaited.
+    """
+
+    def __init__(self, base_url: str = None, timeout: float = None, connect_timeout: float = None,
+                 max_connections: int = None, max_keepalive_connections: int = None):
+        self.base_url = (base_url or settings.OLLAMA_BASE_URL).rstrip("/")
+        self.timeout = httpx.Timeout(
+            settings.OLLAMA_TIMEOUT if timeout is None else timeout,
+            connect=settings.OLLAMA_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout,
+        )
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or settings.OLLAMA_MAX_CONNECTIONS,
+        )
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        # An AsyncClient's pool is tied to the loop that created it
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            for stale in [other for other in self._clients if other.is_closed()]:
+                # Its sockets belong to the dead loop; releasing them is all that's left
+                del self._clients[stale]
+            client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+            self._clients[loop] = client
+        return client
+
+    async def chat(self, model: str, messages: List[Dict[str, Any]], format: str = "json",
+                   options: Dict[str, Any] = None) -> str:
+        """Send a non-streaming chat request and return the message content."""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": False,
+            "options": options or {},
+        }
+        if format:
+            payload["format"] = format
+
+        response = await self._get_client().post("/api/chat", json=payload)
+        response.raise_for_status()
+        return response.json()["message"]["content"]
+
+    async def aclose(self):
+        """Close the running loop's client and its pooled connections"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+
+ollama_client = OllamaClient()
@@ -0,0 +1,50 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from app.config.settings import settings
+from app.utils.cache import LRUCache
+
+
+class PageResponseCache:
+    """
+    Model responses keyed by the hash of the encoded page image, the prompt
+    and the model ID.
+
+    Cover pages, blank separators and repeated signature pages are identical
+    across documents, so their JSON responses can be reused instead of calling
+    the model again. Bounded by the serialized size of the stored responses.
+    """
+
+    def __init__(self, max_bytes: int = None, enabled: bool = None):
+        self.enabled = settings.PAGE_CACHE_ENABLED if enabled is None else enabled
+        self.cache = LRUCache(
+            max_bytes=settings.PAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes,
+            sizeof=lambda value: len(json.dumps(value, ensure_ascii=False).encode("utf-8")),
+        )
+
+    @staticmethod
+    def make_key(image_bytes: bytes, prompt: str, model: str) -> str:
+        image_digest = hashlib.sha256(image_bytes).hexdigest()
+        prompt_digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+        return f"{image_digest}:{prompt_digest}:{model}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        return self.cache.get(key)
+
+    def set(self, key: str, response: Dict[str, Any]):
+        # Don't pin failed calls; they should be retried next time
+        if not self.enabled or not response or "error" in response:
+            return
+        self.cache.set(key, response)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats["enabled"] = self.enabled
+        stats["model_calls_saved"] = self.cache.hits
+        return stats
+
+
+page_cache = PageResponseCache()
@@ -1,8 +1,13 @@
-from pdf2image import convert_from_bytes
-from typing import List, Tuple
+from pdf2image import convert_from_path, pdfinfo_from_path
+from typing import AsyncIterator, List, Tuple
+import asyncio
 import io
 import logging
 import os
+import tempfile
+
+from app.config.settings import settings
+from app.utils.page import Page
 
 logger = logging.getLogger(__name__)
 
@@ -10,44 +15,143 @@ A4_WIDTH = 2480
 A4_HEIGHT = 3508
 
 class PDFService:
+    def __init__(self, head_pages: int = None, tail_pages: int = None, dpi: int = None):
+        self.head_pages = settings.PDF_HEAD_PAGES if head_pages is None else head_pages
+        self.tail_pages = settings.PDF_TAIL_PAGES if tail_pages is None else tail_pages
+        self.dpi = settings.PDF_RENDER_DPI if dpi is None else dpi
+
+    @property
+    def preset(self) -> str:
+        """Identify the render settings that affect extraction results"""
+        return f"dpi{self.dpi}-head{self.head_pages}-tail{self.tail_pages}"
+
+    @staticmethod
+    def write_temp_pdf(pdf_content: bytes) -> str:
+        """Write PDF bytes to a temp file once so pdfinfo and pdftoppm can share it."""
+        fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_content)
+        return pdf_path
+
+    @staticmethod
+    def get_page_count(pdf_path: str) -> int:
+        """Read the page count from the PDF trailer without rendering anything."""
+        info = pdfinfo_from_path(pdf_path)
+        return int(info["Pages"])
+
+    def select_pages(self, total_pages: int) -> List[int]:
+        """
+        Pick the 1-based page numbers to render: the first `head_pages` and the
+        last `tail_pages`, without duplicates, in document order.
+        """
+        if total_pages <= self.head_pages + self.tail_pages:
+            return list(range(1, total_pages + 1))
+
+        head = range(1, self.head_pages + 1)
+        tail = range(total_pages - self.tail_pages + 1, total_pages + 1)
+        return sorted(set(head) | set(tail))
+
+    @staticmethod
+    def group_page_ranges(page_numbers: List[int]) -> List[Tuple[int, int]]:
+        """Collapse sorted page numbers into contiguous (first, last) ranges."""
+        ranges = []
+        for page in page_numbers:
+            if ranges and page == ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], page)
+            else:
+                ranges.append((page, page))
+        return ranges
+
     @staticmethod
-    async def convert_to_png(pdf_content: bytes) -> Tuple[List[bytes], int]:
+    def encode_png(image) -> bytes:
+        img_byte_arr = io.BytesIO()
+        image.save(img_byte_arr, format='PNG')
+        return img_byte_arr.getvalue()
+
+    def render_page(self, pdf_path: str, page_number: int) -> bytes:
+        """Render and PNG-encode a single page."""
+        return self.render_page_image(pdf_path, page_number).encode("png")
+
+    def render_page_image(self, pdf_path: str, page_number: int) -> Page:
         """
-        Convert PDF content to a list of PNG images.
-        
+        Render a single page to an in-memory Page. pdftoppm writes raw PPM,
+        so nothing is PNG-encoded (and decoded again) on the way.
+        """
+        images = convert_from_path(
+            pdf_path,
+            dpi=self.dpi,
+            fmt='ppm',
+            size=(A4_WIDTH, A4_HEIGHT),
+            first_page=page_number,
+            last_page=page_number,
+        )
+        return Page.from_image(images[0], number=page_number)
+
+    async def stream_png(self, pdf_path: str, page_numbers: List[int]) -> AsyncIterator[Tuple[int, bytes]]:
+        """
+        Yield (page_number, png_bytes) as soon as each page is rendered.
+
+        Rendering runs in a worker thread, so the consumer can run inference on
+        page N while page N+1 is being rasterized. This costs one pdftoppm launch
+        per page instead of one per range.
+        """
+        for page_number in page_numbers:
+            png_bytes = await asyncio.to_thread(self.render_page, pdf_path, page_number)
+            yield page_number, png_bytes
+
+    async def stream_pages(self, pdf_path: str, page_numbers: List[int]) -> AsyncIterator[Tuple[int, Page]]:
+        """Like stream_png, but yields decoded Pages that every backend accepts"""
+        for page_number in page_numbers:
+            page = await asyncio.to_thread(self.render_page_image, pdf_path, page_number)
+            yield page_number, page
+
+    def render_pages(self, pdf_path: str, page_numbers: List[int]) -> List[bytes]:
+        """
+        Render only the requested pages and encode each one to PNG.
+
+        Each contiguous range is a single pdftoppm call, so the default head/tail
+        policy costs two renderer launches regardless of document length.
+        """
+        png_images = []
+        for first_page, last_page in self.group_page_ranges(page_numbers):
+            images = convert_from_path(
+                pdf_path,
+                dpi=self.dpi,
+                fmt='png',
+                size=(A4_WIDTH, A4_HEIGHT),
+                first_page=first_page,
+                last_page=last_page,
+            )
+            for image in images:
+                png_images.append(self.encode_png(image))
+                image.close()
+        return png_images
+
+    async def convert_to_png(self, pdf_content: bytes) -> Tuple[List[bytes], int]:
+        """
+        Convert the selected pages of a PDF to PNG images.
+
         Args:
             pdf_content (bytes): The PDF file content
-            
+
         Returns:
-            List[bytes]: List of PNG images as bytes
+            Tuple[List[bytes], int]: PNG images of the selected pages and the total page count
 
         """
+        pdf_path = self.write_temp_pdf(pdf_content)
         try:
-            # Convert PDF to images
-            images = convert_from_bytes(pdf_content, dpi=300, fmt='png', size=(A4_WIDTH, A4_HEIGHT))
-            total_pages = len(images)
-            selected_images = []
-            if total_pages <= 5:
-                # If 5 or fewer pages, take all
-                selected_images = images
-            else:
-                # Take first 3 pages
-                selected_images.extend(images[:3])
-                # Take last 2 pages
-                selected_images.extend(images[-2:])
-
-            # Convert each image to PNG bytes
-            png_images = []
-            for i, image in enumerate(selected_images):
-                # Convert to PNG format
-                img_byte_arr = io.BytesIO()
-                image.save(img_byte_arr, format='PNG')
-                png_images.append(img_byte_arr.getvalue())
+            total_pages = await asyncio.to_thread(self.get_page_count, pdf_path)
+            page_numbers = self.select_pages(total_pages)
+            logger.info(f"Rendering pages {page_numbers} of {total_pages}")
+
+            png_images = self.render_pages(pdf_path, page_numbers)
             return png_images, total_pages
 
         except Exception as e:
             logger.error(f"Error converting PDF to PNG: {str(e)}")
             raise
+        finally:
+            os.remove(pdf_path)
 
 
 pdf_service = PDFService()
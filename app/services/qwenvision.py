@@ -7,8 +7,39 @@ import gc
 import threading
 import time
 
+from app.config.settings import settings
+from app.services.ollama_client import ollama_client
+from app.utils.page import Page
+
 
 class QwenVisionService:
+    MODEL_NAME = "qwen2.5vl:32b-q8_0"
+    # Prompt ngắn gọn để giảm tokens
+    SYSTEM_PROMPT = """Trích xuất JSON từ văn bản:
+            {{
+              "have_data": true/false,
+              "co_quan": "Cơ quan",
+              "so_van_ban": "Số văn bản", 
+              "ngay_ban_hanh": "DD/MM/YYYY",
+              "loai_van_ban": "Loại",
+              "trich_yeu": "Trích yếu",
+              "nguoi_ky": "Người ký",
+              "is_full_handwritten": 0/1
+            }}"""
+    TEMPERATURE = 0.1
+    # Tối ưu cho A6000
+    OPTIONS = {
+        "num_ctx": 2048,  # Tăng context để tận dụng VRAM
+        "num_predict": 512,  # Đủ cho JSON response
+        "num_keep": 0,  # Không giữ context cũ
+        "num_batch": 4,  # A6000 có thể handle batch lớn hơn
+        "num_thread": 8,  # Tận dụng CPU threads
+        "numa": True,  # Enable NUMA cho performance
+        "use_mmap": True,  # Memory mapping
+        "use_mlock": True,  # Lock memory
+        "low_vram": False,# Không cần low_vram với 48GB
+    }
+
     _instance = None
     _chain = None
     _model_loaded = False
@@ -30,49 +61,32 @@ class QwenVisionService:
         """Tối ưu prompt cho A6000"""
         print("Initializing optimized chain for RTX A6000...")
 
-        # Prompt ngắn gọn để giảm tokens
         prompt_template = ChatPromptTemplate.from_messages([
-            ("system", """Trích xuất JSON từ văn bản:
-            {{
-              "have_data": true/false,
-              "co_quan": "Cơ quan",
-              "so_van_ban": "Số văn bản", 
-              "ngay_ban_hanh": "DD/MM/YYYY",
-              "loai_van_ban": "Loại",
-              "trich_yeu": "Trích yếu",
-              "nguoi_ky": "Người ký",
-              "is_full_handwritten": 0/1
-            }}"""),
+            ("system", self.SYSTEM_PROMPT),
                     ("human", [{"type": "image_url", "image_url": {"url": "{question}"}}]),
         ])
 
         # Cấu hình tối ưu cho A6000 48GB
         model = ChatOllama(
-            model="qwen2.5vl:32b-q8_0",
-            temperature=0.1,
+            model=self.MODEL_NAME,
+            temperature=self.TEMPERATURE,
             format="json",
-            options={
-                # Tối ưu cho A6000
-                "num_ctx": 2048,  # Tăng context để tận dụng VRAM
-                "num_predict": 512,  # Đủ cho JSON response
-                "num_keep": 0,  # Không giữ context cũ
-                "num_batch": 4,  # A6000 có thể handle batch lớn hơn
-                "num_thread": 8,  # Tận dụng CPU threads
-                "numa": True,  # Enable NUMA cho performance
-                "use_mmap": True,  # Memory mapping
-                "use_mlock": True,  # Lock memory
-                "low_vram": False,# Không cần low_vram với 48GB
-            }
+            base_url=settings.OLLAMA_BASE_URL,
+            options=self.OPTIONS
         )
         QwenVisionService._chain = prompt_template | model
         print("Chain initialized successfully")
 
 
-    def get_response_ocr(self, question: str):
+    def get_response_ocr(self, question):
         """
         Gửi câu hỏi và nhận response dạng JSON
+
+        question: data URL của ảnh, hoặc Page (gửi dạng PNG)
         """
         response = ""
+        if isinstance(question, Page):
+            question = question.data_url("png")
         try:
             # Invoke chain
             response = self._chain.invoke({"question": question})
@@ -97,4 +111,39 @@ class QwenVisionService:
                 "error": str(e)
             }
 
+    async def aget_response_ocr(self, question: str):
+        """
+        Async version of get_response_ocr: calls Ollama /api/chat directly over
+        the shared keep-alive pool, no worker thread needed.
+        """
+        response = ""
+        try:
+            # Ollama nhận base64 thuần, bỏ prefix data URL
+            if isinstance(question, Page):
+                image_b64 = question.base64("png")
+            else:
+                image_b64 = question.split(",", 1)[1] if question.startswith("data:") else question
+            response = await ollama_client.chat(
+                self.MODEL_NAME,
+                [
+                    # Template dùng {{ }} để escape, API thì không cần
+                    {"role": "system", "content": self.SYSTEM_PROMPT.replace("{{", "{").replace("}}", "}")},
+                    {"role": "user", "content": "", "images": [image_b64]},
+                ],
+                format="json",
+                options={**self.OPTIONS, "temperature": self.TEMPERATURE},
+            )
+            print("Raw response from model:", response)
+            return json.loads(response)
+        except json.JSONDecodeError as e:
+            return {
+                "answer": response,
+                "error": f"JSON parsing error: {str(e)}"
+            }
+        except Exception as e:
+            return {
+                "answer": "Error occurred while processing request",
+                "error": str(e)
+            }
+
 qwen_service = QwenVisionService()
@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config.settings import settings
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Per-request cache modes
+CACHE_USE = "use"          # read and write
+CACHE_BYPASS = "bypass"    # neither read nor write
+CACHE_REFRESH = "refresh"  # skip the read, overwrite the stored result
+
+
+class ResultCache:
+    """
+    Content-addressed cache of final extraction results.
+
+    Keys are the SHA-256 of the PDF bytes plus backend, model and preset, so
+    a re-submitted document returns the stored result without rasterizing or
+    calling a model. Results live in a bounded in-memory LRU tier backed by a
+    SQLite tier with TTL and total-size eviction.
+    """
+
+    def __init__(self, db_path: str = None, memory_items: int = None,
+                 ttl_seconds: int = None, max_bytes: int = None, enabled: bool = None):
+        self.enabled = settings.RESULT_CACHE_ENABLED if enabled is None else enabled
+        self.db_path = db_path or settings.RESULT_CACHE_PATH
+        self.ttl_seconds = settings.RESULT_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        self.max_bytes = settings.RESULT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.memory = LRUCache(
+            max_items=settings.RESULT_CACHE_MEMORY_ITEMS if memory_items is None else memory_items)
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        # Running SUM(size) of the SQLite tier, so writes don't re-scan the table
+        self._disk_bytes: Optional[int] = None
+
+    @staticmethod
+    def make_key(content: bytes, backend: str, model: str, preset: str) -> str:
+        return ResultCache.make_key_from_digest(hashlib.sha256(content).hexdigest(), backend, model, preset)
+
+    @staticmethod
+    def make_key_from_digest(digest: str, backend: str, model: str, preset: str) -> str:
+        """Build a key from a SHA-256 already computed while spooling the upload"""
+        return f"{digest}:{backend}:{model}:{preset}"
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_created ON results(created_at)")
+            self._conn.commit()
+        if self._disk_bytes is None:
+            self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        return self._conn
+
+    def _reset(self, conn: Optional[sqlite3.Connection]):
+        """After a failed write: drop the open transaction and re-sum the tier on next use"""
+        self._disk_bytes = None
+        if conn is not None:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+
+        entry = self.memory.get(key)
+        if entry is not None:
+            value, created_at = entry
+            if self.ttl_seconds <= 0 or time.time() - created_at < self.ttl_seconds:
+                return value
+            self.memory.pop(key)
+
+        conn = None
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, created_at, size FROM results WHERE key = ?", (key,)).fetchone()
+                now = time.time()
+                if row is None or (self.ttl_seconds > 0 and now - row[1] >= self.ttl_seconds):
+                    if row is not None:
+                        conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                        conn.commit()
+                        self._disk_bytes -= row[2]
+                    self.disk_misses += 1
+                    return None
+                conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.disk_hits += 1
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache read failed: {e}")
+            with self._lock:
+                self._reset(conn)
+            return None
+
+        value = json.loads(row[0])
+        self.memory.set(key, (value, row[1]))
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+
+        now = time.time()
+        self.memory.set(key, (value, now))
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        conn = None
+        try:
+            with self._lock:
+                conn = self._connect()
+                old = conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, size, now, now))
+                self._disk_bytes += size - (old[0] if old else 0)
+                self._evict(conn, now)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache write failed: {e}")
+            with self._lock:
+                self._reset(conn)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """get() off the event loop; the SQLite tier does blocking reads and commits"""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]):
+        """set() off the event loop"""
+        await asyncio.to_thread(self.set, key, value)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired rows, then least recently used rows until under max_bytes."""
+        if self.ttl_seconds > 0:
+            cutoff = now - self.ttl_seconds
+            expired = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM results WHERE created_at <= ?", (cutoff,)).fetchone()[0]
+            if expired:
+                conn.execute("DELETE FROM results WHERE created_at <= ?", (cutoff,))
+                self._disk_bytes -= expired
+        if self.max_bytes <= 0:
+            return
+        while self._disk_bytes > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM results ORDER BY accessed_at ASC LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.memory.pop(key)
+                self._disk_bytes -= size
+                if self._disk_bytes <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        disk = {"hits": self.disk_hits, "misses": self.disk_misses, "items": 0, "bytes": 0}
+        try:
+            with self._lock:
+                items = self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                disk.update(items=items, bytes=self._disk_bytes)
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache stats failed: {e}")
+        return {
+            "enabled": self.enabled,
+            "hits": self.memory.hits + self.disk_hits,
+            "misses": self.disk_misses,
+            "memory": self.memory.stats(),
+            "disk": disk,
+            "ttl_seconds": self.ttl_seconds,
+            "max_bytes": self.max_bytes,
+        }
+
+
+result_cache = ResultCache()
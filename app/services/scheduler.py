@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the inference queue is at capacity."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InferenceScheduler:
+    """
+    Process-wide gate in front of one model (inference_scheduler for the
+    vision model, text_llm_scheduler for the text LLM).
+
+    Owns the global concurrency limit, a bounded FIFO wait queue shared by all
+    requests, and the worker threads that run blocking model calls. Slots are
+    handed to waiters strictly in arrival order, so pages from concurrent
+    uploads interleave instead of one request starving the others.
+    """
+
+    def __init__(self, max_concurrency: int = None, max_queue: int = None, name: str = "inference"):
+        self.max_concurrency = max_concurrency or settings.INFERENCE_MAX_CONCURRENCY
+        self.max_queue = settings.INFERENCE_MAX_QUEUE if max_queue is None else max_queue
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                           thread_name_prefix=name)
+        self._waiters: "deque[asyncio.Future]" = deque()
+        self._active = 0
+
+        # Metrics
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.avg_service_s = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue should have drained enough to accept work."""
+        service_s = self.avg_service_s or 1.0
+        return max(1, math.ceil(service_s * (self.queue_depth + 1) / self.max_concurrency))
+
+    def ensure_capacity(self):
+        """Fail fast before a request starts rendering if the queue is already full."""
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+
+    async def _acquire(self):
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just before cancellation, pass it on
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def _release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter in FIFO order
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Queue a model call. Coroutine functions are awaited directly on the
+        event loop; blocking functions run on the scheduler's workers.
+        """
+        self.submitted += 1
+        enqueued = time.perf_counter()
+        await self._acquire()
+        started = time.perf_counter()
+
+        self.started += 1
+        wait_s = started - enqueued
+        self.total_wait_s += wait_s
+        self.max_wait_s = max(self.max_wait_s, wait_s)
+
+        if asyncio.iscoroutinefunction(fn):
+            try:
+                return await fn(*args)
+            finally:
+                self._finish(started)
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # Free the slot when the worker thread actually finishes, even if the
+        # awaiting request is cancelled first
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._finish, started))
+        return await asyncio.wrap_future(future)
+
+    def _finish(self, started: float):
+        service_s = time.perf_counter() - started
+        # Exponential moving average keeps Retry-After responsive to load
+        self.avg_service_s = service_s if not self.avg_service_s else 0.8 * self.avg_service_s + 0.2 * service_s
+        self.completed += 1
+        self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait_s / self.started * 1000, 1) if self.started else 0.0,
+            "max_wait_ms": round(self.max_wait_s * 1000, 1),
+            "avg_service_ms": round(self.avg_service_s * 1000, 1),
+        }
+
+
+inference_scheduler = InferenceScheduler()
+text_llm_scheduler = InferenceScheduler(settings.TEXT_LLM_MAX_CONCURRENCY, settings.TEXT_LLM_MAX_QUEUE,
+                                        name="text-llm")
@@ -1,10 +1,39 @@
+import math
 import re
+import threading
+import time
 
 import pytesseract
 import os
 import cv2
 import numpy as np
 
+from app.config.settings import settings
+from app.utils.boxes import BoxArray
+from app.utils.page import Page
+from app.utils.spatial import BoxGridIndex
+
+try:
+    # Optional: in-process Tesseract API, avoids one subprocess per box
+    import tesserocr
+    from PIL import Image
+except ImportError:
+    tesserocr = None
+
+TESSERACT_ENGINES = ("words", "tesserocr", "subprocess")
+
+# Các bước tiền xử lý theo profile (sau khi chuyển sang gray):
+#   fast     - bản born-digital / scan sạch: chỉ nhị phân hoá
+#   standard - scan thường: median blur thay cho bilateral
+#   heavy    - scan nhiễu: đầy đủ như trước đây
+PREPROCESS_PROFILES = {
+    "fast": ("binarize",),
+    "standard": ("median", "contrast", "binarize", "clean"),
+    "heavy": ("denoise", "contrast", "binarize", "clean"),
+}
+# Các bước đắt có thể chạy trên ảnh thu nhỏ
+SCALABLE_STEPS = ("denoise", "contrast")
+
 # def setup_tesseract():
 #     """Setup Tesseract cho Google Colab"""
 #     pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'
@@ -17,13 +46,32 @@ import numpy as np
 #         return False
 
 class TesseractService:
-    def __init__(self, dpi = 300, lang='vie', max_chars = 200, psm = 6, pixel_margin = 20):
+    def __init__(self, dpi = 300, lang='vie', max_chars = 200, psm = 6, pixel_margin = 20, engine = None,
+                 preprocess_profile = None, preprocess_scale = None):
         self.tesseract_path = '/usr/bin/tesseract'
         self.dpi = dpi
         self.lang = lang
         self.max_chars = max_chars
         self.psm = psm
         self.pixel_margin = pixel_margin
+        # Cách lấy text cho từng box đã gộp:
+        #   words      - ghép lại các từ image_to_data đã trả về (không OCR lại)
+        #   tesserocr  - OCR lại ROI bằng một handle Tesseract giữ sẵn cho mỗi thread
+        #   subprocess - image_to_string cho từng box (cách cũ, 1 process mỗi box)
+        self.engine = (engine or settings.TESSERACT_ENGINE).lower()
+        if self.engine not in TESSERACT_ENGINES:
+            raise ValueError(f"Unknown Tesseract engine '{self.engine}', expected one of {TESSERACT_ENGINES}")
+        if self.engine == "tesserocr" and tesserocr is None:
+            print("✗ tesserocr chưa được cài, dùng engine 'words'")
+            self.engine = "words"
+        self._local = threading.local()
+        # auto: chọn profile cho từng trang theo ước lượng nhiễu
+        self.preprocess_profile = (preprocess_profile or settings.PREPROCESS_PROFILE).lower()
+        if self.preprocess_profile != "auto" and self.preprocess_profile not in PREPROCESS_PROFILES:
+            raise ValueError(f"Unknown preprocessing profile '{self.preprocess_profile}', "
+                             f"expected auto or one of {tuple(PREPROCESS_PROFILES)}")
+        # < 1: chạy các bước đắt (bilateral, CLAHE) trên ảnh thu nhỏ theo tỉ lệ này
+        self.preprocess_scale = settings.PREPROCESS_DOWNSCALE if preprocess_scale is None else preprocess_scale
         pytesseract.pytesseract.tesseract_cmd = self.tesseract_path
         try:
             langs = pytesseract.get_languages(config='vie')
@@ -33,8 +81,14 @@ class TesseractService:
 
     @staticmethod
     def read_image(path):
-        """Đọc ảnh từ file"""
-        img = cv2.imread(path)
+        """Đọc ảnh BGR từ file, hoặc từ Page / bytes đã mã hoá (không ghi file tạm)"""
+        if isinstance(path, (str, os.PathLike)):
+            img = cv2.imread(str(path))
+        else:
+            try:
+                img = Page.coerce(path).array("BGR")
+            except OSError:
+                img = None
         if img is None:
             print(f"✗ Không đọc được ảnh: {path}")
         return img
@@ -110,30 +164,92 @@ class TesseractService:
         img = cv2.morphologyEx(img, cv2.MORPH_OPEN, kernel)
         return img
 
-    def preprocess_for_ocr(self, img):
+    def median_blur(self, img):
+        """Khử nhiễu nhẹ (rẻ hơn bilateral nhiều lần)"""
+        return cv2.medianBlur(img, 3)
+
+    def estimate_noise(self, gray):
+        """
+        Ước lượng độ lệch chuẩn nhiễu của nền trang (phương pháp Immerkær),
+        trên ảnh lấy mẫu 1/2 và chỉ ở vùng nền xa chữ để nét chữ không bị
+        tính là nhiễu. Trang born-digital cho ~0.
+        """
+        sample = gray[::2, ::2]
+        kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+        response = np.abs(cv2.filter2D(sample, cv2.CV_32F, kernel))
+
+        threshold, background = cv2.threshold(sample, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        background = cv2.erode(background, np.ones((5, 5), np.uint8))
+        mask = background > 0
+        if not mask.any():
+            return 0.0
+        return float(math.sqrt(math.pi / 2) * response[mask].mean() / 6)
+
+    def choose_profile(self, noise):
+        """Profile tiền xử lý theo mức nhiễu ước lượng"""
+        if noise < settings.PREPROCESS_NOISE_LOW:
+            return "fast"
+        if noise < settings.PREPROCESS_NOISE_HIGH:
+            return "standard"
+        return "heavy"
+
+    def preprocess_for_ocr(self, img, profile=None, report=None):
         """
         Tiền xử lý ảnh cho OCR
 
         Args:
             img: Ảnh đầu vào
-            resize_a4: Có resize về A4 không
-            dpi: DPI cho A4 (150, 200, 300, 600)
+            profile: fast / standard / heavy / auto (mặc định theo cấu hình)
+            report: dict (tuỳ chọn) nhận profile đã dùng, mức nhiễu và thời gian
+                từng bước (ms) trong 'timings_ms'
         """
+        report = {} if report is None else report
+        timings = report.setdefault('timings_ms', {})
+        mark = time.perf_counter()
+
+        def record(step):
+            nonlocal mark
+            now = time.perf_counter()
+            timings[step] = timings.get(step, 0.0) + (now - mark) * 1000
+            mark = now
+
+        steps = {
+            'denoise': self.denoise_image,
+            'median': self.median_blur,
+            'contrast': self.enhance_contrast,
+            'binarize': self.binarize_image,
+            'clean': self.clean_image,
+        }
 
         # Chuyển sang gray
         img = self.convert_to_gray(img)
-
-        # Khử nhiễu
-        img = self.denoise_image(img)
-
-        # Tăng contrast
-        img = self.enhance_contrast(img)
-
-        # Binary
-        img = self.binarize_image(img)
-
-        # Làm sạch
-        img = self.clean_image(img)
+        record('gray')
+
+        profile = (profile or self.preprocess_profile).lower()
+        if profile == 'auto':
+            report['noise'] = round(self.estimate_noise(img), 3)
+            record('noise_estimate')
+            profile = self.choose_profile(report['noise'])
+        report['profile'] = profile
+        pipeline = PREPROCESS_PROFILES[profile]
+
+        # Các bước đắt chạy trên ảnh thu nhỏ rồi phóng lại kích thước gốc
+        scaled = [step for step in pipeline if step in SCALABLE_STEPS]
+        if scaled and self.preprocess_scale < 1:
+            full_size = (img.shape[1], img.shape[0])
+            img = cv2.resize(img, None, fx=self.preprocess_scale, fy=self.preprocess_scale,
+                             interpolation=cv2.INTER_AREA)
+            record('downscale')
+            for step in scaled:
+                img = steps[step](img)
+                record(step)
+            img = cv2.resize(img, full_size, interpolation=cv2.INTER_LINEAR)
+            record('upscale')
+            pipeline = [step for step in pipeline if step not in SCALABLE_STEPS]
+
+        for step in pipeline:
+            img = steps[step](img)
+            record(step)
 
         return img
 
@@ -149,23 +265,8 @@ class TesseractService:
         data = pytesseract.image_to_data(img, lang=self.lang, config=config,
                                          output_type=pytesseract.Output.DICT)
 
-        boxes = []
-        n = len(data['text'])
-
-        for i in range(n):
-            if data['text'][i].strip():
-                box = {
-                    'x': data['left'][i],
-                    'y': data['top'][i],
-                    'width': data['width'][i],
-                    'height': data['height'][i],
-                    'text': data['text'][i],
-                    'conf': data['conf'][i],
-                    'block': data['block_num'][i],
-                    'line': data['line_num'][i],
-                    'word': data['word_num'][i]
-                }
-                boxes.append(box)
+        # Lưu dạng cột (BoxArray) thay vì một dict cho mỗi từ
+        boxes = BoxArray.from_tesseract_data(data)
 
         print(f"✓ Tìm thấy {len(boxes)} text boxes")
         return boxes
@@ -176,9 +277,13 @@ class TesseractService:
         Kiểm tra 2 boxes có overlap không
 
         Args:
-            box1, box2: Hai boxes cần kiểm tra
+            box1, box2: Hai boxes cần kiểm tra; box2 là BoxArray thì trả về
+                mảng bool cho mọi box trong đó (tính vector hoá)
             margin: Khoảng cách pixel coi là gần nhau
         """
+        if isinstance(box2, BoxArray):
+            return box2.overlaps(box1, margin)
+
         x1 = box1['x'] - margin
         y1 = box1['y'] - margin
         x1_end = box1['x'] + box1['width'] + margin
@@ -220,62 +325,99 @@ class TesseractService:
         Gộp các boxes overlap lại với nhau
 
         Args:
-            boxes: Danh sách boxes
+            boxes: BoxArray hoặc danh sách boxes (dict)
+        Returns:
+            BoxArray các box đã gộp
         """
-        if not boxes:
-            return []
-
-        merged = []
-        used = [False] * len(boxes)
+        if not isinstance(boxes, BoxArray):
+            boxes = BoxArray.from_dicts(boxes)
+        if not len(boxes):
+            return boxes
+
+        margin = self.pixel_margin
+        # Hai box "overlap" khi khoảng cách giữa chúng <= 2 * margin
+        reach = 2 * margin
+        index = BoxGridIndex(boxes)
+        xs, ys = boxes.x.tolist(), boxes.y.tolist()
+        x_ends, y_ends = boxes.x_end.tolist(), boxes.y_end.tolist()
+        confs = boxes.conf.tolist()
+        merged = {'x': [], 'y': [], 'width': [], 'height': [], 'text': [], 'conf': [], 'seed': []}
 
         for i in range(len(boxes)):
-            if used[i]:
+            if i not in index:
                 continue
-
-            current = boxes[i].copy()
-            used[i] = True
-
-            # Tìm tất cả boxes overlap với current
-            merged_any = True
-            while merged_any:
-                merged_any = False
-                for j in range(len(boxes)):
-                    if not used[j] and self.check_overlap(current, boxes[j], self.pixel_margin):
-                        current = self.merge_two_boxes(current, boxes[j])
-                        used[j] = True
-                        merged_any = True
-
-            merged.append(current)
-
-        print(f"✓ Đã gộp: {len(boxes)} → {len(merged)} boxes")
-        return merged
+            index.remove(i)
+
+            # Nhóm của box i: mọi box chưa dùng chạm vào khung bao đang lớn dần
+            # (check_overlap với margin = giao với khung nới thêm 2 * margin).
+            # Khung chỉ lớn lên nên nhóm không phụ thuộc thứ tự thêm vào, và mỗi
+            # lần chỉ cần tìm trong phần khung vừa nới ra.
+            members = []
+            x0, y0, x1, y1 = xs[i], ys[i], x_ends[i], y_ends[i]
+            frame = (x0 - reach, y0 - reach, x1 + reach, y1 + reach)
+            hits = index.query(*frame)
+            while hits:
+                for j in hits:
+                    index.remove(j)
+                    members.append(j)
+                    x0 = min(x0, xs[j])
+                    y0 = min(y0, ys[j])
+                    x1 = max(x1, x_ends[j])
+                    y1 = max(y1, y_ends[j])
+                grown = (x0 - reach, y0 - reach, x1 + reach, y1 + reach)
+                hits = index.query_growth(frame, grown)
+                frame = grown
+
+            # Gộp theo đúng thứ tự quét của cách cũ (từng lượt theo chỉ số tăng dần,
+            # như merge_two_boxes) để text và conf giống hệt
+            text, conf = boxes.text[i], confs[i]
+            cx0, cy0, cx1, cy1 = xs[i], ys[i], x_ends[i], y_ends[i]
+            pending = sorted(members)
+            while pending:
+                remaining = []
+                for j in pending:
+                    if cx1 + reach >= xs[j] and x_ends[j] + reach >= cx0 and \
+                            cy1 + reach >= ys[j] and y_ends[j] + reach >= cy0:
+                        cx0, cy0 = min(cx0, xs[j]), min(cy0, ys[j])
+                        cx1, cy1 = max(cx1, x_ends[j]), max(cy1, y_ends[j])
+                        text = f"{text} {boxes.text[j]}".strip()
+                        conf = min(conf, confs[j])
+                    else:
+                        remaining.append(j)
+                if len(remaining) == len(pending):
+                    break
+                pending = remaining
+
+            merged['x'].append(x0)
+            merged['y'].append(y0)
+            merged['width'].append(x1 - x0)
+            merged['height'].append(y1 - y0)
+            merged['text'].append(text)
+            merged['conf'].append(conf)
+            merged['seed'].append(i if not members else -1)
+
+        # Box không gộp với ai giữ nguyên block/line/word
+        seeds = np.asarray(merged.pop('seed'), dtype=np.intp)
+        single = seeds >= 0
+        attrs = {}
+        for key in ('block', 'line', 'word'):
+            column = np.full(len(seeds), -1, dtype=np.int32)
+            column[single] = getattr(boxes, key)[seeds[single]]
+            attrs[key] = column
+        result = BoxArray(**merged, **attrs)
+
+        print(f"✓ Đã gộp: {len(boxes)} → {len(result)} boxes")
+        return result
 
     def merge_boxes_by_line(self, boxes, y_threshold=10):
-        """Gộp boxes theo dòng (cùng tọa độ y)"""
-        if not boxes:
-            return []
-
-        # Sắp xếp theo y, sau đó x
-        sorted_boxes = sorted(boxes, key=lambda b: (b['y'], b['x']))
-
-        lines = []
-        current_line = [sorted_boxes[0]]
-        current_y = sorted_boxes[0]['y']
-
-        for box in sorted_boxes[1:]:
-            # Nếu cùng dòng (y gần nhau)
-            if abs(box['y'] - current_y) <= y_threshold:
-                current_line.append(box)
-            else:
-                # Gộp dòng hiện tại
-                if current_line:
-                    lines.append(self.merge_line_boxes(current_line))
-                current_line = [box]
-                current_y = box['y']
-
-        # Gộp dòng cuối
-        if current_line:
-            lines.append(self.merge_line_boxes(current_line))
+        """Gộp boxes theo dòng (cùng tọa độ y), trả về BoxArray các dòng"""
+        if not isinstance(boxes, BoxArray):
+            boxes = BoxArray.from_dicts(boxes)
+        if not len(boxes):
+            return boxes
+
+        # Sắp xếp theo y rồi x, cắt dòng và gộp bằng các phép toán trên mảng
+        lines = boxes.merge_by_line(y_threshold)
 
         print(f"✓ Gộp theo dòng: {len(boxes)} → {len(lines)} dòng")
         return lines
@@ -306,40 +448,81 @@ class TesseractService:
     # ===== FUNCTION CHÍNH =====
 
 
-    def extract_all_boxes_text(self, img, boxes):
+    def extract_all_boxes_text(self, img, boxes, words=None):
         """
         Trích xuất text từ tất cả boxes
 
         Args:
             img: Ảnh đã xử lý (processed image)
             boxes: Danh sách boxes
-            max_chars: Số ký tự tối đa mỗi box
+            words: Các từ image_to_data đã trả về, dùng cho engine 'words'
         """
         results = []
-        total = len(boxes)
 
-        for i, box in enumerate(boxes):
+        if not isinstance(boxes, BoxArray):
+            boxes = BoxArray.from_dicts(boxes)
+
+        box_texts = None
+        rects = None
+        if self.engine == "words" and words is not None:
+            box_texts = self.assign_words_to_boxes(boxes, words)
+        else:
+            # Cắt toạ độ theo kích thước ảnh cho mọi box cùng lúc
+            rects = boxes.clip_to(img.shape).tolist()
+            if self.engine == "tesserocr":
+                # Nạp ảnh một lần, các box chỉ đặt lại vùng nhận dạng
+                api = self.get_tesserocr_api()
+                api.SetImage(Image.fromarray(img))
+
+        for i in range(len(boxes)):
 
-            # Copy box để không thay đổi original
-            box_copy = box.copy()
+            # Dict mới cho mỗi box, không thay đổi BoxArray
+            box = boxes[i]
 
             # Xử lý text
-            processed_box = self.process_single_box_text(img, box_copy)
+            text = box_texts[i] if box_texts is not None else None
+            processed_box = self.process_single_box_text(img, box, text, rects[i] if rects else None)
             results.append(processed_box)
 
-
         return results
 
-    def process_single_box_text(self, img, box):
+    def assign_words_to_boxes(self, boxes, words):
+        """
+        Ghép text cho mỗi box từ các từ nằm trong nó (theo tâm của từ),
+        giữ thứ tự đọc của image_to_data.
+        """
+        if not isinstance(boxes, BoxArray):
+            boxes = BoxArray.from_dicts(boxes)
+        if not isinstance(words, BoxArray):
+            words = BoxArray.from_dicts(words)
+
+        box_words = [[] for _ in range(len(boxes))]
+        for word_index, box_index in enumerate(words.centers_inside(boxes).tolist()):
+            if box_index >= 0:
+                box_words[box_index].append(words.text[word_index])
+        return [' '.join(texts) for texts in box_words]
+
+    def get_tesserocr_api(self):
+        """Handle tesserocr của thread hiện tại; traineddata chỉ nạp một lần"""
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=self.lang, psm=self.psm)
+            self._local.api = api
+        return api
+
+    def process_single_box_text(self, img, box, text=None, rect=None):
         """
         Xử lý text từ một box: OCR, làm sạch, cắt ngắn
 
         Args:
             img: Ảnh đã xử lý
             box: Box cần xử lý
+            text: Text đã có sẵn (engine 'words'); None thì OCR lại box
+            rect: (x0, y0, x1, y1) đã cắt theo ảnh, nếu có
         """
         # OCR
-        text = self.extract_text_from_box(img, box)
+        if text is None:
+            text = self.extract_text_from_box(img, box, rect)
 
         # Làm sạch
         text = self.clean_vietnamese_text(text)
@@ -354,30 +537,39 @@ class TesseractService:
         return box
 
 
-    def extract_text_from_box(self, img, box):
+    def extract_text_from_box(self, img, box, rect=None):
         """
         Trích xuất text từ một box cụ thể
 
         Args:
             img: Ảnh đã xử lý (processed image)
             box: Dictionary chứa x, y, width, height
+            rect: (x0, y0, x1, y1) đã cắt theo ảnh (BoxArray.clip_to), nếu có
         """
-        # Lấy tọa độ box
-        x = max(0, box['x'])
-        y = max(0, box['y'])
-        w = box['width']
-        h = box['height']
-
-        # Kiểm tra giới hạn ảnh
-        img_h, img_w = img.shape[:2]
-        x_end = min(x + w, img_w)
-        y_end = min(y + h, img_h)
+        if rect is not None:
+            x, y, x_end, y_end = rect
+        else:
+            # Lấy tọa độ box
+            x = max(0, box['x'])
+            y = max(0, box['y'])
+            w = box['width']
+            h = box['height']
 
-        # Cắt vùng ảnh
-        roi = img[y:y_end, x:x_end]
+            # Kiểm tra giới hạn ảnh
+            img_h, img_w = img.shape[:2]
+            x_end = min(x + w, img_w)
+            y_end = min(y + h, img_h)
 
         # OCR vùng đã cắt
         try:
+            if self.engine == "tesserocr":
+                # Ảnh đã được SetImage trong extract_all_boxes_text
+                api = self.get_tesserocr_api()
+                api.SetRectangle(x, y, x_end - x, y_end - y)
+                return api.GetUTF8Text().strip()
+
+            # Cắt vùng ảnh
+            roi = img[y:y_end, x:x_end]
             config = f'--psm {self.psm}'
             text = pytesseract.image_to_string(roi, lang=self.lang, config=config)
             return text.strip()
@@ -430,15 +622,19 @@ class TesseractService:
         return truncated + "..."
 
     def process_image_file(self, image_path) -> str:
-        """Xử lý toàn bộ từ file ảnh"""
+        """Xử lý toàn bộ từ file ảnh (hoặc Page)"""
         img = self.read_image(image_path)
         if img is None:
             raise FileNotFoundError(f"Không tìm thấy ảnh: {image_path}")
 
-        processed = self.preprocess_for_ocr(img)
-        boxes = self.extract_text_boxes(processed)
-        boxes = self.merge_overlapping_boxes(boxes)
-        boxes_with_text = self.extract_all_boxes_text(processed, boxes)
+        report = {}
+        processed = self.preprocess_for_ocr(img, report=report)
+        timings = ', '.join(f"{step} {ms:.0f}ms" for step, ms in report['timings_ms'].items())
+        print(f"✓ Tiền xử lý '{report['profile']}'"
+              f"{' (nhiễu ' + str(report['noise']) + ')' if 'noise' in report else ''}: {timings}")
+        words = self.extract_text_boxes(processed)
+        boxes = self.merge_overlapping_boxes(words)
+        boxes_with_text = self.extract_all_boxes_text(processed, boxes, words)
 
         # Take 5 first boxes with text and 5 last boxes with text
         ocr_texts = 'Đây là phần có tên cơ quan ban hành, số hiệu văn bản, ngày tháng năm ban hành\n'
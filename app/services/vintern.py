@@ -1,18 +1,25 @@
+import inspect
 import os
-import numpy as np
+import sys
+import time
 import torch
-import torchvision.transforms as T
-from PIL import Image
-from torchvision.transforms.functional import InterpolationMode
 from transformers import AutoModel, AutoTokenizer
 import logging
 import psutil
-import gc
 
-IMAGENET_MEAN = (0.485, 0.456, 0.406)
-IMAGENET_STD = (0.229, 0.224, 0.225)
+from app.config.settings import settings
+from app.services.memory import memory_governor
+from app.services.vintern_cpu import CPU_BACKENDS, OnnxVisionEncoder, backend_dtype, quantize_int8
+from app.services.vision_cache import VisionFeatures, vision_feature_cache
+from app.utils.page import Page
+from app.utils.tiling import load_image
+
 MODEL_NAME = "5CD-AI/Vintern-1B-v3_5"
 MODEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "model-image")
+# InternVL image placeholder tokens, as used by the model's chat()
+IMG_START_TOKEN = "<img>"
+IMG_END_TOKEN = "</img>"
+IMG_CONTEXT_TOKEN = "<IMG_CONTEXT>"
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +37,8 @@ class VinternAIService:
             cls._instance.model = None
             cls._instance.tokenizer = None
             cls._instance.generation_config = None
+            cls._instance.backend = None
+            cls._instance.dtype = torch.bfloat16
         return cls._instance
 
     def _should_use_lightweight_mode(self):
@@ -68,17 +77,12 @@ class VinternAIService:
     def _monitor_memory(self):
         """Monitor memory usage and warn if getting low"""
         try:
-            if self.device.type == "cuda":
-                allocated = torch.cuda.memory_allocated(0) / (1024**3)  # GB
-                reserved = torch.cuda.memory_reserved(0) / (1024**3)  # GB
-                if allocated > 6:  # Warning if using more than 6GB
-                    logger.warning(f"High GPU memory usage: {allocated:.1f}GB allocated, {reserved:.1f}GB reserved")
-                    return False
-            else:
-                available_ram = psutil.virtual_memory().available / (1024**3)  # GB
-                if available_ram < 2:  # Warning if less than 2GB available
-                    logger.warning(f"Low RAM available: {available_ram:.1f}GB")
-                    return False
+            sample = memory_governor.sample()
+            reasons = memory_governor.pressure(sample)
+            if reasons:
+                logger.warning(f"Memory pressure ({', '.join(reasons)}): "
+                               + ", ".join(f"{name}={value:.0f}" for name, value in sample.items()))
+                return False
             return True
         except:
             return True  # Assume OK if we can't check
@@ -143,16 +147,18 @@ class VinternAIService:
             
             # Set lightweight mode based on available memory
             self.lightweight_mode = self._should_use_lightweight_mode()
+            self._select_backend()
             
             # Load model and tokenizer only once
             logger.info("Loading model...")
-            model = self._load_model()
+            model = self._apply_cpu_backend(self._load_model())
             logger.info("Loading tokenizer...")
             tokenizer = self._load_tokenizer()
             
             self.tokenizer = tokenizer
             self.model = model
             self.generation_config = self._get_generation_config()
+            self.supports_visual_features = self._supports_visual_features()
             self._initialized = True
             logger.info("VinternAIService initialized successfully")
             
@@ -168,6 +174,52 @@ class VinternAIService:
                 except Exception as e:
                     logger.error(f"Error checking model device: {e}")
 
+    def _select_backend(self):
+        """bf16 on CUDA; on CPU the VINTERN_CPU_BACKEND setting (bf16, fp32 or int8)"""
+        if self.device.type == "cuda":
+            self.backend = "cuda-bf16"
+        else:
+            self.backend = settings.VINTERN_CPU_BACKEND
+            if self.backend not in CPU_BACKENDS:
+                logger.warning(f"Unknown VINTERN_CPU_BACKEND '{self.backend}', using fp32")
+                self.backend = "fp32"
+            if settings.VINTERN_CPU_THREADS:
+                torch.set_num_threads(settings.VINTERN_CPU_THREADS)
+        self.dtype = backend_dtype(self.device, self.backend)
+        logger.info(f"Vintern backend: {self.backend} ({self.dtype})")
+
+    def _apply_cpu_backend(self, model):
+        """ONNX Runtime vision encoder and/or int8 linear layers, for the CPU backends"""
+        if self.device.type == "cuda":
+            return model
+        if settings.VINTERN_ONNX_VISION:
+            if self.dtype != torch.float32:
+                logger.warning("VINTERN_ONNX_VISION needs the fp32 or int8 backend; keeping the torch vision encoder")
+            else:
+                try:
+                    # Exported before quantization, from the fp32 weights
+                    encoder = OnnxVisionEncoder(model, os.path.join(MODEL_CACHE_DIR, "vintern-vision.onnx"),
+                                                threads=settings.VINTERN_CPU_THREADS)
+                    # generate(), chat() and get_vision_features() all go through extract_feature
+                    model.extract_feature = encoder
+                    self.backend += "+onnx-vision"
+                except Exception as e:
+                    logger.warning(f"ONNX vision encoder unavailable, keeping torch: {e}")
+        if self.backend.startswith("int8"):
+            logger.info("Quantizing linear layers to int8...")
+            model = quantize_int8(model)
+        return model
+
+    def _supports_visual_features(self):
+        """InternVL-style models take precomputed vision features in generate()"""
+        try:
+            supported = 'visual_features' in inspect.signature(self.model.generate).parameters
+        except (TypeError, ValueError):
+            supported = False
+        if not supported:
+            logger.warning("Model generate() has no visual_features argument; vision feature cache disabled")
+        return supported
+
     def _ensure_model_cache_dir(self):
         """Ensure the model cache directory exists"""
         os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
@@ -182,7 +234,7 @@ class VinternAIService:
             try:
                 model = AutoModel.from_pretrained(
                     model_path,
-                    torch_dtype=torch.bfloat16,
+                    torch_dtype=self.dtype,
                     low_cpu_mem_usage=True,
                     trust_remote_code=True,
                     use_flash_attn=False,
@@ -200,7 +252,7 @@ class VinternAIService:
         logger.info("Downloading model...")
         model = AutoModel.from_pretrained(
             MODEL_NAME,
-            torch_dtype=torch.bfloat16,
+            torch_dtype=self.dtype,
             low_cpu_mem_usage=True,
             trust_remote_code=True,
             use_flash_attn=False,
@@ -251,118 +303,214 @@ class VinternAIService:
         
         return tokenizer
 
-    def build_transform(self, input_size):
-        MEAN, STD = IMAGENET_MEAN, IMAGENET_STD
-        transform = T.Compose([
-            T.Lambda(lambda img: img.convert('RGB') if img.mode != 'RGB' else img),
-            T.Resize((input_size, input_size), interpolation=InterpolationMode.BICUBIC),
-            T.ToTensor(),
-            T.Normalize(mean=MEAN, std=STD)
-        ])
-        return transform
-
-    def find_closest_aspect_ratio(self, aspect_ratio, target_ratios, width, height, image_size):
-        best_ratio_diff = float('inf')
-        best_ratio = (1, 1)
-        area = width * height
-        for ratio in target_ratios:
-            target_aspect_ratio = ratio[0] / ratio[1]
-            ratio_diff = abs(aspect_ratio - target_aspect_ratio)
-            if ratio_diff < best_ratio_diff:
-                best_ratio_diff = ratio_diff
-                best_ratio = ratio
-            elif ratio_diff == best_ratio_diff:
-                if area > 0.5 * image_size * image_size * ratio[0] * ratio[1]:
-                    best_ratio = ratio
-        return best_ratio
-
-    def dynamic_preprocess(self, image, min_num=1, max_num=12, image_size=448, use_thumbnail=False):
-        orig_width, orig_height = image.size
-        aspect_ratio = orig_width / orig_height
-
-        # calculate the existing image aspect ratio
-        target_ratios = set(
-            (i, j) for n in range(min_num, max_num + 1) for i in range(1, n + 1) for j in range(1, n + 1) if
-            i * j <= max_num and i * j >= min_num)
-        target_ratios = sorted(target_ratios, key=lambda x: x[0] * x[1])
-
-        # find the closest aspect ratio to the target
-        target_aspect_ratio = self.find_closest_aspect_ratio(
-            aspect_ratio, target_ratios, orig_width, orig_height, image_size)
-
-        # calculate the target width and height
-        target_width = image_size * target_aspect_ratio[0]
-        target_height = image_size * target_aspect_ratio[1]
-        blocks = target_aspect_ratio[0] * target_aspect_ratio[1]
-
-        # resize the image
-        resized_img = image.resize((target_width, target_height))
-        processed_images = []
-        for i in range(blocks):
-            box = (
-                (i % (target_width // image_size)) * image_size,
-                (i // (target_width // image_size)) * image_size,
-                ((i % (target_width // image_size)) + 1) * image_size,
-                ((i // (target_width // image_size)) + 1) * image_size
-            )
-            # split the image
-            split_img = resized_img.crop(box)
-            processed_images.append(split_img)
-        assert len(processed_images) == blocks
-        if use_thumbnail and len(processed_images) != 1:
-            thumbnail_img = image.resize((image_size, image_size))
-            processed_images.append(thumbnail_img)
-        return processed_images
-
     def load_image(self, image_file, input_size=448, max_num=12):
-        image = Image.open(image_file).convert('RGB')
-        transform = self.build_transform(input_size=input_size)
-        images = self.dynamic_preprocess(image, image_size=input_size, use_thumbnail=True, max_num=max_num)
-        pixel_values = [transform(image) for image in images]
-        pixel_values = torch.stack(pixel_values)
-        return pixel_values
-
-    def generate_input(self, image_file: str):
+        return load_image(image_file, input_size=input_size, max_num=max_num)
+
+    def generate_input(self, image_file):
+        """
+        Model input for an image (a Page, path or encoded bytes): its (cached)
+        vision features when the model accepts them, otherwise the pixel values.
+        """
         # Ensure service is initialized
         self._ensure_initialized()
         
         try:
-            # Clear memory before processing
-            if self.device.type == "cuda":
-                torch.cuda.empty_cache()
-            gc.collect()
+            # Reclaim memory before processing if above the watermarks
+            memory_governor.checkpoint("vintern.generate_input")
             
-            pixel_values = self.load_image(image_file, max_num=6).to(torch.bfloat16).to(self.device)
+            if vision_feature_cache.enabled and self.supports_visual_features:
+                return self.get_vision_features(image_file, max_num=6)
+
+            pixel_values = self.load_image(image_file, max_num=6).to(self.dtype).to(self.device)
             return pixel_values
         except Exception as e:
             logger.error(f"Error generating input: {e}")
             raise
 
+    def get_vision_features(self, image_file, input_size=448, max_num=6) -> VisionFeatures:
+        """Run the vision tower on an image once; repeat calls for the same image hit the cache"""
+        page = Page.coerce(image_file)
+        key = vision_feature_cache.make_key_from_digest(page.sha256, MODEL_NAME, input_size=input_size,
+                                                        max_num=max_num, thumbnail=True, backend=self.backend)
+        features = vision_feature_cache.get(key)
+        if features is not None:
+            return features
+
+        start = time.perf_counter()
+        pixel_values = self.load_image(page, input_size=input_size, max_num=max_num)
+        pixel_values = pixel_values.to(self.dtype).to(self.device)
+        with torch.inference_mode():
+            embeds = self.model.extract_feature(pixel_values)
+        if self.device.type == "cuda":
+            torch.cuda.synchronize()
+        features = VisionFeatures(key, embeds, pixel_values.shape[0], (time.perf_counter() - start) * 1000)
+        vision_feature_cache.set(features)
+        return features
+
     def generate_chat(self, pixel_values, prompt):
+        """pixel_values: the output of generate_input (pixel tensor or VisionFeatures)"""
         # Ensure service is initialized
         
         try:
-            # Clear memory before generation
-            if self.device.type == "cuda":
-                torch.cuda.empty_cache()
-            gc.collect()
+            # Reclaim memory before generation if above the watermarks
+            memory_governor.checkpoint("vintern.generate_chat")
             
-            response = self.model.chat(self.tokenizer, pixel_values, prompt, self.generation_config)
-            
-            # Clear memory after generation
-            if self.device.type == "cuda":
-                torch.cuda.empty_cache()
-            gc.collect()
+            with torch.inference_mode():
+                if isinstance(pixel_values, VisionFeatures):
+                    # chat() only reads the patch count from pixel_values; generate()
+                    # then uses visual_features instead of running the vision tower
+                    placeholder = torch.empty(pixel_values.num_patches, 0, device=self.device)
+                    generation_config = dict(self.generation_config, visual_features=pixel_values.embeds)
+                    response = self.model.chat(self.tokenizer, placeholder, prompt, generation_config)
+                else:
+                    response = self.model.chat(self.tokenizer, pixel_values, prompt, self.generation_config)
             
             return response
         except Exception as e:
             logger.error(f"Error generating chat: {e}")
-            # Clear memory on error
-            if self.device.type == "cuda":
-                torch.cuda.empty_cache()
-            gc.collect()
+            # Always reclaim on error: a failed generation is often an OOM
+            memory_governor.reclaim(["error"], "vintern.generate_chat")
             raise
 
+    def answer_prompts(self, image_file, prompts):
+        """
+        Answer several prompts about one image. With VINTERN_SHARED_PREFIX the
+        image prefix is prefilled once and shared by every prompt; otherwise
+        each prompt is a separate chat() call.
+
+        Returns (answers, stats).
+        """
+        model_input = self.generate_input(image_file)
+        if settings.VINTERN_SHARED_PREFIX:
+            return self.generate_chat_multi(model_input, prompts)
+
+        start = time.perf_counter()
+        answers = [self.generate_chat(model_input, prompt) for prompt in prompts]
+        return answers, {"questions": len(prompts), "total_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    def generate_chat_multi(self, pixel_values, prompts, share_prefix=True):
+        """
+        Greedy answers to several prompts about the same image.
+
+        Every prompt is built with the model's own conversation template, so
+        they share a token prefix (system message and image tokens). That
+        prefix is prefilled once; each prompt then prefills only its own
+        suffix on top of the cached keys/values, which are cut back to the
+        prefix before the next prompt. share_prefix=False prefills every
+        prompt in full through the same code path, for comparison.
+
+        Returns (answers, stats) with prefill and decode time split out.
+        """
+        self._ensure_initialized()
+        model = self.model
+        language_model = model.language_model
+        embed_tokens = language_model.get_input_embeddings()
+        model.img_context_token_id = self.tokenizer.convert_tokens_to_ids(IMG_CONTEXT_TOKEN)
+        stats = {"questions": len(prompts), "vision_ms": 0.0, "prefill_ms": 0.0, "prefill_tokens": 0,
+                 "decode_ms": 0.0, "decode_tokens": 0}
+
+        with torch.inference_mode():
+            start = time.perf_counter()
+            if isinstance(pixel_values, VisionFeatures):
+                vit_embeds, num_patches = pixel_values.embeds, pixel_values.num_patches
+            else:
+                vit_embeds, num_patches = model.extract_feature(pixel_values), pixel_values.shape[0]
+            stats["vision_ms"] = (time.perf_counter() - start) * 1000
+
+            queries = [self._build_query(prompt, num_patches) for prompt in prompts]
+            sep = queries[0][1]
+            eos_token_id = self.tokenizer.convert_tokens_to_ids(sep)
+            token_ids = [self.tokenizer(query, return_tensors='pt').input_ids[0].to(self.device)
+                         for query, _ in queries]
+
+            def embed(ids):
+                embeds = embed_tokens(ids[None])
+                selected = ids == model.img_context_token_id
+                if selected.any():
+                    embeds[0, selected] = vit_embeds.reshape(-1, embeds.shape[-1]).to(embeds.dtype)
+                return embeds
+
+            def forward(embeds, cache):
+                out = language_model(inputs_embeds=embeds, past_key_values=cache, use_cache=True)
+                # Scores in float32, as generate() computes them
+                return out.logits[:, -1, :].float(), out.past_key_values
+
+            prefix_len = self._shared_prefix_length(token_ids) if share_prefix else 0
+            prefix_cache = None
+            if prefix_len:
+                start = time.perf_counter()
+                _, prefix_cache = forward(embed(token_ids[0][:prefix_len]), None)
+                stats["prefill_ms"] += (time.perf_counter() - start) * 1000
+                stats["prefill_tokens"] += prefix_len
+            stats["prefix_tokens"] = prefix_len
+
+            answers = []
+            for ids in token_ids:
+                if hasattr(prefix_cache, "crop"):
+                    # DynamicCache grows in place; drop the previous prompt's tokens
+                    prefix_cache.crop(prefix_len)
+                suffix = ids[prefix_len:]
+
+                start = time.perf_counter()
+                logits, cache = forward(embed(suffix), prefix_cache)
+                stats["prefill_ms"] += (time.perf_counter() - start) * 1000
+                stats["prefill_tokens"] += len(suffix)
+
+                start = time.perf_counter()
+                generated = self._greedy_decode(logits, cache, embed_tokens, forward, eos_token_id)
+                stats["decode_ms"] += (time.perf_counter() - start) * 1000
+                stats["decode_tokens"] += len(generated)
+
+                response = self.tokenizer.decode(generated, skip_special_tokens=True)
+                answers.append(response.split(sep)[0].strip())
+
+        for key in ("vision_ms", "prefill_ms", "decode_ms"):
+            stats[key] = round(stats[key], 1)
+        return answers, stats
+
+    def _build_query(self, prompt: str, num_patches: int):
+        """The exact query chat() would tokenize for this prompt, and the turn separator"""
+        get_conv_template = sys.modules[type(self.model).__module__].get_conv_template
+        template = get_conv_template(self.model.template)
+        template.system_message = self.model.system_message
+        if '<image>' not in prompt:
+            prompt = '<image>\n' + prompt
+        template.append_message(template.roles[0], prompt)
+        template.append_message(template.roles[1], None)
+        image_tokens = IMG_START_TOKEN + IMG_CONTEXT_TOKEN * self.model.num_image_token * num_patches + IMG_END_TOKEN
+        return template.get_prompt().replace('<image>', image_tokens, 1), template.sep.strip()
+
+    def _shared_prefix_length(self, token_ids):
+        """Longest common token prefix, leaving at least one token of each prompt to prefill"""
+        length = min(len(ids) for ids in token_ids) - 1
+        first = token_ids[0][:length]
+        for ids in token_ids[1:]:
+            differs = (ids[:length] != first[:length]).nonzero()
+            if len(differs):
+                length = int(differs[0])
+        # The image must sit entirely inside the shared part
+        image_positions = (token_ids[0] == self.model.img_context_token_id).nonzero()
+        if len(image_positions) and int(image_positions[-1]) >= length:
+            return 0
+        return length
+
+    def _greedy_decode(self, logits, cache, embed_tokens, forward, eos_token_id):
+        """Greedy decoding with the service's repetition penalty, as chat() generates"""
+        max_new_tokens = self.generation_config.get("max_new_tokens", 512)
+        penalty = self.generation_config.get("repetition_penalty", 1.0)
+        generated = []
+        for _ in range(max_new_tokens):
+            if penalty != 1.0 and generated:
+                seen = torch.tensor(generated, device=logits.device)
+                scores = logits[0, seen]
+                logits[0, seen] = torch.where(scores < 0, scores * penalty, scores / penalty)
+            next_id = int(logits.argmax(-1))
+            if next_id in (eos_token_id, self.tokenizer.eos_token_id):
+                break
+            generated.append(next_id)
+            logits, cache = forward(embed_tokens(torch.tensor([[next_id]], device=self.device)), cache)
+        return generated
+
     def force_cuda_reinit(self):
         """Force CUDA re-initialization"""
         try:
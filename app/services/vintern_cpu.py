@@ -0,0 +1,86 @@
+import logging
+import os
+
+import torch
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+logger = logging.getLogger(__name__)
+
+# Vintern backends on CPU. bf16 is what the GPU path uses; most CPUs have no
+# fast bf16 matmul, so fp32 is usually quicker, and int8 quantizes the
+# linear layers' weights (activations are quantized on the fly per call).
+CPU_BACKENDS = {
+    "bf16": torch.bfloat16,
+    "fp32": torch.float32,
+    "int8": torch.float32,
+}
+
+
+def backend_dtype(device: torch.device, backend: str) -> torch.dtype:
+    """Dtype the model is loaded in, and its inputs are cast to"""
+    if device.type == "cuda":
+        return torch.bfloat16
+    return CPU_BACKENDS[backend]
+
+
+def quantize_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Dynamic int8 quantization of every nn.Linear of an fp32 model, in place"""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+class _VisionEncoder(torch.nn.Module):
+    """extract_feature() (vision tower, pixel shuffle and projector) as a module to export"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model.extract_feature(pixel_values)
+
+
+class OnnxVisionEncoder:
+    """
+    The model's vision encoder run by ONNX Runtime.
+
+    Exported from the fp32 model on first use and cached next to the model
+    weights. Callable like model.extract_feature: takes pixel values
+    (num_patches, 3, H, W) and returns the projected image tokens as a torch
+    tensor of the input's dtype.
+    """
+
+    def __init__(self, model, path: str, image_size: int = 448, threads: int = 0):
+        if ort is None:
+            raise RuntimeError("onnxruntime is not installed")
+        if not os.path.exists(path):
+            self.export(model, path, image_size)
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.path = path
+
+    @staticmethod
+    def export(model, path: str, image_size: int):
+        logger.info(f"Exporting the vision encoder to {path}...")
+        dummy = torch.zeros(2, 3, image_size, image_size, dtype=torch.float32)
+        tmp_path = path + ".tmp"
+        with torch.inference_mode(False), torch.no_grad():
+            torch.onnx.export(
+                _VisionEncoder(model).eval(), (dummy,), tmp_path,
+                input_names=["pixel_values"], output_names=["vit_embeds"],
+                dynamic_axes={"pixel_values": {0: "patches"}, "vit_embeds": {0: "patches"}},
+                dynamo=False,
+            )
+        # A half-written file would be loaded (and fail) on every restart
+        os.replace(tmp_path, path)
+
+    def __call__(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        inputs = {self.input_name: pixel_values.detach().float().cpu().numpy()}
+        vit_embeds = self.session.run(None, inputs)[0]
+        return torch.from_numpy(vit_embeds).to(pixel_values.dtype)
@@ -0,0 +1,79 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from app.config.settings import settings
+from app.utils.cache import LRUCache
+
+
+@dataclass
+class VisionFeatures:
+    """Vision-encoder output for one image: (num_patches, image_tokens, hidden)"""
+    key: str
+    embeds: Any
+    num_patches: int
+    # Time the encoder (image load, tiling and vision tower) took for this image
+    encode_ms: float
+
+    @property
+    def nbytes(self) -> int:
+        return self.embeds.element_size() * self.embeds.nelement()
+
+
+class VisionFeatureCache:
+    """
+    Vision-encoder features keyed by the hash of the image file and the
+    tiling parameters.
+
+    Each Vintern prompt on a page would otherwise re-run the vision tower on
+    the same tiles; with the features cached, later prompts on that page and
+    repeated pages across requests go straight to the language model. Bounded
+    by the size of the stored tensors, which stay on the model's device.
+    """
+
+    def __init__(self, max_bytes: int = None, enabled: bool = None):
+        self.enabled = settings.VINTERN_FEATURE_CACHE_ENABLED if enabled is None else enabled
+        self.cache = LRUCache(
+            max_bytes=settings.VINTERN_FEATURE_CACHE_MAX_BYTES if max_bytes is None else max_bytes,
+            sizeof=lambda features: features.nbytes,
+        )
+        self._lock = threading.Lock()
+        self.encode_ms_spent = 0.0
+        self.encode_ms_saved = 0.0
+
+    @staticmethod
+    def make_key(image_bytes: bytes, model: str, **params) -> str:
+        return VisionFeatureCache.make_key_from_digest(hashlib.sha256(image_bytes).hexdigest(), model, **params)
+
+    @staticmethod
+    def make_key_from_digest(image_digest: str, model: str, **params) -> str:
+        tiling = ",".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"{image_digest}:{tiling}:{model}"
+
+    def get(self, key: str) -> Optional[VisionFeatures]:
+        if not self.enabled:
+            return None
+        features = self.cache.get(key)
+        if features is not None:
+            with self._lock:
+                self.encode_ms_saved += features.encode_ms
+        return features
+
+    def set(self, features: VisionFeatures):
+        with self._lock:
+            self.encode_ms_spent += features.encode_ms
+        if self.enabled:
+            self.cache.set(features.key, features)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats["enabled"] = self.enabled
+        stats["encoder_calls_saved"] = self.cache.hits
+        stats["encode_ms_spent"] = round(self.encode_ms_spent, 1)
+        stats["encode_ms_saved"] = round(self.encode_ms_saved, 1)
+        stats["encode_ms_saved_per_hit"] = round(self.encode_ms_saved / self.cache.hits, 1) if self.cache.hits else 0.0
+        return stats
+
+
+vision_feature_cache = VisionFeatureCache()
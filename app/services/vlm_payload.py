@@ -0,0 +1,153 @@
+import base64
+import io
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+
+from PIL import Image
+
+from app.config.settings import settings
+from app.utils.page import CODEC_MIME, Page
+
+
+@dataclass
+class VLMPayload:
+    """One page as it is sent to the vision model"""
+    data_url: str
+    mime: str
+    width: int
+    height: int
+    encoded_bytes: int
+    visual_tokens: int
+    encode_ms: float
+
+    @property
+    def image_bytes(self) -> bytes:
+        return base64.b64decode(self.data_url.split(",", 1)[1])
+
+
+class VLMPayloadOptimizer:
+    """
+    Resize pages to the vision model's patch grid and pixel budget, then
+    encode them with a lossy codec before base64.
+
+    Qwen2.5-VL cuts the image into 14px patches and merges 2x2 patches into
+    one visual token, resizing anything above max_pixels itself. Sending a
+    2480x3508 PNG only costs upload and decode time for pixels the model
+    throws away, so the page is resized here with the same rule
+    (`smart_resize`) and sent as JPEG/WebP.
+    """
+
+    def __init__(self, codec: str = None, quality: int = None, max_pixels: int = None,
+                 min_pixels: int = None, patch_size: int = None, merge_size: int = None,
+                 enabled: bool = None):
+        self.enabled = settings.VLM_PAYLOAD_ENABLED if enabled is None else enabled
+        self.codec = (codec or settings.VLM_IMAGE_CODEC).lower()
+        if self.codec not in CODEC_MIME:
+            raise ValueError(f"Unsupported codec '{self.codec}', expected one of {tuple(CODEC_MIME)}")
+        self.quality = settings.VLM_IMAGE_QUALITY if quality is None else quality
+        self.max_pixels = settings.VLM_MAX_PIXELS if max_pixels is None else max_pixels
+        self.min_pixels = settings.VLM_MIN_PIXELS if min_pixels is None else min_pixels
+        self.patch_size = patch_size or settings.VLM_PATCH_SIZE
+        self.merge_size = merge_size or settings.VLM_MERGE_SIZE
+
+    @property
+    def factor(self) -> int:
+        return self.patch_size * self.merge_size
+
+    @property
+    def preset(self) -> str:
+        """Identifies what the model sees, for cache keys"""
+        if not self.enabled:
+            return "png-full"
+        return f"{self.codec}{self.quality}-max{self.max_pixels}-f{self.factor}"
+
+    def smart_resize(self, width: int, height: int, max_pixels: int = None) -> Tuple[int, int]:
+        """
+        Qwen2.5-VL's resize rule: both sides a multiple of patch*merge, total
+        pixels within [min_pixels, max_pixels], aspect ratio kept.
+        """
+        factor = self.factor
+        max_pixels = max_pixels or self.max_pixels
+        h_bar = max(factor, round(height / factor) * factor)
+        w_bar = max(factor, round(width / factor) * factor)
+        if h_bar * w_bar > max_pixels:
+            beta = math.sqrt((height * width) / max_pixels)
+            h_bar = max(factor, math.floor(height / beta / factor) * factor)
+            w_bar = max(factor, math.floor(width / beta / factor) * factor)
+        elif h_bar * w_bar < self.min_pixels:
+            beta = math.sqrt(self.min_pixels / (height * width))
+            h_bar = math.ceil(height * beta / factor) * factor
+            w_bar = math.ceil(width * beta / factor) * factor
+        return w_bar, h_bar
+
+    def estimate_visual_tokens(self, width: int, height: int, max_pixels: int = None) -> int:
+        """Visual tokens the model spends on an image of this size after resizing"""
+        w_bar, h_bar = self.smart_resize(width, height, max_pixels)
+        return (w_bar // self.factor) * (h_bar // self.factor)
+
+    def prepare(self, page: Union[Page, bytes], band: Optional[Tuple[float, float]] = None) -> VLMPayload:
+        """
+        Encode one rendered page (a Page, or PNG bytes) into a data URL for
+        the model.
+
+        `band` is a (top, bottom) fraction of the page height to keep. The
+        pixel budget shrinks with the band, so a cropped header is sent at
+        the same resolution as it would have had in the full page.
+        """
+        start = time.perf_counter()
+        page = Page.coerce(page)
+        image = page.image
+        max_pixels = self.max_pixels
+        if band is not None:
+            top, bottom = band
+            image = image.crop((0, int(image.height * top), image.width, int(image.height * bottom)))
+            max_pixels = max(self.min_pixels, int(self.max_pixels * (bottom - top)))
+        width, height = image.size
+        tokens = self.estimate_visual_tokens(width, height, max_pixels)
+
+        if not self.enabled and band is None:
+            encoded, mime = page.encode("png"), CODEC_MIME["png"]
+        elif not self.enabled:
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            encoded, mime = buffer.getvalue(), CODEC_MIME["png"]
+        else:
+            image = image.convert("L" if image.mode in ("1", "L") else "RGB")
+            size = self.smart_resize(width, height, max_pixels)
+            if size != (width, height):
+                image = image.resize(size, Image.Resampling.LANCZOS)
+            width, height = image.size
+
+            buffer = io.BytesIO()
+            if self.codec == "png":
+                image.save(buffer, format="PNG", optimize=False)
+            elif self.codec == "jpeg":
+                image.save(buffer, format="JPEG", quality=self.quality, optimize=True)
+            else:
+                image.save(buffer, format="WEBP", quality=self.quality, method=4)
+            encoded, mime = buffer.getvalue(), CODEC_MIME[self.codec]
+
+        data_url = f"data:{mime};base64,{base64.b64encode(encoded).decode('utf-8')}"
+        return VLMPayload(
+            data_url=data_url,
+            mime=mime,
+            width=width,
+            height=height,
+            encoded_bytes=len(encoded),
+            visual_tokens=tokens,
+            encode_ms=(time.perf_counter() - start) * 1000,
+        )
+
+    def context_budget(self, options: dict, prompt: str = "") -> int:
+        """
+        Visual tokens that fit in num_ctx after reserving num_predict and the
+        prompt (estimated at ~3 characters per token for Vietnamese text).
+        """
+        num_ctx = options.get("num_ctx", 2048)
+        num_predict = options.get("num_predict", 0)
+        return num_ctx - num_predict - len(prompt) // 3
+
+
+vlm_payload_optimizer = VLMPayloadOptimizer()
@@ -0,0 +1,195 @@
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+COORD_DTYPE = np.int32
+
+
+class BoxArray:
+    """
+    Columnar container for OCR word/line boxes.
+
+    Coordinates and attributes are NumPy int32 columns (conf float64, so
+    Tesseract's values survive unchanged) and text is a plain list, so a
+    page of words costs a few arrays instead of one dict per word. Indexing
+    returns the dict shape the rest of TesseractService uses, so existing
+    code can read boxes unchanged.
+    """
+
+    __slots__ = ("x", "y", "width", "height", "conf", "block", "line", "word", "text")
+
+    def __init__(self, x, y, width, height, text: Sequence[str], conf=None,
+                 block=None, line=None, word=None):
+        n = len(text)
+        self.x = np.asarray(x, dtype=COORD_DTYPE)
+        self.y = np.asarray(y, dtype=COORD_DTYPE)
+        self.width = np.asarray(width, dtype=COORD_DTYPE)
+        self.height = np.asarray(height, dtype=COORD_DTYPE)
+        self.conf = np.zeros(n, dtype=np.float64) if conf is None else np.asarray(conf, dtype=np.float64)
+        # -1: box has no block/line/word number (e.g. the result of a merge)
+        self.block = np.full(n, -1, dtype=COORD_DTYPE) if block is None else np.asarray(block, dtype=COORD_DTYPE)
+        self.line = np.full(n, -1, dtype=COORD_DTYPE) if line is None else np.asarray(line, dtype=COORD_DTYPE)
+        self.word = np.full(n, -1, dtype=COORD_DTYPE) if word is None else np.asarray(word, dtype=COORD_DTYPE)
+        self.text = list(text)
+
+    @classmethod
+    def from_tesseract_data(cls, data: Dict[str, list]) -> "BoxArray":
+        """Words with non-blank text from pytesseract.image_to_data(output_type=DICT)"""
+        keep = np.flatnonzero([bool(t.strip()) for t in data['text']])
+
+        def column(key):
+            return np.asarray(data[key])[keep] if len(keep) else []
+
+        return cls(
+            x=column('left'), y=column('top'), width=column('width'), height=column('height'),
+            text=[data['text'][i] for i in keep],
+            conf=np.asarray(data['conf'], dtype=np.float64)[keep] if len(keep) else [],
+            block=column('block_num'), line=column('line_num'), word=column('word_num'),
+        )
+
+    @classmethod
+    def from_dicts(cls, boxes: Sequence[Dict]) -> "BoxArray":
+        return cls(
+            x=[b['x'] for b in boxes], y=[b['y'] for b in boxes],
+            width=[b['width'] for b in boxes], height=[b['height'] for b in boxes],
+            text=[b.get('text', '') for b in boxes], conf=[b.get('conf', 0) for b in boxes],
+            block=[b.get('block', -1) for b in boxes], line=[b.get('line', -1) for b in boxes],
+            word=[b.get('word', -1) for b in boxes],
+        )
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __getitem__(self, i: int) -> Dict:
+        box = {
+            'x': int(self.x[i]),
+            'y': int(self.y[i]),
+            'width': int(self.width[i]),
+            'height': int(self.height[i]),
+            'text': self.text[i],
+            'conf': self._conf_value(self.conf[i]),
+        }
+        if self.block[i] >= 0:
+            box['block'] = int(self.block[i])
+            box['line'] = int(self.line[i])
+            box['word'] = int(self.word[i])
+        return box
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @staticmethod
+    def _conf_value(conf):
+        conf = float(conf)
+        return int(conf) if conf.is_integer() else conf
+
+    def to_dicts(self) -> List[Dict]:
+        return list(self)
+
+    def take(self, indices) -> "BoxArray":
+        indices = np.asarray(indices, dtype=np.intp)
+        return BoxArray(self.x[indices], self.y[indices], self.width[indices], self.height[indices],
+                        [self.text[i] for i in indices], self.conf[indices],
+                        self.block[indices], self.line[indices], self.word[indices])
+
+    @property
+    def x_end(self) -> np.ndarray:
+        return self.x + self.width
+
+    @property
+    def y_end(self) -> np.ndarray:
+        return self.y + self.height
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the container"""
+        arrays = (self.x, self.y, self.width, self.height, self.conf, self.block, self.line, self.word)
+        return sum(a.nbytes for a in arrays) + sum(len(t.encode('utf-8')) + 49 for t in self.text)
+
+    def overlaps(self, box: Dict, margin: int = 5) -> np.ndarray:
+        """
+        Vectorized TesseractService.check_overlap: boolean mask of the boxes
+        that overlap `box` when both are grown by `margin` pixels.
+        """
+        reach = 2 * margin
+        x0, y0 = box['x'] - reach, box['y'] - reach
+        x1, y1 = box['x'] + box['width'] + reach, box['y'] + box['height'] + reach
+        return (self.x_end >= x0) & (self.x <= x1) & (self.y_end >= y0) & (self.y <= y1)
+
+    def centers_inside(self, other: "BoxArray") -> np.ndarray:
+        """
+        For each box here, index of the first box in `other` containing its
+        center, or -1.
+        """
+        if not len(self) or not len(other):
+            return np.full(len(self), -1, dtype=np.intp)
+        cx = (self.x + self.width / 2)[:, None]
+        cy = (self.y + self.height / 2)[:, None]
+        inside = ((other.x[None, :] <= cx) & (cx <= other.x_end[None, :]) &
+                  (other.y[None, :] <= cy) & (cy <= other.y_end[None, :]))
+        first = inside.argmax(axis=1)
+        return np.where(inside[np.arange(len(self)), first], first, -1)
+
+    def merge_by_line(self, y_threshold: int = 10, max_gap: Optional[int] = None) -> "BoxArray":
+        """
+        Group boxes into lines: sort by (y, x), start a new line when y moves
+        more than y_threshold from the line's first box, then take the union
+        rectangle, the minimum conf and the text joined left to right.
+
+        With max_gap, a line is further cut wherever the horizontal gap
+        between neighbouring words exceeds it, so side-by-side columns come
+        out as separate segments.
+        """
+        if not len(self):
+            return BoxArray([], [], [], [], [])
+
+        order = np.lexsort((self.x, self.y))
+        ys = self.y[order]
+
+        # A line starting at y0 takes every following box with y <= y0 + threshold
+        starts = []
+        start = 0
+        while start < len(ys):
+            starts.append(start)
+            start = int(np.searchsorted(ys, ys[start] + y_threshold, side='right'))
+        starts = np.asarray(starts, dtype=np.intp)
+
+        line_id = np.zeros(len(ys), dtype=np.intp)
+        line_id[starts[1:]] = 1
+        line_id = np.cumsum(line_id)
+
+        # Left to right inside each line, ties kept in (y, x) order
+        by_line = np.lexsort((self.x[order], line_id))
+        reading = order[by_line]
+        line_of = line_id[by_line]
+
+        breaks = np.ones(len(reading), dtype=bool)
+        breaks[1:] = line_of[1:] != line_of[:-1]
+        if max_gap is not None:
+            breaks[1:] |= (self.x[reading][1:] - self.x_end[reading][:-1]) > max_gap
+        segments = np.flatnonzero(breaks)
+
+        x = np.minimum.reduceat(self.x[reading], segments)
+        y = np.minimum.reduceat(self.y[reading], segments)
+        x_end = np.maximum.reduceat(self.x_end[reading], segments)
+        y_end = np.maximum.reduceat(self.y_end[reading], segments)
+        conf = np.minimum.reduceat(self.conf[reading], segments)
+
+        bounds = list(segments[1:]) + [len(reading)]
+        texts = [' '.join(self.text[i] for i in reading[lo:hi]).strip()
+                 for lo, hi in zip(segments, bounds)]
+
+        return BoxArray(x, y, x_end - x, y_end - y, texts, conf)
+
+    def clip_to(self, shape) -> np.ndarray:
+        """(n, 4) array of x0, y0, x1, y1 clipped to an image of `shape`"""
+        img_h, img_w = shape[:2]
+        x0 = np.maximum(self.x, 0)
+        y0 = np.maximum(self.y, 0)
+        x1 = np.minimum(x0 + self.width, img_w)
+        y1 = np.minimum(y0 + self.height, img_h)
+        return np.stack([x0, y0, x1, y1], axis=1)
+
+    def crops(self, img: np.ndarray) -> List[np.ndarray]:
+        """Views of `img` under each box (no pixel copies)"""
+        return [img[y0:y1, x0:x1] for x0, y0, x1, y1 in self.clip_to(img.shape)]
@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by item count and/or total size.
+
+    `sizeof` measures each value (defaults to 1 per item, so `max_bytes` then
+    behaves like a second item limit).
+    """
+
+    def __init__(self, max_items: Optional[int] = None, max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 1)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any):
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Never let a single oversized value flush the whole cache
+            return
+        with self._lock:
+            if key in self._data:
+                self.current_bytes -= self._sizes[key]
+            self._data[key] = value
+            self._sizes[key] = size
+            self._data.move_to_end(key)
+            self.current_bytes += size
+            self._evict()
+
+    def pop(self, key: Hashable, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self.current_bytes -= self._sizes.pop(key)
+            return self._data.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.current_bytes = 0
+
+    def _evict(self):
+        while self._data and (
+                (self.max_items is not None and len(self._data) > self.max_items) or
+                (self.max_bytes is not None and self.current_bytes > self.max_bytes)):
+            key, _ = self._data.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "items": len(self._data),
+            "bytes": self.current_bytes,
+            "max_items": self.max_items,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import io
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+CODEC_FORMATS = {"png": "PNG", "jpeg": "JPEG", "webp": "WEBP"}
+CODEC_MIME = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def sniff_codec(data: bytes) -> Optional[str]:
+    """Codec of encoded image bytes from their magic number"""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+class Page:
+    """
+    One rendered page held once in memory, with lazily computed views.
+
+    A page is built from a decoded raster (a PIL image from the renderer, or
+    a NumPy array) and/or encoded bytes. Every view is computed on first use
+    and cached: the PIL image, NumPy arrays per mode ("RGB", "L", or "BGR"
+    for OpenCV), encoded bytes per codec and parameters, and base64. The
+    bytes a page was built from are returned as is for their own codec, so
+    one render can feed Tesseract, Vintern and Qwen without re-encoding or
+    decoding it twice.
+
+    Cached arrays are shared between consumers and read-only; copy before
+    modifying them in place.
+    """
+
+    def __init__(self, image: Image.Image = None, data: bytes = None, codec: str = None, number: int = None):
+        if image is None and data is None:
+            raise ValueError("A Page needs an image or encoded bytes")
+        self.number = number
+        self._image = image
+        self._data = data
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._encoded: Dict[Tuple, bytes] = {}
+        self._base64: Dict[Tuple, str] = {}
+        self._sha256 = None
+        if data is not None:
+            codec = codec or sniff_codec(data)
+            if codec:
+                self._encoded[(codec,)] = data
+
+    @classmethod
+    def from_image(cls, image: Image.Image, number: int = None) -> "Page":
+        return cls(image=image, number=number)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, number: int = None, codec: str = None) -> "Page":
+        return cls(data=bytes(data), codec=codec, number=number)
+
+    @classmethod
+    def from_file(cls, path, number: int = None) -> "Page":
+        with open(path, "rb") as f:
+            return cls(data=f.read(), number=number)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, number: int = None) -> "Page":
+        """From an RGB or grayscale array; the array is kept as that mode's view"""
+        page = cls(image=Image.fromarray(array), number=number)
+        page._arrays[page._image.mode] = array
+        return page
+
+    @classmethod
+    def coerce(cls, source, number: int = None) -> "Page":
+        """A Page from a Page, encoded bytes, a path, a file object, a PIL image or an array"""
+        if isinstance(source, Page):
+            return source
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return cls.from_bytes(source, number)
+        if isinstance(source, (str, os.PathLike)):
+            return cls.from_file(source, number)
+        if isinstance(source, Image.Image):
+            return cls.from_image(source, number)
+        if isinstance(source, np.ndarray):
+            return cls.from_array(source, number)
+        if hasattr(source, "read"):
+            return cls.from_bytes(source.read(), number)
+        raise TypeError(f"Cannot make a Page from {type(source).__name__}")
+
+    @property
+    def image(self) -> Image.Image:
+        """The decoded raster, decoded once from the source bytes if needed"""
+        if self._image is None:
+            image = Image.open(io.BytesIO(self._data))
+            image.load()
+            self._image = image
+        return self._image
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.image.size
+
+    @property
+    def width(self) -> int:
+        return self.image.width
+
+    @property
+    def height(self) -> int:
+        return self.image.height
+
+    def array(self, mode: str = "RGB") -> np.ndarray:
+        """Pixels as a read-only (H, W[, C]) uint8 array in a PIL mode, or "BGR" for OpenCV"""
+        array = self._arrays.get(mode)
+        if array is None:
+            if mode == "BGR":
+                array = np.ascontiguousarray(self.array("RGB")[:, :, ::-1])
+                array.flags.writeable = False
+            else:
+                image = self.image if self.image.mode == mode else self.image.convert(mode)
+                array = np.asarray(image)
+            self._arrays[mode] = array
+        return array
+
+    def encode(self, codec: str = "png", **params) -> bytes:
+        """
+        Bytes in an image codec, cached per codec and save() parameters.
+        Without parameters, the bytes the page was built from are returned
+        for their own codec.
+        """
+        key = (codec,) + tuple(sorted(params.items()))
+        data = self._encoded.get(key)
+        if data is None:
+            image = self.image
+            if codec == "jpeg" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, format=CODEC_FORMATS[codec], **params)
+            data = self._encoded[key] = buffer.getvalue()
+        return data
+
+    def base64(self, codec: str = "png", **params) -> str:
+        key = (codec,) + tuple(sorted(params.items()))
+        encoded = self._base64.get(key)
+        if encoded is None:
+            encoded = self._base64[key] = base64.b64encode(self.encode(codec, **params)).decode("ascii")
+        return encoded
+
+    def data_url(self, codec: str = "png", **params) -> str:
+        return f"data:{CODEC_MIME[codec]};base64,{self.base64(codec, **params)}"
+
+    @property
+    def sha256(self) -> str:
+        """Digest of the source bytes, or of the raster for pages built from pixels"""
+        if self._sha256 is None:
+            if self._data is not None:
+                digest = hashlib.sha256(self._data)
+            else:
+                digest = hashlib.sha256(f"{self.image.mode}:{self.width}x{self.height}:".encode("ascii"))
+                digest.update(self.image.tobytes())
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+    def crop(self, box: Tuple[int, int, int, int]) -> "Page":
+        return Page.from_image(self.image.crop(box), number=self.number)
+
+    def __repr__(self) -> str:
+        decoded = self._image is not None
+        size = f"{self._image.width}x{self._image.height}" if decoded else f"{len(self._data)} bytes"
+        return f"Page(number={self.number}, {size}, views={sorted(self._arrays)}+{sorted(k[0] for k in self._encoded)})"
@@ -0,0 +1,99 @@
+import math
+import statistics
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.utils.boxes import BoxArray
+
+
+class BoxGridIndex:
+    """
+    Uniform grid over axis-aligned boxes (a BoxArray or dicts with 'x', 'y',
+    'width', 'height') for rectangle queries, with removal.
+
+    Each box is registered in every cell it touches, so a query only looks at
+    the cells under the query rectangle instead of every box on the page.
+    """
+
+    def __init__(self, boxes, cell_size: Optional[int] = None):
+        if isinstance(boxes, BoxArray):
+            self.rects = list(zip(boxes.x.tolist(), boxes.y.tolist(), boxes.x_end.tolist(), boxes.y_end.tolist()))
+        else:
+            self.rects = [(b['x'], b['y'], b['x'] + b['width'], b['y'] + b['height']) for b in boxes]
+        if cell_size is None:
+            # About one word per cell on a text page
+            sizes = [max(x1 - x0, y1 - y0) for x0, y0, x1, y1 in self.rects]
+            cell_size = int(statistics.median(sizes)) if sizes else 64
+        self.cell_size = max(16, cell_size)
+        self.alive = [True] * len(boxes)
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        for i, rect in enumerate(self.rects):
+            for key in self._cells(*rect):
+                self.cells.setdefault(key, set()).add(i)
+
+    def __contains__(self, i: int) -> bool:
+        return self.alive[i]
+
+    def _cell_range(self, x0, y0, x1, y1) -> Tuple[int, int, int, int]:
+        size = self.cell_size
+        return math.floor(x0 / size), math.floor(y0 / size), math.floor(x1 / size), math.floor(y1 / size)
+
+    def _cells(self, x0, y0, x1, y1) -> Iterator[Tuple[int, int]]:
+        cx0, cy0, cx1, cy1 = self._cell_range(x0, y0, x1, y1)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                yield cx, cy
+
+    def remove(self, i: int):
+        if not self.alive[i]:
+            return
+        self.alive[i] = False
+        for key in self._cells(*self.rects[i]):
+            cell = self.cells.get(key)
+            if cell is not None:
+                cell.discard(i)
+                if not cell:
+                    del self.cells[key]
+
+    def query(self, x0, y0, x1, y1) -> List[int]:
+        """Indices of live boxes intersecting the closed rectangle, ascending"""
+        return sorted(self._query(x0, y0, x1, y1))
+
+    def query_growth(self, old: Tuple, new: Tuple) -> List[int]:
+        """
+        Indices of live boxes intersecting `new` but not reachable through
+        `old` (a rectangle inside `new`), ascending. Only the strips `new`
+        adds around `old` are scanned.
+        """
+        ox0, oy0, ox1, oy1 = old
+        nx0, ny0, nx1, ny1 = new
+        hits: Set[int] = set()
+        if ny0 < oy0:
+            hits |= self._query(nx0, ny0, nx1, oy0)
+        if ny1 > oy1:
+            hits |= self._query(nx0, oy1, nx1, ny1)
+        if nx0 < ox0:
+            hits |= self._query(nx0, oy0, ox0, oy1)
+        if nx1 > ox1:
+            hits |= self._query(ox1, oy0, nx1, oy1)
+        return sorted(hits)
+
+    def _query(self, x0, y0, x1, y1) -> Set[int]:
+        cx0, cy0, cx1, cy1 = self._cell_range(x0, y0, x1, y1)
+        candidates: Set[int] = set()
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+            # Large query over a sparse grid: walk the occupied cells instead
+            for (cx, cy), cell in self.cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    candidates |= cell
+        else:
+            for key in self._cells(x0, y0, x1, y1):
+                cell = self.cells.get(key)
+                if cell:
+                    candidates |= cell
+
+        hits = set()
+        for i in candidates:
+            bx0, by0, bx1, by1 = self.rects[i]
+            if bx1 >= x0 and bx0 <= x1 and by1 >= y0 and by0 <= y1:
+                hits.add(i)
+        return hits
@@ -0,0 +1,82 @@
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+from app.utils.page import Page
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+_MEAN = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+_STD = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1)
+
+
+@lru_cache(maxsize=None)
+def target_ratios(min_num: int = 1, max_num: int = 12) -> Tuple[List[Tuple[int, int]], np.ndarray, np.ndarray]:
+    """Candidate (cols, rows) grids ordered by tile count, with their aspect ratios and tile counts"""
+    ratios = set(
+        (i, j) for n in range(min_num, max_num + 1) for i in range(1, n + 1) for j in range(1, n + 1) if
+        i * j <= max_num and i * j >= min_num)
+    ratios = sorted(ratios, key=lambda x: x[0] * x[1])
+    aspects = np.array([i / j for i, j in ratios])
+    blocks = np.array([i * j for i, j in ratios])
+    return ratios, aspects, blocks
+
+
+def closest_aspect_ratio(width: int, height: int, image_size: int = 448,
+                         min_num: int = 1, max_num: int = 12) -> Tuple[int, int]:
+    """
+    Grid whose aspect ratio is closest to the image's. Among equally close
+    grids, a larger one is preferred if the image has more than half its
+    pixels, as in the InternVL reference loop.
+    """
+    ratios, aspects, blocks = target_ratios(min_num, max_num)
+    diffs = np.abs(width / height - aspects)
+    ties = np.flatnonzero(diffs == diffs.min())
+    larger = ties[1:][width * height > 0.5 * image_size * image_size * blocks[ties[1:]]]
+    return ratios[larger[-1] if len(larger) else ties[0]]
+
+
+def _to_uint8_tensor(image: Image.Image) -> torch.Tensor:
+    """(3, H, W) uint8 view of an RGB image"""
+    # np.asarray of a PIL image is read-only, which torch warns about
+    return torch.from_numpy(np.array(image)).permute(2, 0, 1)
+
+
+def tile_image(image: Image.Image, image_size: int = 448, min_num: int = 1, max_num: int = 12,
+               use_thumbnail: bool = False) -> torch.Tensor:
+    """
+    InternVL dynamic tiling: normalized tiles (num_patches, 3, image_size,
+    image_size) of an RGB image, plus a thumbnail of the whole image when
+    use_thumbnail is set and there is more than one tile.
+
+    The image is resized to the closest grid once and cut into tiles with a
+    view; tiles are written straight into one float batch that is normalized
+    in place. Values match the per-tile PIL crop + torchvision
+    Resize/ToTensor/Normalize pipeline exactly.
+    """
+    cols, rows = closest_aspect_ratio(image.width, image.height, image_size, min_num, max_num)
+    blocks = cols * rows
+    thumbnail = use_thumbnail and blocks != 1
+    pixel_values = torch.empty(blocks + thumbnail, 3, image_size, image_size)
+
+    resized = _to_uint8_tensor(image.resize((image_size * cols, image_size * rows)))
+    # (3, rows*S, cols*S) -> (rows, cols, 3, S, S), row-major tile order
+    tiles = resized.view(3, rows, image_size, cols, image_size).permute(1, 3, 0, 2, 4)
+    pixel_values[:blocks].view(rows, cols, 3, image_size, image_size).copy_(tiles)
+    if thumbnail:
+        pixel_values[blocks].copy_(_to_uint8_tensor(image.resize((image_size, image_size))))
+
+    # ToTensor + Normalize, in place
+    return pixel_values.div_(255).sub_(_MEAN).div_(_STD)
+
+
+def load_image(image_file, input_size: int = 448, max_num: int = 12) -> torch.Tensor:
+    """image_file: a Page, a path, a file object or encoded bytes"""
+    image = Page.coerce(image_file).image
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return tile_image(image, image_size=input_size, use_thumbnail=True, max_num=max_num)
@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Callable, Optional
+
+from fastapi import HTTPException, Request, Response, UploadFile
+from fastapi.routing import APIRoute
+
+from app.config.settings import settings
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds UPLOAD_MAX_BYTES while being spooled."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the maximum upload size of {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class SpooledPDF:
+    """
+    A PDF spooled to local disk in fixed-size chunks, with its size and
+    SHA-256 computed on the way in.
+
+    pdfinfo, pdftoppm and PyPDF2 all read from `path` directly, so the
+    document never has to exist as one bytes object in the API process.
+    The file is removed on close().
+    """
+
+    def __init__(self, path: str, size: int, sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    @classmethod
+    def _create(cls):
+        fd, path = tempfile.mkstemp(suffix=".pdf", dir=settings.UPLOAD_SPOOL_DIR)
+        return os.fdopen(fd, "wb"), path
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, max_bytes: Optional[int] = None) -> "SpooledPDF":
+        """Copy a file-like object to disk chunk by chunk"""
+        max_bytes = settings.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+        out, path = cls._create()
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with out:
+                while True:
+                    chunk = stream.read(settings.UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes and size > max_bytes:
+                        raise UploadTooLargeError(max_bytes)
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return cls(path, size, digest.hexdigest())
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> "SpooledPDF":
+        out, path = cls._create()
+        with out:
+            out.write(content)
+        return cls(path, len(content), hashlib.sha256(content).hexdigest())
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def spool_upload(file: UploadFile, max_bytes: Optional[int] = None) -> SpooledPDF:
+    """
+    Copy an UploadFile to disk without reading it into memory, enforcing the
+    size limit chunk by chunk. The copy and hashing run on a worker thread.
+
+    Starlette's multipart parser spools the body before the endpoint runs;
+    SizeLimitedRoute caps that while it streams in, so at most the route's
+    limit is ever received or stored.
+    """
+    return await asyncio.to_thread(SpooledPDF.from_stream, file.file, max_bytes)
+
+
+def max_request_bytes(setting: str):
+    """Endpoint decorator: the settings attribute holding its SizeLimitedRoute body limit"""
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.max_request_bytes = setting
+        return endpoint
+    return decorator
+
+
+def request_too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Request body exceeds the maximum of {max_bytes} bytes")
+
+
+class SizeLimitedRoute(APIRoute):
+    """
+    Route that caps the request body while it streams in: 413 up front when
+    Content-Length is over the limit, otherwise as soon as the received
+    bytes pass it, including chunked bodies without a Content-Length.
+
+    The limit is the setting named by the endpoint's @max_request_bytes,
+    else UPLOAD_MAX_REQUEST_BYTES; it is read per request and 0 turns it off.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        setting = getattr(self.endpoint, "max_request_bytes", "UPLOAD_MAX_REQUEST_BYTES")
+
+        async def limited_handler(request: Request) -> Response:
+            max_bytes = getattr(settings, setting)
+            if not max_bytes:
+                return await handler(request)
+            length = request.headers.get("content-length", "")
+            if length.isdigit() and int(length) > max_bytes:
+                raise request_too_large(max_bytes)
+
+            receive = request.receive
+            received = 0
+
+            async def limited_receive():
+                nonlocal received
+                message = await receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > max_bytes:
+                        raise request_too_large(max_bytes)
+                return message
+
+            return await handler(Request(request.scope, limited_receive))
+
+        return limited_handler
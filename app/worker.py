@@ -0,0 +1,27 @@
+"""
+RQ worker for the asynchronous job API.
+
+Run one or more per node, pointing at the same Redis as the API:
+    REDIS_URL=redis://host:6379/0 python -m app.worker
+"""
+
+import logging
+
+from rq import Worker
+
+from app.config.settings import settings
+from app.services.jobs import get_redis
+# Load the pipelines once; each job's forked work-horse inherits them instead
+# of re-importing torch, cv2 and the service singletons
+from app.routers import google_router, pdf_router  # noqa: F401
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    worker = Worker([settings.JOB_QUEUE_NAME], connection=get_redis())
+    worker.work(with_scheduler=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: dict-per-word boxes vs. the columnar BoxArray.
+
+For pages of 500 to 20,000 words (synthetic image_to_data output) measures
+memory held by the boxes (tracemalloc) and the time to build them, run the
+overlap test against one box, merge by line and clip ROIs to the image.
+Line merges are checked to give the same boxes and text.
+
+Usage:
+    python -m benchmarks.bench_box_array --words 500 2000 20000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from app.services.tesseract import TesseractService
+from app.utils.boxes import BoxArray
+
+IMAGE_SHAPE = (3508, 2480)
+
+
+def build_data(count: int, seed: int = 0):
+    """image_to_data(output_type=DICT)-shaped columns, a few blank rows included"""
+    rng = random.Random(seed)
+    data = {k: [] for k in ('left', 'top', 'width', 'height', 'text', 'conf',
+                            'block_num', 'line_num', 'word_num')}
+    x, y, line, word = 60, 60, 1, 1
+    for i in range(count):
+        width = rng.randint(30, 120)
+        blank = rng.random() < 0.05
+        data['left'].append(x)
+        data['top'].append(y + rng.randint(-3, 3))
+        data['width'].append(width)
+        data['height'].append(rng.randint(25, 35))
+        data['text'].append(" " if blank else f"từ{i}")
+        data['conf'].append(-1 if blank else rng.randint(30, 96))
+        data['block_num'].append(1 + line // 20)
+        data['line_num'].append(line)
+        data['word_num'].append(word)
+        x += width + rng.randint(10, 25)
+        word += 1
+        if x > 2300:
+            x, y, line, word = 60, y + 50, line + 1, 1
+    return data
+
+
+def dicts_from_data(data):
+    """The previous extract_text_boxes loop"""
+    boxes = []
+    for i in range(len(data['text'])):
+        if data['text'][i].strip():
+            boxes.append({
+                'x': data['left'][i], 'y': data['top'][i],
+                'width': data['width'][i], 'height': data['height'][i],
+                'text': data['text'][i], 'conf': data['conf'][i],
+                'block': data['block_num'][i], 'line': data['line_num'][i], 'word': data['word_num'][i],
+            })
+    return boxes
+
+
+def legacy_merge_boxes_by_line(service, boxes, y_threshold=10):
+    sorted_boxes = sorted(boxes, key=lambda b: (b['y'], b['x']))
+    lines, current_line, current_y = [], [sorted_boxes[0]], sorted_boxes[0]['y']
+    for box in sorted_boxes[1:]:
+        if abs(box['y'] - current_y) <= y_threshold:
+            current_line.append(box)
+        else:
+            lines.append(service.merge_line_boxes(current_line))
+            current_line, current_y = [box], box['y']
+    lines.append(service.merge_line_boxes(current_line))
+    return lines
+
+
+def legacy_clip(boxes):
+    img_h, img_w = IMAGE_SHAPE
+    rects = []
+    for box in boxes:
+        x, y = max(0, box['x']), max(0, box['y'])
+        rects.append((x, y, min(x + box['width'], img_w), min(y + box['height'], img_h)))
+    return rects
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = fn(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, elapsed, size
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, (time.perf_counter() - start) * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--words", type=int, nargs="+", default=[500, 2000, 20000])
+    args = arg_parser.parse_args()
+
+    service = TesseractService()
+    print(f"{'words':>6} {'layout':>7} {'mem_kb':>8} {'build_ms':>9} {'overlap_ms':>11} "
+          f"{'lines_ms':>9} {'clip_ms':>8} {'same':>5}")
+    for count in args.words:
+        data = build_data(count)
+
+        dicts, build_ms, mem = measure(dicts_from_data, data)
+        probe = dicts[len(dicts) // 2]
+        _, overlap_ms = timed(lambda: [service.check_overlap(probe, b, service.pixel_margin) for b in dicts])
+        reference, lines_ms = timed(legacy_merge_boxes_by_line, service, dicts)
+        _, clip_ms = timed(legacy_clip, dicts)
+        print(f"{count:>6} {'dicts':>7} {mem / 1024:>8.0f} {build_ms:>9.1f} {overlap_ms:>11.2f} "
+              f"{lines_ms:>9.1f} {clip_ms:>8.2f} {'':>5}")
+
+        array, build_ms, mem = measure(BoxArray.from_tesseract_data, data)
+        _, overlap_ms = timed(array.overlaps, probe, service.pixel_margin)
+        lines, lines_ms = timed(array.merge_by_line)
+        _, clip_ms = timed(array.clip_to, IMAGE_SHAPE)
+        print(f"{count:>6} {'columns':>7} {mem / 1024:>8.0f} {build_ms:>9.1f} {overlap_ms:>11.2f} "
+              f"{lines_ms:>9.1f} {clip_ms:>8.2f} {str(lines.to_dicts() == reference):>5}")
+
+
+if __name__ == "__main__":
+    main()
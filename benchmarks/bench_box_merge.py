@@ -0,0 +1,97 @@
+"""
+Benchmark: TesseractService.merge_overlapping_boxes, grid index vs. the
+previous rescan-until-stable loop, from 100 to 20,000 word boxes.
+
+Boxes are laid out like words on dense tabular pages (rows of short words
+in columns with some jitter), in image_to_data reading order. Every run
+checks that both implementations return identical boxes, text and conf.
+
+Usage:
+    python -m benchmarks.bench_box_merge --sizes 100 1000 5000 20000 --legacy-max 5000
+"""
+
+import argparse
+import random
+import time
+
+from app.services.tesseract import TesseractService
+
+
+def legacy_merge_overlapping_boxes(service: TesseractService, boxes):
+    """The merge as it was before the grid index, kept as the reference"""
+    if not boxes:
+        return []
+
+    merged = []
+    used = [False] * len(boxes)
+    for i in range(len(boxes)):
+        if used[i]:
+            continue
+        current = boxes[i].copy()
+        used[i] = True
+        merged_any = True
+        while merged_any:
+            merged_any = False
+            for j in range(len(boxes)):
+                if not used[j] and service.check_overlap(current, boxes[j], service.pixel_margin):
+                    current = service.merge_two_boxes(current, boxes[j])
+                    used[j] = True
+                    merged_any = True
+        merged.append(current)
+    return merged
+
+
+def build_boxes(count: int, seed: int = 0):
+    """
+    Word boxes in table cells: 1-3 words per cell, cells far enough apart
+    (more than 2 * pixel_margin) that each cell merges on its own. Page
+    height grows with the count.
+    """
+    rng = random.Random(seed)
+    boxes = []
+    columns = 6
+    row, col = 0, 0
+    while len(boxes) < count:
+        x = 60 + col * 420 + rng.randint(0, 20)
+        y = 60 + row * 90 + rng.randint(-4, 4)
+        for word in range(rng.randint(1, 3)):
+            width = rng.randint(30, 90)
+            boxes.append({'x': x, 'y': y, 'width': width, 'height': rng.randint(25, 35),
+                          'text': f"w{len(boxes)}", 'conf': rng.randint(40, 96)})
+            x += width + rng.randint(8, 30)
+            if len(boxes) == count:
+                break
+        col += 1
+        if col == columns:
+            col, row = 0, row + 1
+    return boxes
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    arg_parser.add_argument("--legacy-max", type=int, default=5000,
+                            help="Skip the quadratic reference above this many boxes")
+    args = arg_parser.parse_args()
+
+    service = TesseractService()
+    print(f"{'boxes':>7} {'merged':>7} {'grid_ms':>9} {'legacy_ms':>10} {'speedup':>8} {'identical':>10}")
+    for size in args.sizes:
+        boxes = build_boxes(size)
+
+        start = time.perf_counter()
+        merged = service.merge_overlapping_boxes(boxes)
+        grid_ms = (time.perf_counter() - start) * 1000
+
+        if size <= args.legacy_max:
+            start = time.perf_counter()
+            reference = legacy_merge_overlapping_boxes(service, boxes)
+            legacy_ms = (time.perf_counter() - start) * 1000
+            print(f"{size:>7} {len(merged):>7} {grid_ms:>9.1f} {legacy_ms:>10.1f} "
+                  f"{legacy_ms / grid_ms:>8.1f} {str(merged.to_dicts() == reference):>10}")
+        else:
+            print(f"{size:>7} {len(merged):>7} {grid_ms:>9.1f} {'-':>10} {'-':>8} {'-':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: full-text OCR throughput vs. process pool size.
+
+OCRs every page of a synthetic (or given) PDF with FullTextOCRService at
+several worker counts and reports pages/sec and pages/sec per core. With
+OMP_THREAD_LIMIT=1 per worker, pages/sec per core should stay roughly flat
+as workers are added, up to the physical core count.
+
+Usage:
+    python -m benchmarks.bench_fulltext --pages 24 --workers 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+
+from app.services.fulltext import FullTextOCRService
+from benchmarks.bench_pdf_render import build_pdf
+
+
+async def run(pdf_path: str, total_pages: int, workers: int):
+    service = FullTextOCRService(workers=workers)
+    try:
+        # Warm the pool so process start-up isn't counted
+        await service.extract_text(pdf_path, 1)
+        _, stats = await service.extract_text(pdf_path, total_pages)
+    finally:
+        service.shutdown()
+    return stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--pdf", help="PDF to OCR; synthetic pages if omitted")
+    arg_parser.add_argument("--pages", type=int, default=24)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = arg_parser.parse_args()
+
+    pdf_path = args.pdf
+    if pdf_path is None:
+        fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(build_pdf(args.pages))
+
+    from app.services.pdf_service import pdf_service
+    total_pages = pdf_service.get_page_count(pdf_path)
+
+    print(f"{'workers':>8} {'pages':>6} {'time_s':>8} {'pages_s':>8} {'pages_s_core':>13} {'chars':>8}")
+    try:
+        for workers in args.workers:
+            stats = asyncio.run(run(pdf_path, total_pages, workers))
+            print(f"{workers:>8} {stats['pages']:>6} {stats['elapsed_ms'] / 1000:>8.2f} "
+                  f"{stats['pages_per_sec']:>8.2f} {stats['pages_per_sec_per_core']:>13.2f} "
+                  f"{stats['content_length']:>8}")
+    finally:
+        if args.pdf is None:
+            os.remove(pdf_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Round trip of the asynchronous job path: enqueue_extraction ->
+run_extraction_job -> describe_job, against fakeredis (default) or a real
+Redis (--redis-url), with jobs run inline (is_async=False) instead of by a
+worker.
+
+Each job uploads a synthetic PDF, runs the real qwen pipeline and reads
+the status and result back the way GET /jobs/{id} and /jobs/{id}/result
+do, once with the PDF passed through Redis and once through a temporary
+JOB_INPUT_DIR. The model calls go to the fake Ollama server, so no GPU is
+needed; rendering still needs poppler. The script checks that finished
+jobs return a Field* result and drop their input, that a job whose input
+expired is reported failed with its error, and that a non-positive
+result_ttl, a PDF over JOB_REDIS_MAX_BYTES and a webhook pointing at a
+private address are rejected. It prints per-job enqueue+run and describe
+milliseconds for each input mode.
+
+Usage:
+    python -m benchmarks.bench_jobs --jobs 5 --pages 3
+    python -m benchmarks.bench_jobs --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_pdf_render import build_pdf
+from benchmarks.fake_ollama import start_in_thread
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--jobs", type=int, default=5)
+    arg_parser.add_argument("--pages", type=int, default=3)
+    arg_parser.add_argument("--redis-url", help="Real Redis to use instead of fakeredis; keys are left to expire")
+    arg_parser.add_argument("--port", type=int, default=11500, help="Fake Ollama port")
+    args = arg_parser.parse_args()
+
+    # Must be set before the services read settings
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    server = start_in_thread(args.port, latency=0.01)
+
+    from redis import Redis
+
+    from app.config.settings import settings
+    from app.services import jobs
+    from app.utils.upload import SpooledPDF, UploadTooLargeError
+
+    if args.redis_url:
+        connection = Redis.from_url(args.redis_url)
+    else:
+        import fakeredis
+        connection = fakeredis.FakeRedis()
+    jobs.set_redis(connection)
+
+    content = build_pdf(args.pages)
+    for kwargs in ({"result_ttl": 0}, {"webhook_url": "http://127.0.0.1:8080/hook"},
+                   {"webhook_url": "ftp://example.com/hook"}):
+        with SpooledPDF.from_bytes(content) as pdf:
+            try:
+                jobs.enqueue_extraction(pdf, is_async=False, **kwargs)
+                raise AssertionError(f"{kwargs} was accepted")
+            except ValueError:
+                pass
+
+    redis_max_bytes = settings.JOB_REDIS_MAX_BYTES
+    settings.JOB_REDIS_MAX_BYTES = len(content) - 1
+    with SpooledPDF.from_bytes(content) as pdf:
+        try:
+            jobs.enqueue_extraction(pdf, is_async=False)
+            raise AssertionError("PDF over JOB_REDIS_MAX_BYTES was pushed into Redis")
+        except UploadTooLargeError:
+            pass
+    settings.JOB_REDIS_MAX_BYTES = redis_max_bytes
+
+    # Input that expired before a worker picked it up
+    for input_ref in (f"{jobs.INPUT_KEY_PREFIX}missing", os.path.join(tempfile.gettempdir(), "missing.pdf")):
+        job = jobs.get_queue(is_async=False).enqueue(jobs.run_extraction_job, args=(input_ref, "qwen"))
+        info = jobs.describe_job(jobs.fetch_job(job.id))
+        assert info["status"] == "failed" and "expired or missing" in info["error"], info
+
+    print(f"{'input':>6} {'jobs':>5} {'enqueue_run_ms':>15} {'describe_ms':>12}")
+    with tempfile.TemporaryDirectory() as input_dir:
+        for mode, directory in (("redis", None), ("dir", input_dir)):
+            settings.JOB_INPUT_DIR = directory
+            run_ms, describe_ms = [], []
+            for _ in range(args.jobs):
+                start = time.perf_counter()
+                with SpooledPDF.from_bytes(content) as pdf:
+                    job_id = jobs.enqueue_extraction(pdf, backend="qwen", cache="bypass", is_async=False)
+                run_ms.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                job = jobs.fetch_job(job_id)
+                info = jobs.describe_job(job)
+                result = job.return_value()
+                describe_ms.append((time.perf_counter() - start) * 1000)
+
+                assert info["status"] == "finished", info
+                assert result["SheetTotal"] == args.pages and "Field2" in result, result
+                assert not connection.exists(f"{jobs.INPUT_KEY_PREFIX}{job_id}")
+                assert not os.listdir(input_dir), os.listdir(input_dir)
+            print(f"{mode:>6} {args.jobs:>5} {statistics.median(run_ms):>15.1f} "
+                  f"{statistics.median(describe_ms):>12.2f}")
+        settings.JOB_INPUT_DIR = None
+
+    server.should_exit = True
+    print("round trip ok: finished, failed and rejected jobs behave as the API expects")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: per-request latency with the memory governor vs. the previous
+always-collect behaviour.
+
+Builds a long-lived heap standing in for the loaded model and the service
+caches, then runs simulated requests that allocate (and drop) per-page
+garbage and do a fixed amount of work, calling the three checkpoints a
+Vintern request goes through (before the input, before and after the
+generation). With the governor disabled every checkpoint runs gc.collect()
+(and torch.cuda.empty_cache() on a GPU), as the service did before.
+Prints p50/p99/max request latency, the number of reclaims and their total
+time, and the peak RSS of each mode. Lower --rss-high-mb to see the
+governor reclaim under pressure.
+
+Usage:
+    python -m benchmarks.bench_memory_governor --requests 50 --heap-objects 1000000
+"""
+
+import argparse
+import statistics
+import time
+
+from app.services.memory import MemoryGovernor
+
+CHECKPOINTS = ("vintern.generate_input", "vintern.generate_chat", "vintern.generate_chat.after")
+
+
+def build_heap(objects: int):
+    """Many small, long-lived container objects: what a full collection has to walk"""
+    return [{"id": i, "tokens": [i, i + 1], "meta": {"page": i % 7}} for i in range(objects)]
+
+
+def simulated_request(work_ms: float, garbage: int):
+    """Per-page allocations, some in reference cycles, plus busy work"""
+    pages = []
+    for i in range(garbage):
+        node = {"page": i, "text": "x" * 64}
+        node["self"] = node
+        pages.append(node)
+    deadline = time.perf_counter() + work_ms / 1000
+    while time.perf_counter() < deadline:
+        pass
+    return len(pages)
+
+
+def run(governor: MemoryGovernor, requests: int, work_ms: float, garbage: int):
+    latencies, peak_rss = [], 0.0
+    for _ in range(requests):
+        start = time.perf_counter()
+        governor.checkpoint(CHECKPOINTS[0])
+        governor.checkpoint(CHECKPOINTS[1])
+        simulated_request(work_ms, garbage)
+        governor.checkpoint(CHECKPOINTS[2])
+        latencies.append((time.perf_counter() - start) * 1000)
+        peak_rss = max(peak_rss, governor.sample()["rss_mb"])
+    return latencies, peak_rss
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--requests", type=int, default=50)
+    arg_parser.add_argument("--heap-objects", type=int, default=1_000_000)
+    arg_parser.add_argument("--work-ms", type=float, default=20.0, help="Busy work per request")
+    arg_parser.add_argument("--garbage", type=int, default=5000, help="Cyclic objects dropped per request")
+    arg_parser.add_argument("--rss-high-mb", type=int, default=None, help="Governor RSS watermark")
+    arg_parser.add_argument("--cooldown-s", type=float, default=None)
+    args = arg_parser.parse_args()
+
+    heap = build_heap(args.heap_objects)
+    modes = [
+        ("always-collect", MemoryGovernor(enabled=False)),
+        ("governor", MemoryGovernor(enabled=True, rss_high_mb=args.rss_high_mb, cooldown_s=args.cooldown_s)),
+    ]
+    print(f"heap_objects={len(heap)} rss={modes[0][1].sample()['rss_mb']:.0f}MB "
+          f"rss_high_mb={modes[1][1].rss_high_mb} cooldown_s={modes[1][1].cooldown_s}")
+    print(f"{'mode':>15} {'p50_ms':>8} {'p99_ms':>8} {'max_ms':>8} {'reclaims':>9} {'reclaim_ms':>11} {'peak_rss_mb':>12}")
+    for name, governor in modes:
+        # Warm-up so the first collection of the fresh heap isn't counted
+        run(governor, 3, args.work_ms, args.garbage)
+        governor.reclaims, governor.reclaim_ms = 0, 0.0
+        latencies, peak_rss = run(governor, args.requests, args.work_ms, args.garbage)
+        print(f"{name:>15} {statistics.median(latencies):>8.1f} {percentile(latencies, 0.99):>8.1f} "
+              f"{max(latencies):>8.1f} {governor.reclaims:>9} {governor.reclaim_ms:>11.0f} {peak_rss:>12.0f}")
+
+    events = list(modes[1][1].events)
+    if events:
+        print(f"last governor reclaim: {events[-1]}")
+
+
+if __name__ == "__main__":
+    main()
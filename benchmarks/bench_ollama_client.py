@@ -0,0 +1,89 @@
+"""
+Benchmark: threaded LangChain path vs. native async Ollama client.
+
+Starts the fake Ollama server and sends the same number of page requests
+through QwenVisionService.get_response_ocr on a thread pool and through
+aget_response_ocr on the event loop, at several concurrency levels.
+
+Usage:
+    python -m benchmarks.bench_ollama_client --concurrency 1 8 32 --requests 64
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_ollama import start_in_thread
+
+FAKE_IMAGE = "data:image/png;base64," + "iVBORw0KGgo" * 1000
+
+
+def summarize(label: str, concurrency: int, latencies, elapsed: float):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if len(latencies) > 1 else p50
+    print(f"{label:>8} {concurrency:>5} {len(latencies) / elapsed:>9.1f} {p50:>9.1f} {p99:>9.1f}")
+
+
+def run_threaded(service, concurrency: int, requests: int):
+    def call():
+        start = time.perf_counter()
+        service.get_response_ocr(FAKE_IMAGE)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(lambda _: call(), range(requests)))
+    return latencies, time.perf_counter() - start
+
+
+async def run_async(service, concurrency: int, requests: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            start = time.perf_counter()
+            await service.aget_response_ocr(FAKE_IMAGE)
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(call() for _ in range(requests)))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    arg_parser.add_argument("--requests", type=int, default=64)
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="Fake model latency per call")
+    arg_parser.add_argument("--port", type=int, default=11500)
+    args = arg_parser.parse_args()
+
+    # Must be set before the services read settings
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    server = start_in_thread(args.port, args.latency)
+
+    from app.services.qwenvision import qwen_service
+    from app.services.ollama_client import ollama_client
+
+    print(f"{'path':>8} {'conc':>5} {'req_s':>9} {'p50_ms':>9} {'p99_ms':>9}")
+
+    async def async_suite():
+        for concurrency in args.concurrency:
+            latencies, elapsed = await run_async(qwen_service, concurrency, args.requests)
+            summarize("async", concurrency, latencies, elapsed)
+        await ollama_client.aclose()
+
+    for concurrency in args.concurrency:
+        latencies, elapsed = run_threaded(qwen_service, concurrency, args.requests)
+        summarize("threaded", concurrency, latencies, elapsed)
+    asyncio.run(async_suite())
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: one rendered page fed to every backend, as PNG bytes (the
+previous hand-off) vs. a shared Page.
+
+  bytes  the renderer PNG-encodes the page; the cascade decodes it to gray,
+         the payload optimizer decodes it again, Tesseract decodes it to BGR
+         and Vintern decodes it once more before tiling
+  page   the decoded raster is wrapped in a Page once; the gray and BGR
+         arrays and the PIL image are views computed at most once
+
+Per-stage milliseconds are the median over --repeat runs on synthetic A4
+pages at 300 DPI (the size PDFService renders). --vintern adds Vintern's
+tiling (needs torch). --render also times PDFService.render_page (pdftoppm
+to PNG, then PNG-encoded) against render_page_image (PPM, no encoding); it
+needs poppler.
+
+Usage:
+    python -m benchmarks.bench_page_buffer --pages 3 --repeat 5 --vintern --render
+"""
+
+import argparse
+import io
+import os
+import statistics
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.services.pdf_service import pdf_service
+from app.services.vlm_payload import vlm_payload_optimizer
+from app.utils.page import Page
+from benchmarks.bench_tesseract import build_page
+
+
+def timed(stages, name, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    stages[name] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def bytes_pipeline(raster: Image.Image, vintern: bool):
+    stages = {}
+    png = timed(stages, "encode", pdf_service.encode_png, raster)
+    timed(stages, "cascade_gray", cv2.imdecode, np.frombuffer(png, np.uint8), cv2.IMREAD_GRAYSCALE)
+    timed(stages, "vlm_payload", vlm_payload_optimizer.prepare, png)
+    timed(stages, "tesseract_bgr", cv2.imdecode, np.frombuffer(png, np.uint8), cv2.IMREAD_COLOR)
+    if vintern:
+        from app.utils.tiling import load_image
+        timed(stages, "vintern_tiles", load_image, io.BytesIO(png), 448, 6)
+    return stages
+
+
+def page_pipeline(raster: Image.Image, vintern: bool):
+    stages = {}
+    page = timed(stages, "encode", Page.from_image, raster)
+    timed(stages, "cascade_gray", page.array, "L")
+    timed(stages, "vlm_payload", vlm_payload_optimizer.prepare, page)
+    timed(stages, "tesseract_bgr", page.array, "BGR")
+    if vintern:
+        from app.utils.tiling import load_image
+        timed(stages, "vintern_tiles", load_image, page, 448, 6)
+    return stages
+
+
+def time_render(pages: int, repeat: int):
+    from benchmarks.bench_pdf_render import build_pdf
+
+    pdf_path = pdf_service.write_temp_pdf(build_pdf(pages))
+    try:
+        for label, fn in (("render_page (png)", pdf_service.render_page),
+                          ("render_page_image (ppm)", pdf_service.render_page_image)):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for page_number in range(1, pages + 1):
+                    fn(pdf_path, page_number)
+                timings.append((time.perf_counter() - start) * 1000 / pages)
+            print(f"{label:>24} {statistics.median(timings):>8.1f} ms/page")
+    finally:
+        os.remove(pdf_path)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--pages", type=int, default=3)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--vintern", action="store_true", help="Include Vintern tiling")
+    arg_parser.add_argument("--render", action="store_true", help="Also time PNG vs. PPM rendering (poppler)")
+    args = arg_parser.parse_args()
+
+    rasters = []
+    for i in range(args.pages):
+        path = build_page(i)
+        with Image.open(path) as image:
+            rasters.append(image.convert("RGB"))
+        os.remove(path)
+
+    results = {}
+    for label, pipeline in (("bytes", bytes_pipeline), ("page", page_pipeline)):
+        stages = defaultdict(list)
+        for _ in range(args.repeat):
+            for raster in rasters:
+                page_stages = pipeline(raster, args.vintern)
+                for name, ms in page_stages.items():
+                    stages[name].append(ms)
+        results[label] = {name: statistics.median(values) for name, values in stages.items()}
+
+    names = list(results["bytes"])
+    print(f"{'pipeline':>8} " + " ".join(f"{name:>14}" for name in names) + f" {'total_ms':>9}")
+    for label, medians in results.items():
+        print(f"{label:>8} " + " ".join(f"{medians[name]:>14.1f}" for name in names)
+              + f" {sum(medians.values()):>9.1f}")
+
+    if args.render:
+        time_render(args.pages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: page-selective rendering vs. rendering every page.
+
+Builds synthetic A4 PDFs of increasing length and measures wall time and peak
+RSS of PDFService.convert_to_png against the previous render-all behaviour.
+Each measurement runs in a fresh process so ru_maxrss is per run.
+
+Usage:
+    python -m benchmarks.bench_pdf_render --pages 5 50 200 600
+"""
+
+import argparse
+import asyncio
+import io
+import multiprocessing as mp
+import resource
+import time
+
+from PIL import Image, ImageDraw
+
+
+def build_pdf(num_pages: int) -> bytes:
+    """Create a text-like A4 PDF with `num_pages` pages."""
+    pages = []
+    for i in range(num_pages):
+        page = Image.new("RGB", (1240, 1754), "white")
+        draw = ImageDraw.Draw(page)
+        for line in range(40):
+            draw.text((80, 80 + line * 40), f"Trang {i + 1} - dong {line + 1}", fill="black")
+        pages.append(page)
+
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format="PDF", save_all=True, append_images=pages[1:], resolution=150)
+    return buffer.getvalue()
+
+
+def _render_all(pdf_content: bytes):
+    """Previous behaviour: rasterize every page, then keep 3 head + 2 tail."""
+    from pdf2image import convert_from_bytes
+    from app.services.pdf_service import A4_WIDTH, A4_HEIGHT
+
+    images = convert_from_bytes(pdf_content, dpi=300, fmt='png', size=(A4_WIDTH, A4_HEIGHT))
+    selected = images if len(images) <= 5 else images[:3] + images[-2:]
+    png_images = []
+    for image in selected:
+        buf = io.BytesIO()
+        image.save(buf, format='PNG')
+        png_images.append(buf.getvalue())
+    return png_images, len(images)
+
+
+def _render_selected(pdf_content: bytes):
+    from app.services.pdf_service import pdf_service
+    return asyncio.run(pdf_service.convert_to_png(pdf_content))
+
+
+def _worker(mode: str, pdf_content: bytes, queue):
+    fn = _render_all if mode == "all" else _render_selected
+    start = time.perf_counter()
+    png_images, total_pages = fn(pdf_content)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((elapsed, peak_mb, len(png_images), total_pages))
+
+
+def run(mode: str, pdf_content: bytes):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_worker, args=(mode, pdf_content, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--pages", type=int, nargs="+", default=[5, 50, 200])
+    arg_parser.add_argument("--skip-all", action="store_true", help="Only measure selective rendering")
+    args = arg_parser.parse_args()
+
+    print(f"{'pages':>6} {'mode':>9} {'time_s':>8} {'peak_rss_mb':>12} {'rendered':>9}")
+    for num_pages in args.pages:
+        pdf_content = build_pdf(num_pages)
+        modes = ["selected"] if args.skip_all else ["all", "selected"]
+        for mode in modes:
+            elapsed, peak_mb, rendered, total = run(mode, pdf_content)
+            print(f"{total:>6} {mode:>9} {elapsed:>8.2f} {peak_mb:>12.1f} {rendered:>9}")
+
+
+if __name__ == "__main__":
+    main()
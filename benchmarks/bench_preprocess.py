@@ -0,0 +1,80 @@
+"""
+Benchmark: TesseractService.preprocess_for_ocr per profile.
+
+Runs fast / standard / heavy / auto (and heavy with the expensive steps on
+a downscaled image) over clean, lightly noisy and heavily noisy 300-DPI
+pages, printing the per-step milliseconds, the profile auto picked and the
+page's estimated noise. With --ocr the preprocessed pages are also OCRed
+and the text compared to the heavy profile's.
+
+Usage:
+    python -m benchmarks.bench_preprocess --images page1.png --downscale 0.5 --ocr
+"""
+
+import argparse
+import difflib
+import os
+import statistics
+
+import cv2
+import numpy as np
+import pytesseract
+
+from app.services.tesseract import TesseractService
+from benchmarks.bench_tesseract import build_page
+
+NOISE_LEVELS = {"clean": 0, "light": 6, "heavy": 25}
+
+
+def synthetic_pages():
+    """One rendered page with gaussian noise at each NOISE_LEVELS sigma"""
+    path = build_page(0)
+    base = cv2.imread(path)
+    os.remove(path)
+    rng = np.random.default_rng(0)
+    pages = {}
+    for name, sigma in NOISE_LEVELS.items():
+        noise = rng.normal(0, sigma, base.shape) if sigma else 0
+        pages[name] = np.clip(base.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+    return pages
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--images", nargs="*", help="Page images; synthetic noisy pages if omitted")
+    arg_parser.add_argument("--downscale", type=float, default=0.5)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--ocr", action="store_true", help="Also compare OCR text to the heavy profile")
+    args = arg_parser.parse_args()
+
+    pages = {path: cv2.imread(path) for path in args.images} if args.images else synthetic_pages()
+    variants = [
+        ("heavy", TesseractService(preprocess_profile="heavy", preprocess_scale=1.0)),
+        ("standard", TesseractService(preprocess_profile="standard", preprocess_scale=1.0)),
+        ("fast", TesseractService(preprocess_profile="fast", preprocess_scale=1.0)),
+        ("auto", TesseractService(preprocess_profile="auto", preprocess_scale=1.0)),
+        (f"heavy@{args.downscale}", TesseractService(preprocess_profile="heavy", preprocess_scale=args.downscale)),
+    ]
+
+    for name, img in pages.items():
+        print(f"\n{name}")
+        print(f"{'variant':>12} {'profile':>9} {'noise':>6} {'total_ms':>9} {'similarity':>11}  steps")
+        reference = None
+        for label, service in variants:
+            totals, report = [], {}
+            for _ in range(args.repeat):
+                report = {}
+                processed = service.preprocess_for_ocr(img, report=report)
+                totals.append(sum(report["timings_ms"].values()))
+            similarity = ""
+            if args.ocr:
+                text = pytesseract.image_to_string(processed, lang=service.lang, config='--psm 3')
+                reference = text if reference is None else reference
+                similarity = f"{difflib.SequenceMatcher(None, reference, text).ratio():.3f}"
+            steps = " ".join(f"{step}={ms:.0f}" for step, ms in report["timings_ms"].items())
+            print(f"{label:>12} {report['profile']:>9} {str(report.get('noise', '')):>6} "
+                  f"{statistics.median(totals):>9.1f} {similarity:>11}  {steps}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: per-page time of TesseractService.process_image_file per engine.
+
+  subprocess  image_to_string per merged box (one tesseract launch per box)
+  words       box text rebuilt from the image_to_data words, no second OCR
+  tesserocr   one in-process API handle, SetRectangle per box
+
+Uses the given page images, or renders synthetic A4 pages of Vietnamese text.
+Text similarity is measured against the subprocess engine's output.
+
+Usage:
+    python -m benchmarks.bench_tesseract --images page1.png page2.png --repeat 3
+"""
+
+import argparse
+import difflib
+import os
+import statistics
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+from app.services.tesseract import TesseractService, tesserocr
+
+
+def build_page(index: int) -> str:
+    """A4 page at 300 DPI with a header block, body lines and a signer block"""
+    page = Image.new("RGB", (2480, 3508), "white")
+    draw = ImageDraw.Draw(page)
+    draw.text((200, 200), "UBND TINH SON LA", fill="black")
+    draw.text((200, 260), f"So: {index + 1}/BC-UBND", fill="black")
+    draw.text((1500, 260), "Son La, ngay 19 thang 9 nam 2025", fill="black")
+    for line in range(50):
+        draw.text((200, 500 + line * 55), f"Noi dung bao cao dong {line + 1} trang {index + 1}", fill="black")
+    draw.text((1600, 3300), "Nguyen Van A", fill="black")
+    fd, path = tempfile.mkstemp(suffix=".png")
+    os.close(fd)
+    page.save(path)
+    return path
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--images", nargs="*", help="Page images; synthetic pages if omitted")
+    arg_parser.add_argument("--pages", type=int, default=3, help="Synthetic pages to render")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    images = args.images or [build_page(i) for i in range(args.pages)]
+    engines = ["subprocess", "words"] + (["tesserocr"] if tesserocr is not None else [])
+
+    reference = {}
+    print(f"{'engine':>11} {'p50_s':>8} {'mean_s':>8} {'similarity':>11}")
+    try:
+        for engine in engines:
+            service = TesseractService(engine=engine)
+            timings, similarity = [], []
+            for path in images:
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    text = service.process_image_file(path)
+                    timings.append(time.perf_counter() - start)
+                reference.setdefault(path, text)
+                similarity.append(difflib.SequenceMatcher(None, reference[path], text).ratio())
+            print(f"{engine:>11} {statistics.median(timings):>8.2f} {statistics.mean(timings):>8.2f} "
+                  f"{statistics.mean(similarity):>11.3f}")
+    finally:
+        if not args.images:
+            for path in images:
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: /upload/deepseek (Tesseract OCR + text LLM) vs.
+/upload/qwen/jpeg/opt (vision model), side by side.
+
+Both endpoints are called in-process through the ASGI app against the fake
+Ollama server, with a per-call latency for each model (the 32B vision model
+is slower than the 14B text model), and the result cache bypassed. Reports
+p50/mean request latency, model calls per document and the Server-Timing
+breakdown of the last request. A warm-up request per endpoint is not timed.
+
+Usage:
+    python -m benchmarks.bench_text_llm --pages 6 --repeat 5 --vision-latency 3.0 --text-latency 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks.bench_pdf_render import build_pdf
+from benchmarks.fake_ollama import start_in_thread
+
+ENDPOINTS = ("/upload/qwen/jpeg/opt", "/upload/deepseek")
+
+
+async def run(app, endpoint: str, pdf_content: bytes, repeat: int, server):
+    transport = httpx.ASGITransport(app=app)
+    timings, calls, headers = [], [], {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm-up: OCR process pool start-up and first connections aren't counted
+        await client.post(endpoint, params={"cache": "bypass"},
+                          files={"file": ("bench.pdf", pdf_content, "application/pdf")})
+        for _ in range(repeat):
+            before = server.config.app.state.requests
+            start = time.perf_counter()
+            response = await client.post(endpoint, params={"cache": "bypass"},
+                                         files={"file": ("bench.pdf", pdf_content, "application/pdf")})
+            timings.append(time.perf_counter() - start)
+            response.raise_for_status()
+            calls.append(server.config.app.state.requests - before)
+            headers = response.headers
+    return timings, calls, headers
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--pdf", help="PDF to extract; synthetic pages if omitted")
+    arg_parser.add_argument("--pages", type=int, default=6)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--vision-latency", type=float, default=3.0, help="Fake seconds per vision call")
+    arg_parser.add_argument("--text-latency", type=float, default=1.0, help="Fake seconds per text LLM call")
+    arg_parser.add_argument("--port", type=int, default=11500)
+    args = arg_parser.parse_args()
+
+    if args.pdf:
+        with open(args.pdf, "rb") as f:
+            pdf_content = f.read()
+    else:
+        pdf_content = build_pdf(args.pages)
+
+    # Must be set before the services read settings
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ["OLLAMA_ASYNC_CLIENT"] = "true"
+    # Repeated pages would otherwise be answered from the per-page cache
+    os.environ["PAGE_CACHE_ENABLED"] = "false"
+
+    from app.main import app
+    from app.services.deepseek import deepseek_service
+    from app.services.fulltext import fulltext_service
+    from app.services.ollama_client import ollama_client
+    from app.services.qwenvision import qwen_service
+
+    server = start_in_thread(args.port, model_latency={
+        qwen_service.MODEL_NAME: args.vision_latency,
+        deepseek_service.MODEL_NAME: args.text_latency,
+    })
+
+    async def suite():
+        print(f"{'endpoint':>22} {'p50_s':>7} {'mean_s':>7} {'calls':>6}  server-timing")
+        for endpoint in ENDPOINTS:
+            timings, calls, headers = await run(app, endpoint, pdf_content, args.repeat, server)
+            print(f"{endpoint:>22} {statistics.median(timings):>7.2f} {statistics.mean(timings):>7.2f} "
+                  f"{statistics.mean(calls):>6.1f}  {headers.get('server-timing', '')}")
+        await ollama_client.aclose()
+
+    try:
+        asyncio.run(suite())
+    finally:
+        fulltext_service.shutdown()
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
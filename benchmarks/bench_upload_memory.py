@@ -0,0 +1,103 @@
+"""
+Benchmark: reading uploads into memory vs. spooling them to disk.
+
+Writes a dummy upload of each size to disk, wraps it in a Starlette
+UploadFile the way a multipart request would, and measures peak RSS of the
+previous ingestion (file.read(), hash, write temp PDF) against spool_upload.
+Each measurement runs in a fresh process so ru_maxrss is per run, with the
+modules imported before the baseline is taken. Spooling must stay within
+--max-spool-rss-mb of RSS growth whatever the file size, or the run fails.
+
+Usage:
+    python -m benchmarks.bench_upload_memory --sizes-mb 10 100 500
+"""
+
+import argparse
+import asyncio
+import hashlib
+import multiprocessing as mp
+import os
+import resource
+import tempfile
+import time
+
+# Chunks in flight, the worker thread and hashing state; independent of file size
+MAX_SPOOL_RSS_MB = 32
+
+
+def _open_upload(path: str):
+    from starlette.datastructures import UploadFile
+    return UploadFile(file=open(path, "rb"), filename="upload.pdf")
+
+
+async def _read_all(path: str):
+    """Previous behaviour: whole upload as bytes, hashed, then copied to a temp PDF."""
+    from app.services.pdf_service import pdf_service
+
+    upload = _open_upload(path)
+    content = await upload.read()
+    hashlib.sha256(content).hexdigest()
+    pdf_path = pdf_service.write_temp_pdf(content)
+    os.remove(pdf_path)
+    return len(content)
+
+
+async def _spool(path: str):
+    from app.utils.upload import spool_upload
+
+    upload = _open_upload(path)
+    with await spool_upload(upload, max_bytes=0) as pdf:
+        return pdf.size
+
+
+def _worker(mode: str, path: str, queue):
+    import app.services.pdf_service  # noqa: F401
+    import app.utils.upload  # noqa: F401
+
+    fn = _read_all if mode == "read" else _spool
+    baseline_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    size = asyncio.run(fn(path))
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((elapsed, peak_mb - baseline_mb, size))
+
+
+def run(mode: str, path: str):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_worker, args=(mode, path, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--sizes-mb", type=int, nargs="+", default=[10, 100, 500])
+    arg_parser.add_argument("--max-spool-rss-mb", type=float, default=MAX_SPOOL_RSS_MB)
+    args = arg_parser.parse_args()
+
+    print(f"{'size_mb':>8} {'mode':>6} {'time_s':>8} {'rss_growth_mb':>14}")
+    for size_mb in args.sizes_mb:
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for _ in range(size_mb):
+                    f.write(os.urandom(1024 * 1024))
+            for mode in ("read", "spool"):
+                elapsed, growth_mb, size = run(mode, path)
+                print(f"{size_mb:>8} {mode:>6} {elapsed:>8.2f} {growth_mb:>14.1f}")
+                assert size == size_mb * 1024 * 1024, f"{mode} saw {size} bytes"
+                if mode == "spool":
+                    assert growth_mb <= args.max_spool_rss_mb, (
+                        f"spooling {size_mb} MB grew RSS by {growth_mb:.1f} MB "
+                        f"(limit {args.max_spool_rss_mb} MB)")
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
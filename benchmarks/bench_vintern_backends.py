@@ -0,0 +1,99 @@
+"""
+Benchmark: Vintern CPU backends (VINTERN_CPU_BACKEND bf16 / fp32 / int8,
+optionally with the ONNX Runtime vision encoder).
+
+Loads the model once per backend on CPU and answers one extraction prompt
+per page with greedy decoding, reporting load time, time to first token
+(image tiling, vision encoder and prompt prefill), decode tokens/sec and
+whether the answers match the first backend's. The vision feature cache is
+disabled so every page runs the encoder. The first page is a warm-up and is
+not timed.
+
+Usage:
+    python -m benchmarks.bench_vintern_backends --backends bf16 fp32 int8 --onnx-vision --images page1.png page2.png
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from app.utils import prom
+
+
+def run_backend(service, images, prompt):
+    """Per-page stats, answers"""
+    rows, answers = [], []
+    for i, image in enumerate(images):
+        start = time.perf_counter()
+        model_input = service.generate_input(image)
+        input_ms = (time.perf_counter() - start) * 1000
+        page_answers, stats = service.generate_chat_multi(model_input, [prompt], share_prefix=False)
+        if i == 0 and len(images) > 1:
+            continue
+        stats["first_token_ms"] = input_ms + stats["vision_ms"] + stats["prefill_ms"]
+        rows.append(stats)
+        answers.append(page_answers[0])
+    return rows, answers
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--backends", nargs="+", default=["bf16", "fp32", "int8"])
+    arg_parser.add_argument("--onnx-vision", action="store_true", help="Also run each fp32/int8 backend with the ONNX vision encoder")
+    arg_parser.add_argument("--threads", type=int, default=0, help="torch/ORT intra-op threads (0 = default)")
+    arg_parser.add_argument("--images", nargs="*", help="Page images; synthetic pages if omitted")
+    arg_parser.add_argument("--pages", type=int, default=3, help="Synthetic pages to render")
+    arg_parser.add_argument("--max-new-tokens", type=int, default=32)
+    args = arg_parser.parse_args()
+
+    # Must be set before torch initialises CUDA
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    from app.config.settings import settings
+    from app.services.vintern import VinternAIService
+    from app.services.vision_cache import vision_feature_cache
+    from benchmarks.bench_tesseract import build_page
+
+    variants = [(backend, False) for backend in args.backends]
+    if args.onnx_vision:
+        variants += [(backend, True) for backend in args.backends if backend != "bf16"]
+
+    images = args.images or [build_page(i) for i in range(args.pages)]
+    vision_feature_cache.enabled = False
+    settings.VINTERN_CPU_THREADS = args.threads
+    service = VinternAIService()
+    results = []
+    try:
+        for backend, onnx_vision in variants:
+            settings.VINTERN_CPU_BACKEND = backend
+            settings.VINTERN_ONNX_VISION = onnx_vision
+            # Reload the model with this backend
+            service._initialized = False
+            service.model = None
+            start = time.perf_counter()
+            service._ensure_initialized()
+            load_s = time.perf_counter() - start
+            service.generation_config["max_new_tokens"] = args.max_new_tokens
+            rows, answers = run_backend(service, images, prom.GET_DOCUMENT_NUMBER)
+            results.append((service.backend, load_s, rows, answers))
+    finally:
+        if not args.images:
+            for path in images:
+                os.remove(path)
+
+    reference = results[0][3]
+    print(f"{'backend':>20} {'load_s':>7} {'first_token_ms':>15} {'vision_ms':>10} {'prefill_ms':>11} "
+          f"{'decode_tok/s':>13} {'same_answers':>13}")
+    for backend, load_s, rows, answers in results:
+        decode_tokens = sum(row["decode_tokens"] for row in rows)
+        decode_s = sum(row["decode_ms"] for row in rows) / 1000
+        same = sum(a == b for a, b in zip(answers, reference))
+        print(f"{backend:>20} {load_s:>7.1f} {statistics.mean(row['first_token_ms'] for row in rows):>15.0f} "
+              f"{statistics.mean(row['vision_ms'] for row in rows):>10.0f} "
+              f"{statistics.mean(row['prefill_ms'] for row in rows):>11.0f} "
+              f"{decode_tokens / decode_s if decode_s else 0:>13.1f} {f'{same}/{len(answers)}':>13}")
+
+
+if __name__ == "__main__":
+    main()
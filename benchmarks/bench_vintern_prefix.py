@@ -0,0 +1,83 @@
+"""
+Benchmark: per-page cost of the five field prompts in VinternAIService,
+five chat() calls vs. one shared image prefix.
+
+For each page the five extraction prompts of app/utils/prom.py are answered
+three ways: separate model.chat calls, generate_chat_multi with every prompt
+prefilled in full, and generate_chat_multi with the image prefix prefilled
+once. Prefill and decode time are reported separately, and the shared-prefix
+answers are checked against the full-prefill ones.
+
+Usage:
+    python -m benchmarks.bench_vintern_prefix --cpu --images page1.png --max-new-tokens 64
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from app.utils import prom
+
+PROMPTS = [prom.GET_DATE_PROMPT, prom.GET_DOCUMENT_NUMBER, prom.GET_AUTHOR,
+           prom.GET_TITLE_PROMPT, prom.GET_DOCUMENT_SIGNED]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--images", nargs="*", help="Page images; synthetic pages if omitted")
+    arg_parser.add_argument("--pages", type=int, default=2, help="Synthetic pages to render")
+    arg_parser.add_argument("--max-new-tokens", type=int, default=64)
+    arg_parser.add_argument("--cpu", action="store_true", help="Hide GPUs and run on CPU")
+    args = arg_parser.parse_args()
+
+    if args.cpu:
+        # Must be set before torch initialises CUDA
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    from app.services.vintern import VinternAIService
+    from benchmarks.bench_tesseract import build_page
+
+    images = args.images or [build_page(i) for i in range(args.pages)]
+    service = VinternAIService()
+    service._ensure_initialized()
+    service.generation_config["max_new_tokens"] = args.max_new_tokens
+    print(f"device={service.device}")
+
+    rows = {"chat x5": [], "full prefill": [], "shared prefix": []}
+    same = []
+    try:
+        for image in images:
+            # Vision features are computed once (and cached) so only the language model is compared
+            model_input = service.generate_input(image)
+
+            start = time.perf_counter()
+            for prompt in PROMPTS:
+                service.generate_chat(model_input, prompt)
+            rows["chat x5"].append({"total_ms": (time.perf_counter() - start) * 1000})
+
+            for label, share in (("full prefill", False), ("shared prefix", True)):
+                start = time.perf_counter()
+                answers, stats = service.generate_chat_multi(model_input, PROMPTS, share_prefix=share)
+                stats["total_ms"] = (time.perf_counter() - start) * 1000
+                stats["answers"] = answers
+                rows[label].append(stats)
+            same.append(rows["full prefill"][-1]["answers"] == rows["shared prefix"][-1]["answers"])
+    finally:
+        if not args.images:
+            for path in images:
+                os.remove(path)
+
+    def mean(label, key):
+        values = [row[key] for row in rows[label] if key in row]
+        return f"{statistics.mean(values):.0f}" if values else "-"
+
+    print(f"{'mode':>14} {'prefill_tok':>12} {'prefill_ms':>11} {'decode_ms':>10} {'total_ms':>9}")
+    for label in rows:
+        print(f"{label:>14} {mean(label, 'prefill_tokens'):>12} {mean(label, 'prefill_ms'):>11} "
+              f"{mean(label, 'decode_ms'):>10} {mean(label, 'total_ms'):>9}")
+    print(f"shared-prefix answers identical to full prefill: {all(same)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: Vintern image preprocessing, per-tile PIL crop + torchvision
+transforms (the previous load_image) vs. app.utils.tiling.
+
+Both pipelines tile the same images (synthetic pages of several aspect
+ratios, or --images) with max_num=6 and a thumbnail, as generate_input does.
+Prints per-image milliseconds, the bytes and number of tensor allocations
+(torch profiler) and the peak of Python-side allocations (tracemalloc),
+and checks that the pixel values are identical.
+
+Usage:
+    python -m benchmarks.bench_vintern_tiling --repeat 20 --images page1.png
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+import torch
+import torchvision.transforms as T
+from PIL import Image
+from torch.profiler import ProfilerActivity, profile
+from torchvision.transforms.functional import InterpolationMode
+
+from app.utils.tiling import IMAGENET_MEAN, IMAGENET_STD, tile_image
+
+# Portrait A4 at 150 and 300 DPI, landscape A4, a wide banner, a square
+SIZES = [(1240, 1754), (2480, 3508), (3508, 2480), (2000, 500), (800, 800)]
+
+
+def legacy_tile_image(image, image_size=448, min_num=1, max_num=12, use_thumbnail=False):
+    """The per-call table, PIL crop loop and per-tile transform that tiling.py replaces"""
+    transform = T.Compose([
+        T.Lambda(lambda img: img.convert('RGB') if img.mode != 'RGB' else img),
+        T.Resize((image_size, image_size), interpolation=InterpolationMode.BICUBIC),
+        T.ToTensor(),
+        T.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD)
+    ])
+    orig_width, orig_height = image.size
+    aspect_ratio = orig_width / orig_height
+    target_ratios = set(
+        (i, j) for n in range(min_num, max_num + 1) for i in range(1, n + 1) for j in range(1, n + 1) if
+        i * j <= max_num and i * j >= min_num)
+    target_ratios = sorted(target_ratios, key=lambda x: x[0] * x[1])
+
+    best_ratio_diff = float('inf')
+    best_ratio = (1, 1)
+    area = orig_width * orig_height
+    for ratio in target_ratios:
+        ratio_diff = abs(aspect_ratio - ratio[0] / ratio[1])
+        if ratio_diff < best_ratio_diff:
+            best_ratio_diff = ratio_diff
+            best_ratio = ratio
+        elif ratio_diff == best_ratio_diff:
+            if area > 0.5 * image_size * image_size * ratio[0] * ratio[1]:
+                best_ratio = ratio
+
+    target_width = image_size * best_ratio[0]
+    target_height = image_size * best_ratio[1]
+    blocks = best_ratio[0] * best_ratio[1]
+    resized_img = image.resize((target_width, target_height))
+    processed_images = []
+    for i in range(blocks):
+        box = (
+            (i % (target_width // image_size)) * image_size,
+            (i // (target_width // image_size)) * image_size,
+            ((i % (target_width // image_size)) + 1) * image_size,
+            ((i // (target_width // image_size)) + 1) * image_size
+        )
+        processed_images.append(resized_img.crop(box))
+    if use_thumbnail and len(processed_images) != 1:
+        processed_images.append(image.resize((image_size, image_size)))
+    return torch.stack([transform(tile) for tile in processed_images])
+
+
+def synthetic_image(width: int, height: int) -> Image.Image:
+    generator = torch.Generator().manual_seed(width * height)
+    pixels = torch.randint(0, 256, (height, width, 3), dtype=torch.uint8, generator=generator)
+    return Image.fromarray(pixels.numpy())
+
+
+def measure(fn, image, repeat: int):
+    """Median ms, tensor bytes / allocations per call, Python peak bytes"""
+    fn(image)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(image)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        fn(image)
+    allocations = [event.cpu_memory_usage for event in prof.events() if event.cpu_memory_usage > 0]
+
+    tracemalloc.start()
+    fn(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), sum(allocations), len(allocations), peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--images", nargs="*", help="Page images; synthetic images if omitted")
+    arg_parser.add_argument("--max-num", type=int, default=6)
+    arg_parser.add_argument("--repeat", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    if args.images:
+        images = {path: Image.open(path).convert('RGB') for path in args.images}
+    else:
+        images = {f"{w}x{h}": synthetic_image(w, h) for w, h in SIZES}
+
+    pipelines = {
+        "legacy": lambda image: legacy_tile_image(image, max_num=args.max_num, use_thumbnail=True),
+        "tiling": lambda image: tile_image(image, max_num=args.max_num, use_thumbnail=True),
+    }
+    print(f"{'image':>12} {'pipeline':>8} {'patches':>8} {'ms':>8} {'tensor_mb':>10} {'tensor_allocs':>14} "
+          f"{'py_peak_kb':>11} {'identical':>10}")
+    for name, image in images.items():
+        reference = pipelines["legacy"](image)
+        for label, fn in pipelines.items():
+            pixel_values = fn(image)
+            ms, tensor_bytes, tensor_allocs, py_peak = measure(fn, image, args.repeat)
+            identical = pixel_values.shape == reference.shape and torch.equal(pixel_values, reference)
+            print(f"{name:>12} {label:>8} {pixel_values.shape[0]:>8} {ms:>8.1f} {tensor_bytes / 2**20:>10.1f} "
+                  f"{tensor_allocs:>14} {py_peak / 1024:>11.0f} {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: VinternAIService with and without the vision feature cache.
+
+Runs the six prompts of app/utils/prom.py on each page image, as a request
+extracting every field would, first with the cache disabled (the vision
+tower runs for every prompt) and then enabled (once per page), and prints
+per-prompt latency, the cache hit rate and the encoder time saved.
+Generation is capped at --max-new-tokens so the encoder share is visible.
+
+Usage:
+    python -m benchmarks.bench_vision_cache --cpu --images page1.png page2.png --max-new-tokens 32
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from app.utils import prom
+
+PROMPTS = [prom.GET_DATE_PROMPT, prom.GET_DOCUMENT_NUMBER, prom.GET_AUTHOR,
+           prom.GET_TITLE_PROMPT, prom.GET_DOCUMENT_SIGNED, prom.GET_FULL_TEXT_PROMPT]
+
+
+def run_prompts(service, images):
+    """Per-prompt latencies (ms), indexed by prompt position"""
+    latencies = [[] for _ in PROMPTS]
+    for image in images:
+        for i, prompt in enumerate(PROMPTS):
+            start = time.perf_counter()
+            model_input = service.generate_input(image)
+            service.generate_chat(model_input, prompt)
+            latencies[i].append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--images", nargs="*", help="Page images; synthetic pages if omitted")
+    arg_parser.add_argument("--pages", type=int, default=2, help="Synthetic pages to render")
+    arg_parser.add_argument("--max-new-tokens", type=int, default=32)
+    arg_parser.add_argument("--cpu", action="store_true", help="Hide GPUs and run on CPU")
+    args = arg_parser.parse_args()
+
+    if args.cpu:
+        # Must be set before torch initialises CUDA
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    from app.services.vintern import VinternAIService
+    from app.services.vision_cache import vision_feature_cache
+    from benchmarks.bench_tesseract import build_page
+
+    images = args.images or [build_page(i) for i in range(args.pages)]
+    service = VinternAIService()
+    service._ensure_initialized()
+    service.generation_config["max_new_tokens"] = args.max_new_tokens
+    print(f"device={service.device} visual_features={service.supports_visual_features}")
+
+    try:
+        # Warm-up so kernel selection / allocations aren't counted
+        vision_feature_cache.enabled = False
+        run_prompts(service, images[:1])
+
+        baseline = run_prompts(service, images)
+        vision_feature_cache.enabled = True
+        vision_feature_cache.cache.clear()
+        cached = run_prompts(service, images)
+    finally:
+        if not args.images:
+            for path in images:
+                os.remove(path)
+
+    print(f"{'prompt':>7} {'no_cache_ms':>12} {'cache_ms':>9} {'saved_ms':>9}")
+    for i in range(len(PROMPTS)):
+        off, on = statistics.mean(baseline[i]), statistics.mean(cached[i])
+        print(f"{i + 1:>7} {off:>12.0f} {on:>9.0f} {off - on:>9.0f}")
+
+    stats = vision_feature_cache.stats()
+    print(f"hit_rate={stats['hit_rate']} encoder_calls_saved={stats['encoder_calls_saved']} "
+          f"encode_ms_saved={stats['encode_ms_saved']} per_hit={stats['encode_ms_saved_per_hit']}ms "
+          f"cache_bytes={stats['bytes']}")
+
+
+if __name__ == "__main__":
+    main()
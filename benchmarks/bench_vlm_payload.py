@@ -0,0 +1,134 @@
+"""
+Benchmark: VLM payload size, visual tokens, latency and accuracy per setting.
+
+Renders the selected pages of every PDF in a corpus directory once, then for
+each payload setting (codec, quality, pixel budget) measures encoded bytes,
+base64 bytes, estimated visual tokens and encode time.
+
+With --model, every page is also sent to the Ollama server at
+OLLAMA_BASE_URL and the per-setting model latency is reported. Accuracy is
+the share of extracted fields that match --labels (a JSON file mapping PDF
+file name to the expected ngay_ban_hanh/so_van_ban/... values) or, without
+labels, the answers produced from the full-resolution PNG.
+
+Usage:
+    python -m benchmarks.bench_vlm_payload --corpus samples/ --model --labels samples/labels.json
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import time
+
+from app.services.pdf_service import pdf_service
+from app.services.vlm_payload import VLMPayloadOptimizer
+
+SETTINGS = {
+    "png-full": dict(enabled=False),
+    "png": dict(codec="png"),
+    "jpeg95": dict(codec="jpeg", quality=95),
+    "jpeg85": dict(codec="jpeg", quality=85),
+    "jpeg70": dict(codec="jpeg", quality=70),
+    "webp85": dict(codec="webp", quality=85),
+    "jpeg85-768tok": dict(codec="jpeg", quality=85, max_pixels=768 * 28 * 28),
+    "jpeg85-512tok": dict(codec="jpeg", quality=85, max_pixels=512 * 28 * 28),
+}
+
+FIELDS = ("ngay_ban_hanh", "so_van_ban", "co_quan", "trich_yeu", "loai_van_ban", "nguoi_ky")
+
+
+def normalize(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def render_corpus(corpus: str):
+    """(file name, [png_bytes]) for the pages the endpoint would send"""
+    documents = []
+    for path in sorted(glob.glob(os.path.join(corpus, "*.pdf"))):
+        total = pdf_service.get_page_count(path)
+        pages = pdf_service.render_pages(path, pdf_service.select_pages(total))
+        documents.append((os.path.basename(path), pages))
+    return documents
+
+
+def merge_fields(responses):
+    merged = {}
+    for response in responses:
+        for field in FIELDS:
+            value = response.get(field)
+            if value and normalize(value) not in ("không có", "00/00/0000") and field not in merged:
+                merged[field] = value
+    return merged
+
+
+def accuracy(predicted, expected) -> float:
+    fields = [f for f in FIELDS if f in expected]
+    if not fields:
+        return float("nan")
+    return sum(normalize(predicted.get(f)) == normalize(expected[f]) for f in fields) / len(fields)
+
+
+async def run_model(payloads):
+    from app.services.qwenvision import qwen_service
+    from app.services.ollama_client import ollama_client
+
+    latencies, results = [], {}
+    for name, pages in payloads:
+        responses = []
+        for payload in pages:
+            start = time.perf_counter()
+            responses.append(await qwen_service.aget_response_ocr(payload.data_url))
+            latencies.append(time.perf_counter() - start)
+        results[name] = merge_fields(responses)
+    await ollama_client.aclose()
+    return latencies, results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--corpus", required=True, help="Directory of sample PDFs")
+    arg_parser.add_argument("--settings", nargs="+", default=list(SETTINGS), choices=list(SETTINGS))
+    arg_parser.add_argument("--model", action="store_true", help="Also call the model for latency and accuracy")
+    arg_parser.add_argument("--labels", help="JSON file of expected fields per PDF name")
+    args = arg_parser.parse_args()
+
+    documents = render_corpus(args.corpus)
+    labels = None
+    if args.labels:
+        with open(args.labels, encoding="utf-8") as f:
+            labels = json.load(f)
+    print(f"{len(documents)} documents, {sum(len(p) for _, p in documents)} pages")
+
+    header = f"{'setting':>14} {'size':>11} {'kb/page':>8} {'b64_kb':>8} {'tokens':>7} {'enc_ms':>7}"
+    if args.model:
+        header += f" {'p50_ms':>8} {'acc':>6}"
+    print(header)
+
+    reference = labels
+    for name in args.settings:
+        optimizer = VLMPayloadOptimizer(**SETTINGS[name])
+        payloads = [(doc, [optimizer.prepare(png) for png in pages]) for doc, pages in documents]
+        flat = [p for _, pages in payloads for p in pages]
+        line = (f"{name:>14} {flat[0].width:>5}x{flat[0].height:<5} "
+                f"{statistics.mean(p.encoded_bytes for p in flat) / 1024:>8.0f} "
+                f"{statistics.mean(len(p.data_url) for p in flat) / 1024:>8.0f} "
+                f"{statistics.mean(p.visual_tokens for p in flat):>7.0f} "
+                f"{statistics.mean(p.encode_ms for p in flat):>7.1f}")
+
+        if args.model:
+            latencies, results = asyncio.run(run_model(payloads))
+            if reference is None:
+                # Without labels, the first setting (full PNG by default) is the reference
+                reference = results
+            scores = [accuracy(results[doc], reference.get(doc, {})) for doc, _ in payloads]
+            scores = [s for s in scores if s == s]
+            line += (f" {statistics.median(latencies) * 1000:>8.0f}"
+                     f" {statistics.mean(scores) if scores else float('nan'):>6.2f}")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
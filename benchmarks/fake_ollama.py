@@ -0,0 +1,121 @@
+"""
+Minimal fake Ollama server for local benchmarks.
+
+Implements /api/chat and /api/generate (streaming and non-streaming) and
+answers every request with a fixed extraction JSON after a configurable
+delay, so client-side overhead can be measured without a GPU. The delay can
+be set per model, e.g. to make the vision model slower than the text one.
+
+Usage:
+    python -m benchmarks.fake_ollama --port 11500 --latency 0.2 --model-latency qwen2.5vl:32b-q8_0=2.0
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_RESPONSE = {
+    "have_data": True,
+    "co_quan": "UBND TỈNH SƠN LA",
+    "so_van_ban": "26/BC-UBND",
+    "ngay_ban_hanh": "19/09/2025",
+    "loai_van_ban": "Báo cáo",
+    "trich_yeu": "Báo cáo tình hình kinh tế xã hội",
+    "nguoi_ky": "Nguyễn Văn A",
+    "is_full_handwritten": 0,
+}
+
+
+def create_fake_ollama(latency: float = 0.2, response: dict = None,
+                       model_latency: Dict[str, float] = None) -> FastAPI:
+    app = FastAPI()
+    model_latency = model_latency or {}
+    content = json.dumps(response or FAKE_RESPONSE, ensure_ascii=False)
+    app.state.requests = 0
+
+    def chunk(model: str, done: bool, **fields) -> dict:
+        return {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "done": done,
+            **({"done_reason": "stop"} if done else {}),
+            **fields,
+        }
+
+    async def reply(request: Request, field: str):
+        body = await request.json()
+        app.state.requests += 1
+        model = body.get("model", "fake")
+        await asyncio.sleep(model_latency.get(model, latency))
+        if field == "message":
+            value = {"role": "assistant", "content": content}
+            empty = {"role": "assistant", "content": ""}
+        else:
+            value, empty = content, ""
+
+        if not body.get("stream", True):
+            return JSONResponse(chunk(model, True, **{field: value}))
+
+        async def stream():
+            yield json.dumps(chunk(model, False, **{field: value})) + "\n"
+            yield json.dumps(chunk(model, True, **{field: empty})) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        return await reply(request, "message")
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        return await reply(request, "response")
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "fake"}]}
+
+    return app
+
+
+def start_in_thread(port: int, latency: float = 0.2, model_latency: Dict[str, float] = None) -> uvicorn.Server:
+    """Run the fake server on a background thread and wait until it accepts requests."""
+    config = uvicorn.Config(create_fake_ollama(latency, model_latency=model_latency),
+                            host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def parse_model_latency(values: List[str]) -> Dict[str, float]:
+    """['model=seconds', ...] -> {model: seconds}; model names may contain ':'"""
+    latencies = {}
+    for value in values:
+        model, _, seconds = value.rpartition("=")
+        latencies[model] = float(seconds)
+    return latencies
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--port", type=int, default=11500)
+    arg_parser.add_argument("--latency", type=float, default=0.2, help="Seconds per request")
+    arg_parser.add_argument("--model-latency", nargs="*", default=[], metavar="MODEL=SECONDS",
+                            help="Per-model latency overrides")
+    args = arg_parser.parse_args()
+    uvicorn.run(create_fake_ollama(args.latency, model_latency=parse_model_latency(args.model_latency)),
+                host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()